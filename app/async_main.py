@@ -0,0 +1,144 @@
+"""Async variant of the API: the core item and cart endpoints of app.main, served from an AsyncSession engine.
+
+Run it instead of app.main when DB_ASYNC is enabled (see entrypoint.sh), so requests are
+handled on the event loop rather than FastAPI's sync threadpool. It serves item CRUD, carts,
+adding to and removing from a cart, and the metrics. GET /item/all returns the whole catalog,
+without the paging, projection and sorting of app.main.
+
+Only app.main serves /cache/stats, /item/search, /item/autocomplete, /item/bulk,
+/item/{id}/stock_shards, /item/{id}/stock_journal, /item/{id}/stock_movements, /cart/stats and
+/cart/{id}/ops.
+"""
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
+from fastapi.responses import Response
+
+from schemas.cart import (
+    CartDisplay,
+    CartItemCreate,
+    CartItemDisplay,
+    CartItemRemoveRequest,
+)
+from schemas.item import ItemCreate, ItemDisplay, ItemUpdate
+
+from typing import List, Optional
+
+from domain.repo_interfaces import IAsyncCartRepository, IAsyncItemRepository
+from app.dependencies import (
+    get_async_cart_repository,
+    get_async_cart_service,
+    get_async_item_repository,
+    get_async_item_service,
+    cart_repricer,
+    idempotency_store,
+    reservation_sweeper,
+    stock_compactor,
+)
+from domain.service import AsyncCartService, AsyncItemService
+from app.conditional import cart_etag, if_match_version
+from infrastructure.database import get_async_engine, pool_metrics
+from infrastructure.instrumentation import metric_gauges, registry
+from app.background import lifespan
+from app.middleware import IdempotencyMiddleware, RequestMetricsMiddleware
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+app.add_middleware(RequestMetricsMiddleware)
+
+@app.get("/")
+async def root():
+    return {"message": "Hello World! If you can read this, the project is ready to use at http://0.0.0.0:8000/docs"}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Per-route latency and SQL counts plus pool gauges in Prometheus text format."""
+    gauges = metric_gauges("db_pool", pool_metrics(get_async_engine().sync_engine))
+    gauges += metric_gauges("reservation_sweeper", reservation_sweeper.stats())
+    gauges += metric_gauges("cart_repricer", cart_repricer.stats())
+    gauges += metric_gauges("stock_compactor", stock_compactor.stats())
+    gauges += metric_gauges("idempotency", idempotency_store.stats())
+    return Response(content=registry.render(gauges), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/pool")
+async def database_pool_metrics():
+    """Connection pool occupancy (checked out, overflow) and checkout wait statistics."""
+    return pool_metrics(get_async_engine().sync_engine)
+
+@app.post("/item/", response_model=ItemDisplay)
+async def create_item(item_data: ItemCreate, item_service: AsyncItemService = Depends(get_async_item_service)):
+    return await item_service.create_item(item_data)
+
+
+@app.get("/item/all", response_model=List[ItemDisplay])
+async def list_items(item_repo: IAsyncItemRepository = Depends(get_async_item_repository)):
+    return await item_repo.list()
+
+
+@app.get("/item/{item_id}", response_model=ItemDisplay)
+async def get_single_item(item_id: int, item_repo: IAsyncItemRepository = Depends(get_async_item_repository)):
+    item = await item_repo.get(item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
+
+
+@app.put("/item/{item_id}", response_model=ItemDisplay)
+async def update_item(item_id: int, item_update: ItemUpdate, item_service: AsyncItemService = Depends(get_async_item_service)):
+    updated_item = await item_service.update_item(item_id=item_id, item_data=item_update)
+    if updated_item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return updated_item
+
+
+@app.delete("/item/{item_id}", status_code=200)
+async def delete_item(item_id: int, item_repo: IAsyncItemRepository = Depends(get_async_item_repository)):
+    try:
+        await item_repo.delete(item_id=item_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": "Item deleted successfully"}
+
+
+@app.post("/cart/", response_model=CartDisplay)
+async def create_empty_cart(cart_repo: IAsyncCartRepository = Depends(get_async_cart_repository)):
+    return await cart_repo.create()
+
+
+@app.get("/cart/all", response_model=List[CartDisplay])
+async def list_all_carts(
+    after_id: Optional[int] = Query(None, description="Only return carts with an ID greater than this one"),
+    limit: Optional[int] = Query(None, gt=0, description="Maximum number of carts to return"),
+    cart_service: AsyncCartService = Depends(get_async_cart_service),
+):
+    return await cart_service.list_carts_with_details(after_id=after_id, limit=limit)
+
+
+@app.get("/cart/{cart_id}", response_model=CartDisplay)
+async def read_cart(cart_id: int, response: Response, cart_service: AsyncCartService = Depends(get_async_cart_service)):
+    cart_display, version = await cart_service.get_versioned_cart_details(cart_id)
+    response.headers["ETag"] = cart_etag(version)
+    return cart_display
+
+
+@app.post("/cart/{cart_id}/add", response_model=CartItemDisplay)
+async def add_item_to_cart(
+    cart_id: int,
+    cart_item: CartItemCreate,
+    if_match: Optional[str] = Header(None),
+    cart_service: AsyncCartService = Depends(get_async_cart_service),
+):
+    return await cart_service.add_item_to_cart(
+        cart_id, cart_item.item_id, cart_item.quantity, if_match_version(if_match)
+    )
+
+
+@app.delete("/cart/{cart_id}/remove", status_code=200)
+async def remove_item_from_cart(
+    cart_id: int,
+    remove_request: CartItemRemoveRequest,
+    if_match: Optional[str] = Header(None),
+    cart_service: AsyncCartService = Depends(get_async_cart_service),
+):
+    await cart_service.remove_item_from_cart(
+        cart_id, remove_request.item_id, remove_request.quantity, if_match_version(if_match)
+    )
+    return {"message": "Item(s) removed successfully"}
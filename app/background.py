@@ -0,0 +1,54 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager, suppress
+from typing import Callable, Optional
+
+from anyio import to_thread
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+
+from app.dependencies import cart_repricer, reservation_sweeper, stock_compactor
+from infrastructure import repricing, stock_journal
+from infrastructure.reservation_sweeper import RESERVATION_SWEEP_INTERVAL, RESERVATION_TTL, run_periodically
+
+# Run the app's warm-up during startup, before the server accepts connections (set by serve.py).
+WARM_UP = os.getenv("WARM_UP", "false").lower() in ("1", "true", "yes")
+
+# Threads for sync handlers; 0 keeps anyio's default of 40. serve.py sets it to the per-worker
+# connection budget, so handlers never outnumber the connections they wait for.
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "0"))
+
+
+def build_lifespan(warm_up: Optional[Callable[[], None]] = None):
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """Warm up when WARM_UP is set, and run the background jobs alongside the app.
+
+        The reservation sweeper runs when RESERVATION_TTL is set, the cart repricer unless REPRICE_INTERVAL
+        is 0, and the stock compactor unless STOCK_COMPACT_INTERVAL is 0.
+        """
+        if THREADPOOL_SIZE > 0:
+            to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+        if WARM_UP and warm_up is not None:
+            await run_in_threadpool(warm_up)
+        tasks = []
+        if RESERVATION_TTL > 0:
+            tasks.append(asyncio.create_task(run_periodically(reservation_sweeper, RESERVATION_SWEEP_INTERVAL)))
+        if repricing.REPRICE_INTERVAL > 0:
+            tasks.append(asyncio.create_task(repricing.run_periodically(cart_repricer, repricing.REPRICE_INTERVAL)))
+        if stock_journal.STOCK_COMPACT_INTERVAL > 0:
+            tasks.append(asyncio.create_task(
+                stock_journal.run_periodically(stock_compactor, stock_journal.STOCK_COMPACT_INTERVAL)
+            ))
+        try:
+            yield
+        finally:
+            for task in tasks:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+
+    return lifespan
+
+
+lifespan = build_lifespan()
@@ -0,0 +1,47 @@
+import json
+from typing import Any, AsyncIterator, List, Tuple
+
+from fastapi import HTTPException, Request
+
+BULK_BATCH_SIZE = 1000
+
+
+def parse_ndjson_line(line: bytes) -> Any:
+    """Decode one NDJSON line. Undecodable lines are passed on as text so validation reports them per row."""
+    try:
+        return json.loads(line)
+    except ValueError:
+        return line.decode(errors="replace")
+
+
+async def iter_bulk_batches(request: Request, batch_size: int = BULK_BATCH_SIZE) -> AsyncIterator[Tuple[int, List[Any]]]:
+    """Yield (offset, rows) batches from a JSON array body or an NDJSON stream.
+
+    NDJSON bodies (Content-Type: application/x-ndjson) are consumed as they arrive, so at
+    most one batch of rows is held in memory.
+    """
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        offset, batch, pending = 0, [], b""
+        async for chunk in request.stream():
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                if not line.strip():
+                    continue
+                batch.append(parse_ndjson_line(line))
+                if len(batch) == batch_size:
+                    yield offset, batch
+                    offset, batch = offset + len(batch), []
+        if pending.strip():
+            batch.append(parse_ndjson_line(pending))
+        if batch:
+            yield offset, batch
+        return
+
+    try:
+        rows = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or an NDJSON stream")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or an NDJSON stream")
+    for offset in range(0, len(rows), batch_size):
+        yield offset, rows[offset:offset + batch_size]
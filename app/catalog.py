@@ -0,0 +1,39 @@
+"""The cached GET /item/all body, shared by the route and the startup warm-up."""
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy.pool import QueuePool
+
+from app import fast_json
+from app.dependencies import build_item_repository, catalog_cache
+from domain.repo_interfaces import IItemRepository
+from domain.service import ItemService
+from infrastructure.catalog_cache import CachedBody
+from infrastructure.database import SessionLocal, engine
+from schemas.item import ItemDisplay
+
+item_list_adapter = TypeAdapter(List[ItemDisplay])
+
+
+def cached_catalog(item_repo: IItemRepository, item_service: ItemService) -> CachedBody:
+    """The cached catalog body, rebuilt from the database when it is missing or stale."""
+    cached = catalog_cache.get()
+    if cached is None:
+        revision = catalog_cache.revision
+        if fast_json.config.enabled:
+            body = fast_json.dumps(item_service.list_items_page())
+        else:
+            body = item_list_adapter.dump_json(item_list_adapter.validate_python(item_repo.list(), from_attributes=True))
+        cached = catalog_cache.store(revision, body)
+    return cached
+
+
+def warm_up(db_engine=engine, session_factory=SessionLocal) -> None:
+    """Fill the connection pool and render the catalog body, so the first requests pay for neither."""
+    pool_size = db_engine.pool.size() if isinstance(db_engine.pool, QueuePool) else 1
+    connections = [db_engine.connect() for _ in range(pool_size)]
+    for connection in connections:
+        connection.close()
+    with session_factory() as db:
+        item_repo = build_item_repository(db)
+        cached_catalog(item_repo, ItemService(item_repo, catalog_cache))
@@ -0,0 +1,26 @@
+"""Conditional cart requests: the cart version as an ETag, and If-Match back into an expected version."""
+from typing import Optional
+
+from fastapi import HTTPException
+
+
+def cart_etag(version: int) -> str:
+    # Weak: the body also shows item details (stock, descriptions) that change without the cart changing.
+    return f'W/"{version}"'
+
+
+def if_match_version(if_match: Optional[str]) -> Optional[int]:
+    """The cart version an If-Match header requires, or None for no header or `*` (any version).
+
+    This deliberately deviates from RFC 9110 section 13.1.1, which has If-Match compare strongly,
+    so that a weak tag never matches. The cart ETag is weak (see cart_etag), so a strict server
+    would leave clients no tag to send; here the tag names a cart version, which is all that
+    If-Match guards, and `W/"3"` and `"3"` both require version 3. A value that is not a single
+    cart ETag can never match, so it fails the precondition.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip().removeprefix("W/")
+    if len(tag) < 3 or tag[0] != '"' or tag[-1] != '"' or not tag[1:-1].isdigit():
+        raise HTTPException(status_code=412, detail="If-Match does not match the cart's ETag")
+    return int(tag[1:-1])
@@ -1,21 +1,73 @@
 from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from infrastructure.database import get_db
-from infrastructure.repository import ItemRepository, CartRepository
-from domain.repo_interfaces import ICartRepository
-from domain.service import ItemService, CartService
+from infrastructure.database import SessionLocal, get_async_db, get_db
+from infrastructure.async_repository import AsyncCartRepository, AsyncItemRepository
+from infrastructure.cache import build_item_cache
+from infrastructure.cached_repository import CachedItemRepository
+from infrastructure.catalog_cache import CatalogResponseCache
+from infrastructure.idempotency import IdempotencyStore
+from infrastructure.repository import ItemRepository, CartRepository, StockJournalRepository
+from infrastructure.repricing import CartRepricer
+from infrastructure.reservation_sweeper import ReservationSweeper
+from infrastructure.search import InvertedIndex, build_item_search
+from infrastructure.stock_journal import StockCompactor
+from domain.repo_interfaces import IAsyncCartRepository, ICartRepository, IItemRepository
+from domain.service import AsyncCartService, AsyncItemService, ItemService, CartService
+
+# Process-wide catalog cache selected by ITEM_CACHE_BACKEND; None when caching is disabled.
+item_cache = build_item_cache()
+
+# Serialized GET /item/all body, invalidated through the services' catalog revision bumps.
+catalog_cache = CatalogResponseCache()
+
+# In-process search index, used when the database has no full-text search (SQLite).
+search_index = InvertedIndex()
+
+# Releases expired cart reservations; started by app.background.lifespan when RESERVATION_TTL is set.
+reservation_sweeper = ReservationSweeper(SessionLocal, catalog_revision=catalog_cache)
+
+# Reprices carts after item price changes, from the item_change_event outbox; started by app.background.lifespan.
+cart_repricer = CartRepricer(SessionLocal)
+
+# Folds journaled items' stock movements into their snapshots; started by app.background.lifespan.
+stock_compactor = StockCompactor(SessionLocal)
+
+# Idempotency-Key records of cart mutations, replayed by app.middleware.IdempotencyMiddleware.
+idempotency_store = IdempotencyStore(SessionLocal)
+
+def build_item_repository(db: Session) -> IItemRepository:
+    item_repo = ItemRepository(db)
+    if item_cache is None:
+        return item_repo
+    return CachedItemRepository(item_repo, item_cache)
 
 def get_item_repository(db: Session = Depends(get_db)):
-    return ItemRepository(db)
+    return build_item_repository(db)
 
 def get_item_service(db: Session = Depends(get_db)) -> ItemService:
-    item_repo = ItemRepository(db)
-    return ItemService(item_repo)
+    item_repo = build_item_repository(db)
+    return ItemService(item_repo, catalog_cache, build_item_search(db, search_index, item_repo))
+
+def get_stock_journal_repository(db: Session = Depends(get_db)) -> StockJournalRepository:
+    return StockJournalRepository(db)
 
 def get_cart_repository(db: Session = Depends(get_db)) -> ICartRepository:
     return CartRepository(db)
 
 def get_cart_service(db: Session = Depends(get_db)) -> CartService:
     cart_repository = CartRepository(db)
-    item_repository = ItemRepository(db)
-    return CartService(cart_repository, item_repository)
+    item_repository = build_item_repository(db)
+    return CartService(cart_repository, item_repository, catalog_cache)
+
+def get_async_item_repository(db: AsyncSession = Depends(get_async_db)) -> AsyncItemRepository:
+    return AsyncItemRepository(db)
+
+def get_async_item_service(db: AsyncSession = Depends(get_async_db)) -> AsyncItemService:
+    return AsyncItemService(AsyncItemRepository(db))
+
+def get_async_cart_repository(db: AsyncSession = Depends(get_async_db)) -> IAsyncCartRepository:
+    return AsyncCartRepository(db)
+
+def get_async_cart_service(db: AsyncSession = Depends(get_async_db)) -> AsyncCartService:
+    return AsyncCartService(AsyncCartRepository(db), AsyncItemRepository(db))
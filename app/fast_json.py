@@ -0,0 +1,44 @@
+"""Opt-in fast JSON path for hot reads.
+
+With FAST_JSON=true, GET /item/all, /cart/all and /cart/{cart_id} build plain dicts straight
+from the query rows and encode them with orjson into a raw Response, skipping response_model
+validation and the from_attributes walk over ORM objects. The JSON is byte-for-byte the same.
+"""
+import json
+import os
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder produces the same bytes, only slower.
+    orjson = None
+
+
+class FastJsonConfig:
+    """FAST_JSON, read once at startup. Handlers check `enabled` on every request, so tests can toggle it."""
+
+    def __init__(self):
+        self.enabled = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+
+config = FastJsonConfig()
+
+
+def encode_default(value: Any) -> Any:
+    # Money is Decimal internally and a plain JSON number on the wire, as MoneyAmount serializes it.
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=encode_default)
+    return json.dumps(content, default=encode_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def json_response(content: Any, **kwargs) -> Response:
+    return Response(content=dumps(content), media_type="application/json", **kwargs)
@@ -0,0 +1,187 @@
+"""Shared-nothing multi-process server: N uvicorn workers accepting from one listening socket.
+
+Each worker is a separate process with its own engine pool and caches. The launcher only
+supervises: it replaces workers that die, restarts them one at a time on SIGHUP (a new worker
+warms up and reports ready before an old one is drained), and adds or drains a worker on
+SIGTTIN / SIGTTOU, within the `max_workers` the connection budget was sized for. Since a
+replacement starts before its predecessor drains, up to peak_workers(max_workers) processes
+hold connections at once.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import uvicorn
+
+logger = logging.getLogger("launcher")
+
+# Spawned, not forked: workers must not share the launcher's engine or its connections.
+spawn = multiprocessing.get_context("spawn")
+
+
+def run_worker(config_kwargs: dict, sock: socket.socket, ready) -> None:
+    """Worker process body: serve on the inherited socket and set `ready` once startup has finished."""
+    config = uvicorn.Config(**config_kwargs)
+    server = uvicorn.Server(config)
+    config.setup_event_loop()
+
+    async def serve():
+        serving = asyncio.ensure_future(server.serve(sockets=[sock]))
+        # The lifespan startup (and its warm-up) runs before `started` is set.
+        while not server.started and not serving.done():
+            await asyncio.sleep(0.05)
+        if server.started:
+            ready.set()
+        await serving
+
+    asyncio.run(serve())
+
+
+def peak_workers(max_workers: int) -> int:
+    """Most worker processes alive at once: a rolling restart runs one replacement next to `max_workers` workers.
+
+    Budgeting connections for this many keeps a reload within the limit, at the cost of one
+    worker's share sitting idle between reloads; draining first would instead drop capacity
+    during every reload.
+    """
+    return max_workers + 1
+
+
+@dataclass
+class Worker:
+    process: multiprocessing.process.BaseProcess
+    ready: "multiprocessing.synchronize.Event"
+    draining: bool = False
+
+
+class Launcher:
+    def __init__(
+        self,
+        app: str,
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        workers: int = 1,
+        max_workers: Optional[int] = None,
+        graceful_timeout: float = 30,
+        ready_timeout: float = 120,
+        log_level: str = "info",
+    ):
+        self.config_kwargs = {
+            "app": app,
+            "log_level": log_level,
+            "timeout_graceful_shutdown": graceful_timeout,
+        }
+        self.host = host
+        self.port = port
+        self.target = workers
+        self.max_workers = max(max_workers or workers, workers)
+        self.graceful_timeout = graceful_timeout
+        self.ready_timeout = ready_timeout
+        self.workers: List[Worker] = []
+        self.sock: Optional[socket.socket] = None
+        self._signals: List[int] = []
+
+    def spawn(self) -> Worker:
+        ready = spawn.Event()
+        process = spawn.Process(target=run_worker, args=(self.config_kwargs, self.sock, ready), daemon=False)
+        process.start()
+        worker = Worker(process, ready)
+        self.workers.append(worker)
+        logger.info("Started worker %s", process.pid)
+        return worker
+
+    def wait_ready(self, worker: Worker) -> bool:
+        deadline = time.monotonic() + self.ready_timeout
+        while time.monotonic() < deadline:
+            if worker.ready.wait(0.1):
+                return True
+            if not worker.process.is_alive():
+                return False
+        return False
+
+    def stop(self, worker: Worker) -> None:
+        """SIGTERM lets uvicorn finish in-flight requests; a second one would make it exit at once."""
+        if not worker.draining and worker.process.is_alive():
+            os.kill(worker.process.pid, signal.SIGTERM)
+        worker.draining = True
+
+    def drain(self, worker: Worker) -> None:
+        """Stop a worker and wait for it, killing it if it overruns the graceful timeout."""
+        self.stop(worker)
+        worker.process.join(self.graceful_timeout + 5)
+        if worker.process.is_alive():
+            logger.warning("Worker %s did not stop in time; killing it", worker.process.pid)
+            worker.process.kill()
+            worker.process.join()
+        self.workers.remove(worker)
+
+    def reload(self) -> None:
+        """Rolling restart: each old worker is drained only after its replacement is ready."""
+        for old in list(self.workers):
+            new = self.spawn()
+            if not self.wait_ready(new):
+                logger.error("Replacement worker %s failed to start; keeping worker %s", new.process.pid, old.process.pid)
+                self.drain(new)
+                return
+            self.drain(old)
+        logger.info("Reloaded %d workers", len(self.workers))
+
+    def scale(self, delta: int) -> None:
+        target = min(max(self.target + delta, 1), self.max_workers)
+        if target == self.target:
+            logger.warning("Staying at %d workers (between 1 and %d)", target, self.max_workers)
+            return
+        self.target = target
+        if delta > 0:
+            self.wait_ready(self.spawn())
+        else:
+            self.drain(self.workers[0])
+        logger.info("Scaled to %d workers", self.target)
+
+    def replace_dead_workers(self) -> None:
+        for worker in list(self.workers):
+            if not worker.process.is_alive() and not worker.draining:
+                logger.warning("Worker %s exited with code %s; replacing it", worker.process.pid, worker.process.exitcode)
+                self.workers.remove(worker)
+                self.spawn()
+
+    def _on_signal(self, signum, frame) -> None:
+        self._signals.append(signum)
+
+    def run(self) -> None:
+        self.sock = socket.create_server((self.host, self.port), backlog=2048)
+        for _ in range(self.target):
+            self.spawn()
+        for worker in list(self.workers):
+            self.wait_ready(worker)
+        logger.info("Serving on http://%s:%d with %d workers (pid %d)", self.host, self.port, len(self.workers), os.getpid())
+
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, self._on_signal)
+        try:
+            while True:
+                while self._signals:
+                    signum = self._signals.pop(0)
+                    if signum in (signal.SIGTERM, signal.SIGINT):
+                        return
+                    if signum == signal.SIGHUP:
+                        self.reload()
+                    elif signum == signal.SIGTTIN:
+                        self.scale(+1)
+                    elif signum == signal.SIGTTOU:
+                        self.scale(-1)
+                self.replace_dead_workers()
+                time.sleep(0.2)
+        finally:
+            for worker in self.workers:
+                self.stop(worker)
+            for worker in list(self.workers):
+                self.drain(worker)
+            self.sock.close()
+            logger.info("Stopped")
@@ -1,36 +1,153 @@
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from pydantic import TypeAdapter
 
 from schemas.cart import (
     CartDisplay,
     CartItemCreate,
     CartItemDisplay,
     CartItemRemoveRequest,
+    CartOperationsRequest,
+    CartStats,
+)
+from schemas.item import (
+    ItemBulkResult,
+    ItemCreate,
+    ItemDisplay,
+    ItemProjection,
+    ItemSearchPage,
+    ItemStockJournal,
+    ItemStockShards,
+    ItemSuggestion,
+    ItemUpdate,
+    StockMovementDisplay,
 )
-from schemas.item import ItemCreate, ItemDisplay, ItemUpdate
 
-from typing import List
+from decimal import Decimal
+from typing import List, Optional
 
 from infrastructure.repository import ItemRepository
-from domain.repo_interfaces import IItemRepository, ICartRepository
-from app.dependencies import get_item_repository, get_item_service, get_cart_repository, get_cart_service
+from domain.repo_interfaces import IItemRepository, ICartRepository, IStockJournalRepository
+from app.dependencies import get_item_repository, get_item_service, get_cart_repository, get_cart_service, get_stock_journal_repository, cart_repricer, idempotency_store, item_cache, reservation_sweeper, stock_compactor
+from infrastructure.catalog_cache import etag_matches
+from infrastructure.database import engine, pool_metrics
+from infrastructure.instrumentation import metric_gauges, registry
+from app.background import build_lifespan
+from app.catalog import cached_catalog, warm_up
+from app.middleware import IdempotencyMiddleware, RequestMetricsMiddleware
+from app.bulk import iter_bulk_batches
+from app.conditional import cart_etag, if_match_version
+from app import fast_json
 from domain.service import ItemService,CartService
 
-app = FastAPI()
+app = FastAPI(lifespan=build_lifespan(warm_up))
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+app.add_middleware(RequestMetricsMiddleware)
+
+item_projection_adapter = TypeAdapter(List[ItemProjection])
 
 @app.get("/")
 async def root():
     return {"message": "Hello World! If you can read this, the project is ready to use at http://0.0.0.0:8000/docs"}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters of the catalog cache (ITEM_CACHE_BACKEND)."""
+    if item_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **item_cache.stats()}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Per-route latency and SQL counts, pool gauges and cache counters in Prometheus text format."""
+    gauges = metric_gauges("db_pool", pool_metrics(engine))
+    gauges += metric_gauges("reservation_sweeper", reservation_sweeper.stats())
+    gauges += metric_gauges("cart_repricer", cart_repricer.stats())
+    gauges += metric_gauges("stock_compactor", stock_compactor.stats())
+    gauges += metric_gauges("idempotency", idempotency_store.stats())
+    if item_cache is not None:
+        gauges += metric_gauges("item_cache", item_cache.stats())
+    return Response(content=registry.render(gauges), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/pool")
+async def database_pool_metrics():
+    """Connection pool occupancy (checked out, overflow) and checkout wait statistics."""
+    return pool_metrics(engine)
+
 @app.post("/item/", response_model=ItemDisplay)
 def create_item(item_data: ItemCreate, item_service: ItemService = Depends(get_item_service)):
     created_item = item_service.create_item(item_data)
     return created_item
 
 
-@app.get("/item/all", response_model=List[ItemDisplay])
-def list_items(item_repo: ItemRepository = Depends(get_item_repository)):
-    items = item_repo.list()
-    return items
+@app.get("/item/all", response_model=List[ItemProjection])
+def list_items(
+    after_id: Optional[int] = Query(None, description="Only return items after this one in the sort order"),
+    limit: Optional[int] = Query(None, gt=0, description="Maximum number of items to return"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name,price"),
+    sort: Optional[str] = Query(None, description="id, name or price; prefix with - for descending order"),
+    if_none_match: Optional[str] = Header(None),
+    item_repo: ItemRepository = Depends(get_item_repository),
+    item_service: ItemService = Depends(get_item_service),
+):
+    """The whole catalog, served from a cached, pre-serialized body with an ETag.
+
+    With any of `after_id`, `limit`, `fields` or `sort`, one keyset page of just the requested
+    columns is read straight from the database instead.
+    """
+    if (after_id, limit, fields, sort) != (None, None, None, None):
+        rows = item_service.list_items_page(after_id, limit, fields, sort or "id")
+        if fast_json.config.enabled:
+            return fast_json.json_response(rows)
+        page = item_projection_adapter.validate_python(rows)
+        return Response(content=item_projection_adapter.dump_json(page, exclude_unset=True), media_type="application/json")
+    cached = cached_catalog(item_repo, item_service)
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers={"ETag": cached.etag})
+    return Response(content=cached.body, media_type="application/json", headers={"ETag": cached.etag})
+
+
+@app.get("/item/search", response_model=ItemSearchPage)
+def search_items(
+    q: str = Query(..., min_length=1, description="Words to match in item names and descriptions; the last may be partial"),
+    type: Optional[str] = Query(None, description="Only items of this type (Product or Event)"),
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    item_service: ItemService = Depends(get_item_service),
+):
+    """Ranked full-text search over the catalog, with type and price filters."""
+    return item_service.search_items(q, type, min_price, max_price, limit, offset)
+
+
+@app.get("/item/autocomplete", response_model=List[ItemSuggestion])
+def autocomplete_items(
+    q: str = Query(..., min_length=1, description="What the user has typed so far"),
+    limit: int = Query(10, ge=1, le=50),
+    item_service: ItemService = Depends(get_item_service),
+):
+    """Item names matching a partially typed query, best first."""
+    return item_service.autocomplete(q, limit)
+
+
+@app.post("/item/bulk", response_model=ItemBulkResult)
+async def bulk_create_items(request: Request, item_service: ItemService = Depends(get_item_service)):
+    """Create many items from a JSON array or an NDJSON stream, reporting rejected rows by index."""
+    result = ItemBulkResult()
+    async for offset, rows in iter_bulk_batches(request):
+        result = result.merge(await run_in_threadpool(item_service.bulk_create_items, rows, offset))
+    return result
+
+
+@app.put("/item/bulk", response_model=ItemBulkResult)
+async def bulk_update_items(request: Request, item_service: ItemService = Depends(get_item_service)):
+    """Update many items (each row with its `id`) from a JSON array or an NDJSON stream."""
+    result = ItemBulkResult()
+    async for offset, rows in iter_bulk_batches(request):
+        result = result.merge(await run_in_threadpool(item_service.bulk_update_items, rows, offset))
+    return result
 
 
 @app.get("/item/{item_id}", response_model=ItemDisplay)
@@ -49,10 +166,41 @@ def update_item(item_id: int, item_update: ItemUpdate, item_service: ItemService
     return updated_item
 
 
+@app.put("/item/{item_id}/stock_shards", response_model=ItemDisplay)
+def set_item_stock_shards(
+    item_id: int, stock_shards: ItemStockShards, item_service: ItemService = Depends(get_item_service)
+):
+    item = item_service.set_stock_shards(item_id, stock_shards.shards)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
+
+
+@app.put("/item/{item_id}/stock_journal", response_model=ItemDisplay)
+def set_item_stock_journal(
+    item_id: int, stock_journal: ItemStockJournal, item_service: ItemService = Depends(get_item_service)
+):
+    item = item_service.set_stock_journal(item_id, stock_journal.enabled)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
+
+
+@app.get("/item/{item_id}/stock_movements", response_model=List[StockMovementDisplay])
+def list_stock_movements(
+    item_id: int,
+    after_id: Optional[int] = Query(None, description="Only return movements after this one"),
+    limit: int = Query(100, gt=0, le=1000, description="Maximum number of movements to return"),
+    stock_journal: IStockJournalRepository = Depends(get_stock_journal_repository),
+):
+    """The stock journal of an item, oldest first. Only journaled items record movements."""
+    return stock_journal.movements(item_id, after_id=after_id, limit=limit)
+
+
 @app.delete("/item/{item_id}", status_code=200)
-def delete_item(item_id: int, item_repo: IItemRepository = Depends(get_item_repository)):
+def delete_item(item_id: int, item_service: ItemService = Depends(get_item_service)):
     try:
-        item_repo.delete(item_id=item_id)
+        item_service.delete_item(item_id=item_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     return {"message": "Item deleted successfully"}
@@ -65,29 +213,69 @@ def create_empty_cart(cart_repo: ICartRepository = Depends(get_cart_repository))
 
 
 @app.get("/cart/all", response_model=List[CartDisplay])
-def list_all_carts(cart_service: CartService = Depends(get_cart_service)):
-    return cart_service.list_carts_with_details()
+def list_all_carts(
+    after_id: Optional[int] = Query(None, description="Only return carts with an ID greater than this one"),
+    limit: Optional[int] = Query(None, gt=0, description="Maximum number of carts to return"),
+    stream: bool = Query(False, description="Stream the carts as NDJSON, one invoice per line"),
+    cart_service: CartService = Depends(get_cart_service),
+):
+    if stream:
+        carts = cart_service.stream_carts_with_details(after_id=after_id, limit=limit)
+        return StreamingResponse((cart.model_dump_json() + "\n" for cart in carts), media_type="application/x-ndjson")
+    if fast_json.config.enabled:
+        return fast_json.json_response(cart_service.list_cart_rows(after_id=after_id, limit=limit))
+    return cart_service.list_carts_with_details(after_id=after_id, limit=limit)
 
 
-@app.get("/cart/{cart_id}", response_model=CartDisplay)
-def read_cart(cart_id: int, cart_service: CartService = Depends(get_cart_service)):
-    return cart_service.get_cart_details(cart_id)
+@app.get("/cart/stats", response_model=CartStats)
+def cart_stats(
+    top: int = Query(10, ge=0, le=100, description="How many of the most valuable carts to list"),
+    cart_service: CartService = Depends(get_cart_service),
+):
+    """Cart-wide totals computed by aggregate queries in the database."""
+    return cart_service.get_cart_stats(top=top)
 
 
 @app.get("/cart/{cart_id}", response_model=CartDisplay)
-def read_cart(cart_id: int, cart_service: CartService = Depends(get_cart_service)):
-    return cart_service.get_cart_details(cart_id)
+def read_cart(cart_id: int, response: Response, cart_service: CartService = Depends(get_cart_service)):
+    """The cart invoice, with the cart version as its ETag; send it back as If-Match to update the cart safely."""
+    if fast_json.config.enabled:
+        cart_row, version = cart_service.get_versioned_cart_row(cart_id)
+        return fast_json.json_response(cart_row, headers={"ETag": cart_etag(version)})
+    cart_display, version = cart_service.get_versioned_cart_details(cart_id)
+    response.headers["ETag"] = cart_etag(version)
+    return cart_display
+
 
 @app.post("/cart/{cart_id}/add", response_model=CartItemDisplay)
 def add_item_to_cart(
-    cart_id: int, cart_item: CartItemCreate, cart_service: CartService = Depends(get_cart_service)
+    cart_id: int,
+    cart_item: CartItemCreate,
+    if_match: Optional[str] = Header(None),
+    cart_service: CartService = Depends(get_cart_service),
+):
+    return cart_service.add_item_to_cart(cart_id, cart_item.item_id, cart_item.quantity, if_match_version(if_match))
+
+
+@app.post("/cart/{cart_id}/ops", response_model=CartDisplay)
+def apply_cart_operations(
+    cart_id: int,
+    request: CartOperationsRequest,
+    if_match: Optional[str] = Header(None),
+    cart_service: CartService = Depends(get_cart_service),
 ):
-    return cart_service.add_item_to_cart(cart_id, cart_item.item_id, cart_item.quantity)
+    """Apply many add/remove/set operations to a cart in one transaction and return the updated cart."""
+    return cart_service.apply_cart_operations(cart_id, request.operations, if_match_version(if_match))
 
 
 @app.delete("/cart/{cart_id}/remove", status_code=200)
 def remove_item_from_cart(
-    cart_id: int, remove_request: CartItemRemoveRequest, cart_service: CartService = Depends(get_cart_service)
+    cart_id: int,
+    remove_request: CartItemRemoveRequest,
+    if_match: Optional[str] = Header(None),
+    cart_service: CartService = Depends(get_cart_service),
 ):
-    cart_service.remove_item_from_cart(cart_id, remove_request.item_id, remove_request.quantity)
+    cart_service.remove_item_from_cart(
+        cart_id, remove_request.item_id, remove_request.quantity, if_match_version(if_match)
+    )
     return {"message": "Item(s) removed successfully"}
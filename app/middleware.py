@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import os
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+
+from infrastructure import instrumentation
+from infrastructure.idempotency import IdempotencyStore, StoredResponse
+from infrastructure.instrumentation import RequestStats, current_request_stats
+
+MUTATING_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+MAX_KEY_LENGTH = 255
+# Seconds a request waits for a concurrent request with the same Idempotency-Key to finish.
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "10"))
+
+
+class RequestMetricsMiddleware:
+    """Times every HTTP request and counts its SQL statements, recording both per route template.
+
+    A plain ASGI middleware (not BaseHTTPMiddleware), so the handler runs in the same context
+    and the statements it issues, including from the sync threadpool, land in this request's stats.
+    """
+
+    def __init__(self, app, registry: instrumentation.MetricsRegistry = instrumentation.registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                if instrumentation.config.server_timing:
+                    app_ms = (time.perf_counter() - started) * 1000
+                    db_ms = stats.query_seconds * 1000
+                    value = f'app;dur={app_ms:.1f}, db;dur={db_ms:.1f};desc="{stats.query_count} queries"'
+                    headers.append((b"server-timing", value.encode()))
+                if instrumentation.config.query_count_header:
+                    headers.append((b"x-query-count", str(stats.query_count).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request_stats.reset(token)
+            route = scope.get("route")
+            # Unmatched paths share one label, so scanners cannot blow up the metric cardinality.
+            path = route.path if route is not None else "<unmatched>"
+            self.registry.observe(scope["method"], path, status, time.perf_counter() - started, stats)
+
+
+class IdempotencyMiddleware:
+    """Replays the stored response of cart mutations retried with the same Idempotency-Key header.
+
+    The first request with a key claims it and runs; its response (unless a 5xx) is stored and
+    replayed to later requests with that key and the same method, path and body, with an
+    `Idempotent-Replayed: true` header. A request arriving while the first is still running waits
+    up to `wait` seconds for its response, then gets 409. Reusing a key for a different request
+    is a 422.
+    """
+
+    def __init__(self, app, store: IdempotencyStore, path_prefix: str = "/cart", wait: float = IDEMPOTENCY_WAIT):
+        self.app = app
+        self.store = store
+        self.path_prefix = path_prefix
+        self.wait = wait
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+        key = Headers(scope=scope).get("idempotency-key")
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(key) <= MAX_KEY_LENGTH:
+            await JSONResponse({"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"}, 400)(scope, receive, send)
+            return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        fingerprint = hashlib.sha256(
+            b"\n".join([scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body])
+        ).hexdigest()
+
+        stored = await run_in_threadpool(self.store.begin, key, fingerprint)
+        deadline = time.monotonic() + self.wait
+        while stored is not None and stored.in_progress and stored.fingerprint == fingerprint and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            stored = await run_in_threadpool(self.store.begin, key, fingerprint)
+        if stored is not None:
+            await self.replay(stored, fingerprint, scope, receive, send)
+            return
+
+        replayed_body = False
+
+        async def receive_body():
+            nonlocal replayed_body
+            if replayed_body:
+                return await receive()
+            replayed_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        status = 500
+        content_type = None
+        chunks = []
+
+        async def send_and_capture(message):
+            nonlocal status, content_type
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = Headers(raw=message.get("headers", [])).get("content-type")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_and_capture)
+        except BaseException:
+            await run_in_threadpool(self.store.abandon, key)
+            raise
+        if status >= 500:
+            await run_in_threadpool(self.store.abandon, key)
+        else:
+            await run_in_threadpool(self.store.complete, key, fingerprint, status, content_type, b"".join(chunks))
+
+    @staticmethod
+    async def replay(stored: StoredResponse, fingerprint: str, scope, receive, send):
+        if stored.fingerprint != fingerprint:
+            response = JSONResponse({"detail": "Idempotency-Key was already used for a different request"}, 422)
+        elif stored.in_progress:
+            response = JSONResponse({"detail": "A request with this Idempotency-Key is still being processed"}, 409)
+        else:
+            response = Response(
+                stored.body,
+                status_code=stored.status_code,
+                media_type=stored.content_type,
+                headers={"Idempotent-Replayed": "true"},
+            )
+        await response(scope, receive, send)
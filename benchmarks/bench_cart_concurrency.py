@@ -0,0 +1,126 @@
+"""Benchmark concurrent cart updates: optimistic If-Match versions vs SELECT ... FOR UPDATE row locks.
+
+Every client repeatedly reads a random cart, waits --think-ms (the client deciding what to do,
+or other work in the request), then adds one unit to it:
+
+  optimistic  reads the cart version without a lock and sends it as the expected version;
+              a 412 means another client changed the cart first, and the client starts over.
+  for update  locks the cart row with SELECT ... FOR UPDATE before the wait and adds while
+              holding it, so clients updating the same cart queue behind each other.
+
+SQLite ignores FOR UPDATE and locks the whole database on write, so only a PostgreSQL
+DATABASE_URL shows the difference. Run from the project root:
+
+    python -m benchmarks.bench_cart_concurrency --database-url postgresql://... [--clients 32] [--carts 8] [--think-ms 5]
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from domain.models import Base, Cart, CartItem, Item
+from domain.service import CartService
+from infrastructure.database import create_db_engine
+from infrastructure.repository import CartRepository, ItemRepository
+
+MODES = ("optimistic", "for update")
+
+
+def add_one(db, mode, cart_id, item_id, think):
+    """One read-think-add cycle; False when the add lost to a concurrent change and must be retried."""
+    cart_service = CartService(CartRepository(db), ItemRepository(db))
+    if mode == "optimistic":
+        version = cart_service.get_cart_version(cart_id)
+        db.commit()
+        time.sleep(think)
+        try:
+            cart_service.add_item_to_cart(cart_id, item_id, 1, expected_version=version)
+        except HTTPException as exc:
+            if exc.status_code != 412:
+                raise
+            return False
+        return True
+    db.execute(select(Cart.id).where(Cart.id == cart_id).with_for_update())
+    time.sleep(think)
+    cart_service.add_item_to_cart(cart_id, item_id, 1)
+    return True
+
+
+def run(Session, mode, carts, clients, seconds, think):
+    added, conflicts, latencies = [0] * clients, [0] * clients, [[] for _ in range(clients)]
+    barrier = threading.Barrier(clients + 1)
+    deadline = []
+
+    def client(n):
+        rng = random.Random(n)
+        barrier.wait()
+        with Session() as db:
+            while time.perf_counter() < deadline[0]:
+                cart_id, item_id = rng.choice(carts)
+                start = time.perf_counter()
+                while True:
+                    try:
+                        if add_one(db, mode, cart_id, item_id, think):
+                            break
+                    except OperationalError:
+                        # SQLite reports a locked database instead of waiting.
+                        db.rollback()
+                    conflicts[n] += 1
+                latencies[n].append(time.perf_counter() - start)
+                added[n] += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    deadline.append(time.perf_counter() + seconds)
+    start = time.perf_counter()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    return sum(added), sum(conflicts), sorted(sum(latencies, [])), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench_cart_concurrency.db")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--carts", type=int, default=8, help="carts the clients share; fewer carts, more contention")
+    parser.add_argument("--think-ms", type=float, default=5)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    connect_args = {"check_same_thread": False, "timeout": 30} if args.database_url.startswith("sqlite") else {}
+    engine = create_db_engine(args.database_url, pool_size=args.clients, max_overflow=0, connect_args=connect_args)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    print(f"{args.clients} clients on {args.carts} carts, {args.think_ms:g} ms think time, {args.seconds:g} s per run")
+    print(f"{'mode':>11} {'adds':>7} {'retries':>8} {'adds/s':>8} {'p50 ms':>7} {'p99 ms':>7}")
+    for mode in MODES:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        with Session() as db:
+            # One item per cart, so clients contend on carts rather than on a single item's stock row.
+            items = [Item(name=f"Ticket {n}", price=25, description="General admission", thumbnail="t.jpg",
+                          stock=10_000_000, type="Event") for n in range(args.carts)]
+            carts = [Cart() for _ in range(args.carts)]
+            db.add_all([*items, *carts])
+            db.commit()
+            pairs = [(cart.id, item.id) for cart, item in zip(carts, items)]
+        added, retries, latencies, elapsed = run(Session, mode, pairs, args.clients, args.seconds, args.think_ms / 1000)
+        with Session() as db:
+            assert sum(db.scalars(select(CartItem.quantity))) == added
+        p50 = statistics.median(latencies) * 1000 if latencies else 0
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+        print(f"{mode:>11} {added:>7} {retries:>8} {added / elapsed:>8.0f} {p50:>7.1f} {p99:>7.1f}")
+
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark GET /cart/{cart_id} invoice building: lazy N+2 lookups vs the single joined query.
+
+Run from the project root:
+
+    python -m benchmarks.bench_cart_details [--database-url sqlite:///./bench.db] [--repeat 20]
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import sessionmaker
+
+from domain.models import Base, Cart, CartItem, Item
+from infrastructure.repository import CartRepository, ItemRepository, build_cart_display
+
+CART_SIZES = (1, 50, 500)
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def seed(session, sizes):
+    items = [
+        Item(name=f"Item {i}", price=1.5 + i, description="bench", thumbnail="bench.jpg", stock=1000, type="Product")
+        for i in range(max(sizes))
+    ]
+    session.add_all(items)
+    session.flush()
+    cart_ids = {}
+    for size in sizes:
+        cart = Cart()
+        session.add(cart)
+        session.flush()
+        session.add_all(CartItem(cart_id=cart.id, item_id=item.id, quantity=2) for item in items[:size])
+        cart_ids[size] = cart.id
+    # Mark every cart stale, then fill in the stored totals the app would have maintained.
+    session.execute(update(Cart).values(total=None))
+    session.commit()
+    CartRepository(session).refresh_cart_totals()
+    return cart_ids
+
+
+def legacy_cart_details(cart_repo, item_repo, cart_id):
+    """The pre-join implementation: cart, lazy cart.items, then one item lookup per line."""
+    cart = cart_repo.get(cart_id)
+    lines = []
+    for cart_item in cart.items:
+        item = item_repo.get(cart_item.item_id)
+        if item:
+            lines.append((cart_item.quantity, item))
+    return build_cart_display(cart.id, lines)
+
+
+def measure(Session, counter, fn, repeat):
+    queries, elapsed = 0, 0.0
+    for _ in range(repeat):
+        session = Session()
+        try:
+            counter.count = 0
+            start = time.perf_counter()
+            fn(session)
+            elapsed += time.perf_counter() - start
+            queries = counter.count
+        finally:
+            session.close()
+    return queries, elapsed / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench_cart_details.db")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with Session() as session:
+        cart_ids = seed(session, CART_SIZES)
+
+    counter = QueryCounter(engine)
+    print(f"{'lines':>6} {'legacy queries':>15} {'legacy ms':>10} {'joined queries':>15} {'joined ms':>10}")
+    for size, cart_id in cart_ids.items():
+        legacy = measure(
+            Session, counter, lambda s: legacy_cart_details(CartRepository(s), ItemRepository(s), cart_id), args.repeat
+        )
+        joined = measure(Session, counter, lambda s: CartRepository(s).get_cart_display(cart_id), args.repeat)
+        print(f"{size:>6} {legacy[0]:>15} {legacy[1]:>10.2f} {joined[0]:>15} {joined[1]:>10.2f}")
+
+    Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
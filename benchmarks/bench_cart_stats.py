@@ -0,0 +1,77 @@
+"""Benchmark cart-wide totals: SQL aggregation (GET /cart/stats) vs loading every invoice (GET /cart/all).
+
+Run from the project root; use a PostgreSQL DATABASE_URL and millions of lines for production-like numbers:
+
+    python -m benchmarks.bench_cart_stats [--carts 20000] [--lines 10] [--items 2000]
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import sessionmaker
+
+from domain.models import Base, Cart, CartItem
+from infrastructure.database import create_db_engine
+from infrastructure.repository import CartRepository
+from populate_db import bulk_populate, synthetic_items
+
+
+def seed(Session, n_items, n_carts, lines_per_cart):
+    rng = random.Random(0)
+    with Session() as session:
+        bulk_populate(session, synthetic_items(n_items))
+        session.execute(insert(Cart), [{} for _ in range(n_carts)])
+        session.execute(
+            insert(CartItem),
+            [
+                {"cart_id": cart_id, "item_id": item_id, "quantity": rng.randint(1, 3)}
+                for cart_id in range(1, n_carts + 1)
+                for item_id in rng.sample(range(1, n_items + 1), lines_per_cart)
+            ],
+        )
+        # Mark every cart stale, then fill in the stored totals the app would have maintained.
+        session.execute(update(Cart).values(total=None))
+        session.commit()
+        CartRepository(session).refresh_cart_totals()
+
+
+def timed(Session, fn):
+    with Session() as session:
+        start = time.perf_counter()
+        result = fn(CartRepository(session))
+        return result, (time.perf_counter() - start) * 1000
+
+
+def totals_from_listing(cart_repo):
+    carts = cart_repo.list_cart_displays()
+    return len(carts), sum(cart.total for cart in carts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench_cart_stats.db")
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--carts", type=int, default=20000)
+    parser.add_argument("--lines", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_db_engine(args.database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    seed(Session, args.items, args.carts, args.lines)
+
+    stats, stats_ms = timed(Session, lambda cart_repo: cart_repo.cart_stats(top=10))
+    (count, total), listing_ms = timed(Session, totals_from_listing)
+    assert (stats.cart_count, stats.total_value) == (count, total)
+    print(f"{args.carts * args.lines} cart lines, {args.carts} carts")
+    print(f"{'aggregate /cart/stats':>24} {stats_ms:>10.1f} ms")
+    print(f"{'summing /cart/all':>24} {listing_ms:>10.1f} ms")
+
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark CPU per request of the hot reads: response_model validation vs the FAST_JSON row path.
+
+Each case runs the service call and the JSON encoding the route would do, in process, and
+reports CPU time (not wall time) per request. Run from the project root:
+
+    python -m benchmarks.bench_fast_json [--items 2000] [--carts 2000] [--lines 10] [--repeat 20]
+"""
+import argparse
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import sessionmaker
+
+from app import fast_json
+from benchmarks.bench_cart_stats import seed
+from domain.models import Base
+from domain.service import CartService, ItemService
+from infrastructure.database import create_db_engine
+from infrastructure.repository import CartRepository, ItemRepository
+from schemas.cart import CartDisplay
+from schemas.item import ItemDisplay
+
+item_list_adapter = TypeAdapter(List[ItemDisplay])
+cart_list_adapter = TypeAdapter(List[CartDisplay])
+PAGE = 100
+
+
+def cases(cart_id):
+    """(label, response_model path, fast path), each taking (item_service, cart_service) and returning the body."""
+    return [
+        (
+            "GET /item/all (cache miss)",
+            lambda items, carts: item_list_adapter.dump_json(
+                item_list_adapter.validate_python(items.item_repo.list(), from_attributes=True)
+            ),
+            lambda items, carts: fast_json.dumps(items.list_items_page()),
+        ),
+        (
+            f"GET /cart/all?limit={PAGE}",
+            lambda items, carts: cart_list_adapter.dump_json(
+                cart_list_adapter.validate_python(carts.list_carts_with_details(limit=PAGE), from_attributes=True)
+            ),
+            lambda items, carts: fast_json.dumps(carts.list_cart_rows(limit=PAGE)),
+        ),
+        (
+            "GET /cart/{cart_id}",
+            lambda items, carts: CartDisplay.model_validate(carts.get_cart_details(cart_id)).model_dump_json().encode(),
+            lambda items, carts: fast_json.dumps(carts.get_cart_row(cart_id)),
+        ),
+    ]
+
+
+def cpu_ms(Session, fn, repeat):
+    with Session() as session:
+        item_repo = ItemRepository(session)
+        services = ItemService(item_repo), CartService(CartRepository(session), item_repo)
+        body = fn(*services)
+        start = time.process_time()
+        for _ in range(repeat):
+            fn(*services)
+        return body, (time.process_time() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench_fast_json.db")
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--carts", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_db_engine(args.database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    seed(Session, args.items, args.carts, args.lines)
+
+    print(f"{args.items} items, {args.carts} carts of {args.lines} lines; encoder: {'orjson' if fast_json.orjson else 'json'}")
+    print(f"{'request':>28} {'model cpu ms':>13} {'fast cpu ms':>12} {'saved':>7} {'identical':>10}")
+    for label, model_path, fast_path in cases(cart_id=args.carts // 2):
+        model_body, model_ms = cpu_ms(Session, model_path, args.repeat)
+        fast_body, fast_ms = cpu_ms(Session, fast_path, args.repeat)
+        saved = 1 - fast_ms / model_ms
+        print(f"{label:>28} {model_ms:>13.2f} {fast_ms:>12.2f} {saved:>7.0%} {str(model_body == fast_body):>10}")
+
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
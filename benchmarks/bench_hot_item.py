@@ -0,0 +1,106 @@
+"""Benchmark reservations per second on a single hot item: stock on one row, spread over shards, or journaled.
+
+Every client thread reserves one unit at a time, each in its own transaction, as add-to-cart does.
+`row writes` counts the stock row versions written, which PostgreSQL has to vacuum: one per
+reservation on the item row or a shard, one per compaction for a journaled item (compacted every
+--compact-interval seconds during the run). SQLite locks the whole database on write, so only a
+PostgreSQL DATABASE_URL shows the row-lock contention that sharding removes. Run from the project root:
+
+    python -m benchmarks.bench_hot_item --database-url postgresql://... [--clients 32] [--shards 16] [--seconds 5]
+"""
+import argparse
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from domain.models import Base, Item
+from infrastructure.database import create_db_engine
+from infrastructure.repository import ItemRepository
+from infrastructure.stock_journal import StockCompactor
+
+
+def run(Session, item_id, clients, seconds, compactor=None, compact_interval=1.0):
+    reserved, retries = [0] * clients, [0] * clients
+    barrier = threading.Barrier(clients + 1)
+    deadline = []
+
+    def client(n):
+        barrier.wait()
+        with Session() as db:
+            item_repo = ItemRepository(db)
+            while time.perf_counter() < deadline[0]:
+                try:
+                    if item_repo.reserve_stock(item_id, 1) is None:
+                        break
+                    db.commit()
+                    reserved[n] += 1
+                except OperationalError:
+                    # SQLite reports a locked database instead of waiting.
+                    db.rollback()
+                    retries[n] += 1
+
+    def compact():
+        barrier.wait()
+        while time.perf_counter() < deadline[0]:
+            time.sleep(compact_interval)
+            try:
+                compactor.run()
+            except OperationalError:
+                pass
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    if compactor is not None:
+        barrier = threading.Barrier(clients + 2)
+        threads.append(threading.Thread(target=compact))
+    for thread in threads:
+        thread.start()
+    deadline.append(time.perf_counter() + seconds)
+    start = time.perf_counter()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    return sum(reserved), sum(retries), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench_hot_item.db")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--compact-interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    connect_args = {"check_same_thread": False, "timeout": 30} if args.database_url.startswith("sqlite") else {}
+    engine = create_db_engine(args.database_url, pool_size=args.clients + 1, max_overflow=0, connect_args=connect_args)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    print(f"{args.clients} clients, {args.seconds:g} s per run")
+    print(f"{'layout':>10} {'reserved':>9} {'retries':>8} {'reservations/s':>15} {'row writes':>11}")
+    for layout in ("row", f"{args.shards} shards", "journal"):
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        with Session() as db:
+            item = Item(name="Hot Event", price=50, description="On sale now", thumbnail="hot.jpg",
+                        stock=10_000_000, type="Event")
+            db.add(item)
+            db.commit()
+            item_id = item.id
+            if layout.endswith("shards"):
+                ItemRepository(db).set_stock_shards(item_id, args.shards)
+            elif layout == "journal":
+                ItemRepository(db).set_stock_journal(item_id, True)
+        compactor = StockCompactor(Session) if layout == "journal" else None
+        reserved, retries, elapsed = run(Session, item_id, args.clients, args.seconds, compactor, args.compact_interval)
+        with Session() as db:
+            assert db.get(Item, item_id).available_stock == 10_000_000 - reserved
+        row_writes = compactor.items_compacted if compactor else reserved
+        print(f"{layout:>10} {reserved:>9} {retries:>8} {reserved / elapsed:>15.0f} {row_writes:>11}")
+
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
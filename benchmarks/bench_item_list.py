@@ -0,0 +1,81 @@
+"""Benchmark GET /item/all bodies: the full catalog of ORM items vs keyset pages of projected columns.
+
+Times the repository read plus JSON serialization, as the route does, and reports payload size.
+Run from the project root; use a PostgreSQL DATABASE_URL for production-like numbers:
+
+    python -m benchmarks.bench_item_list [--items 100000] [--limit 100] [--repeat 5]
+"""
+import argparse
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import sessionmaker
+
+from domain.models import Base
+from infrastructure.database import create_db_engine
+from infrastructure.repository import ItemRepository
+from populate_db import bulk_populate, synthetic_items
+from schemas.item import ItemDisplay, ItemProjection
+
+LISTING_FIELDS = ("id", "name", "price", "thumbnail", "stock")
+
+item_list_adapter = TypeAdapter(List[ItemDisplay])
+item_projection_adapter = TypeAdapter(List[ItemProjection])
+
+
+def full_catalog(item_repo, args):
+    return item_list_adapter.dump_json(item_list_adapter.validate_python(item_repo.list(), from_attributes=True))
+
+
+def projected_catalog(item_repo, args):
+    rows = item_repo.list_page(fields=LISTING_FIELDS)
+    return item_projection_adapter.dump_json(item_projection_adapter.validate_python(rows), exclude_unset=True)
+
+
+def projected_page(item_repo, args):
+    rows = item_repo.list_page(after_id=args.items // 2, limit=args.limit, fields=LISTING_FIELDS, sort="price")
+    return item_projection_adapter.dump_json(item_projection_adapter.validate_python(rows), exclude_unset=True)
+
+
+def timed(Session, fn, args):
+    best = float("inf")
+    for _ in range(args.repeat):
+        with Session() as session:
+            start = time.perf_counter()
+            body = fn(ItemRepository(session), args)
+            best = min(best, time.perf_counter() - start)
+    return body, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench_item_list.db")
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_db_engine(args.database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with Session() as session:
+        bulk_populate(session, synthetic_items(args.items))
+
+    print(f"{args.items} items, best of {args.repeat}")
+    print(f"{'body':>32} {'ms':>10} {'bytes':>12}")
+    for label, fn in [
+        ("full catalog, all columns", full_catalog),
+        (f"full catalog, {len(LISTING_FIELDS)} fields", projected_catalog),
+        (f"page of {args.limit} by price", projected_page),
+    ]:
+        body, ms = timed(Session, fn, args)
+        print(f"{label:>32} {ms:>10.1f} {len(body):>12}")
+
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
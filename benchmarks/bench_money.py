@@ -0,0 +1,71 @@
+"""Benchmark invoice math: the float loop it replaced, per-step Decimal rounding, and domain.money.
+
+Also checks that domain.money.invoice is byte-identical to the Decimal reference and counts
+how many float totals drift from it. Run from the project root:
+
+    python -m benchmarks.bench_money [--repeat 50]
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from domain import money
+
+CART_SIZES = (1, 50, 500, 5000)
+PAGE_CARTS, PAGE_LINES = 500, 10
+
+
+def float_loop(quantities, prices):
+    """The pre-Decimal implementation: float products summed with +=."""
+    subtotals, total = [], 0
+    for quantity, price in zip(quantities, prices):
+        subtotal = quantity * price
+        total += subtotal
+        subtotals.append(subtotal)
+    return subtotals, total
+
+
+def timed(fn, args, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def page_totals(carts):
+    """Every cart of a /cart/all page in one batched pass, as build_cart_displays does."""
+    quantities = [quantity for cart_quantities, _ in carts for quantity in cart_quantities]
+    prices = [price for _, cart_prices in carts for price in cart_prices]
+    return money.group_totals(money.line_subtotals(quantities, prices), [len(q) for q, _ in carts])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    print(f"{'lines':>6} {'float ms':>9} {'decimal ms':>11} {'money ms':>9} {'identical':>10} {'float drift':>12}")
+    for size in CART_SIZES:
+        quantities = [rng.randint(1, 5) for _ in range(size)]
+        prices = [Decimal(rng.randint(1, 50000)).scaleb(-2) for _ in range(size)]
+        float_prices = [float(price) for price in prices]
+        (_, float_total), float_ms = timed(float_loop, (quantities, float_prices), args.repeat)
+        reference, decimal_ms = timed(money.reference_invoice, (quantities, prices), args.repeat)
+        result, money_ms = timed(money.invoice, (quantities, prices), args.repeat)
+        identical = [str(x) for x in result[0]] + [str(result[1])] == [str(x) for x in reference[0]] + [str(reference[1])]
+        drift = str(float_total) != str(float(reference[1]))
+        print(f"{size:>6} {float_ms:>9.3f} {decimal_ms:>11.3f} {money_ms:>9.3f} {str(identical):>10} {str(drift):>12}")
+
+    carts = [
+        ([rng.randint(1, 5) for _ in range(PAGE_LINES)], [Decimal(rng.randint(1, 50000)).scaleb(-2) for _ in range(PAGE_LINES)])
+        for _ in range(PAGE_CARTS)
+    ]
+    _, per_cart_ms = timed(lambda: [money.invoice(q, p) for q, p in carts], (), args.repeat)
+    _, batched_ms = timed(page_totals, (carts,), args.repeat)
+    print(f"/cart/all page of {PAGE_CARTS} carts: per-cart {per_cart_ms:.3f} ms, batched {batched_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
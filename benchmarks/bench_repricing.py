@@ -0,0 +1,90 @@
+"""Benchmark repricing the carts of an item after a price change, in carts repriced per second.
+
+Seeds --carts carts that all hold one item, changes its price and times:
+
+  update      the price change itself, which only writes the item and one outbox event
+  batch=N     the CartRepricer working the event off N carts per transaction
+  one UPDATE  recomputing every affected cart in a single statement, for comparison; it
+              holds locks on all of those carts until it commits
+
+Run from the project root:
+
+    python -m benchmarks.bench_repricing [--database-url postgresql://...] [--carts 20000] [--batch-sizes 100 500 2000]
+"""
+import argparse
+import time
+from decimal import Decimal
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+from domain.models import Base, Cart, CartItem, Item
+from infrastructure.database import create_db_engine
+from infrastructure.repository import ItemRepository, bump_cart_version, refresh_cart_totals_query
+from infrastructure.repricing import CartRepricer
+
+
+def seed(Session, carts):
+    with Session() as db:
+        item = Item(name="Season pass", price=Decimal("100.00"), description="All games", thumbnail="p.jpg",
+                    stock=10_000_000, type="Product")
+        filler = Item(name="Scarf", price=Decimal("20.00"), description="Team colours", thumbnail="s.jpg",
+                      stock=10_000_000, type="Product")
+        db.add_all([item, filler])
+        db.flush()
+        db.execute(insert(Cart), [{"total": Decimal("120.00"), "line_count": 2, "version": 0} for _ in range(carts)])
+        cart_ids = db.scalars(select(Cart.id)).all()
+        db.execute(insert(CartItem), [
+            {"cart_id": cart_id, "item_id": item_id, "quantity": 1}
+            for cart_id in cart_ids for item_id in (item.id, filler.id)
+        ])
+        db.commit()
+        return item.id
+
+
+def change_price(Session, item_id, price):
+    start = time.perf_counter()
+    with Session() as db:
+        ItemRepository(db).update(item_id, {"price": price})
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench_repricing.db")
+    parser.add_argument("--carts", type=int, default=20_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 500, 2000])
+    args = parser.parse_args()
+
+    engine = create_db_engine(args.database_url)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    item_id = seed(Session, args.carts)
+    print(f"{args.carts} carts holding the repriced item")
+    print(f"{'run':>12} {'batches':>8} {'seconds':>8} {'carts/s':>9}")
+
+    price = Decimal("100.00")
+    for batch_size in args.batch_sizes:
+        price += 1
+        elapsed = change_price(Session, item_id, price)
+        print(f"{'update':>12} {'':>8} {elapsed:>8.4f} {'':>9}")
+        repricer = CartRepricer(Session, batch_size=batch_size, max_batches=args.carts)
+        report = repricer.run()
+        assert report.carts == args.carts and repricer.pending() == 0
+        print(f"{f'batch={batch_size}':>12} {report.batches:>8} {report.seconds:>8.3f} {report.carts_per_second:>9.0f}")
+
+    with Session() as db:
+        cart_ids = db.scalars(select(CartItem.cart_id).where(CartItem.item_id == item_id)).all()
+        start = time.perf_counter()
+        db.execute(bump_cart_version(refresh_cart_totals_query(cart_ids)))
+        db.commit()
+        elapsed = time.perf_counter() - start
+    print(f"{'one UPDATE':>12} {1:>8} {elapsed:>8.3f} {len(cart_ids) / elapsed:>9.0f}")
+
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
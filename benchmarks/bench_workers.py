@@ -0,0 +1,71 @@
+"""Benchmark cart endpoint throughput with serve.py at 1, 2 and N worker processes.
+
+Seeds the database once, then for each worker count starts `serve.py --workers N` and drives
+the cart scenarios of load_suite from concurrent local clients. The clients share the box with
+the workers, so leave cores free for them; use a PostgreSQL DATABASE_URL, as SQLite serializes
+the cart_add writes of every worker on one file lock. Run from the project root:
+
+    python -m benchmarks.bench_workers [--workers 1 2 8] [--clients 64] [--duration 10]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_async_load import wait_until_up
+from benchmarks.load_suite import drive, seed, summarize
+
+CART_SCENARIOS = ("cart_get", "cart_list", "cart_add")
+
+
+def measure(args, workers):
+    env = {**os.environ, "DATABASE_URL": args.database_url}
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(args.port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        wait_until_up(base_url)
+        return {
+            scenario: summarize(
+                *asyncio.run(drive(base_url, scenario, args.clients, args.duration, args.items, args.carts)), args.duration
+            )
+            for scenario in args.scenarios
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./bench_workers.db"))
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument("--scenarios", nargs="+", choices=CART_SCENARIOS, default=list(CART_SCENARIOS))
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--carts", type=int, default=1000)
+    parser.add_argument("--lines", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    seed(args.database_url, args.items, args.carts, args.lines)
+    results = {workers: measure(args, workers) for workers in args.workers}
+
+    baseline = results[args.workers[0]]
+    print(f"{args.clients} clients, {args.duration:.0f}s per scenario")
+    print(f"{'workers':>8} {'scenario':>10} {'req/s':>10} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for workers, scenarios in results.items():
+        for scenario, summary in scenarios.items():
+            speedup = summary["throughput_rps"] / baseline[scenario]["throughput_rps"] if baseline[scenario]["throughput_rps"] else 0
+            print(
+                f"{workers:>8} {scenario:>10} {summary['throughput_rps']:>10.1f} {speedup:>7.2f}x "
+                f"{summary['p50_ms']:>8.1f} {summary['p99_ms']:>8.1f} {summary['errors']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
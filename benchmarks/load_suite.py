@@ -0,0 +1,208 @@
+"""Load-test suite for the cart API: latency, throughput and SQL queries per request, saved as JSON.
+
+Seeds a catalog and carts at DATABASE_URL with the populate_db.py bulk path, starts the app
+under uvicorn and drives each scenario from concurrent local clients. Results are written to
+--output; with --baseline, the run fails (exit status 1) when a scenario's p99 latency, throughput
+or queries per request regress by more than --threshold. Run from the project root:
+
+    python -m benchmarks.load_suite --items 10000 --carts 2000 --output results.json
+    python -m benchmarks.load_suite --baseline results.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import insert, update
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_async_load import APPS, wait_until_up
+from domain.models import Base, Cart, CartItem
+from infrastructure.database import create_db_engine
+from infrastructure.repository import CartRepository
+from populate_db import bulk_populate, synthetic_items
+
+# (method, path template, JSON body template); {cart} and {item} are drawn at random per request.
+SCENARIOS = {
+    "item_list": ("GET", "/item/all", None),
+    "cart_get": ("GET", "/cart/{cart}", None),
+    "cart_add": ("POST", "/cart/{cart}/add", {"item_id": "{item}", "quantity": 1}),
+    "cart_list": ("GET", "/cart/all?limit=50", None),
+}
+# Lower is better for these metrics; higher is better for throughput.
+LOWER_IS_BETTER = ("p50_ms", "p99_ms", "queries_per_request")
+
+
+def seed(database_url, n_items, n_carts, lines_per_cart, seed_value=0):
+    engine = create_db_engine(database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    rng = random.Random(seed_value)
+    with sessionmaker(bind=engine)() as session:
+        # Stock high enough that cart_add never runs out during a run.
+        bulk_populate(session, ({**row, "stock": 10**9} for row in synthetic_items(n_items, seed_value)))
+        carts = [Cart() for _ in range(n_carts)]
+        session.add_all(carts)
+        session.flush()
+        lines = [
+            {"cart_id": cart.id, "item_id": item_id, "quantity": rng.randint(1, 3)}
+            for cart in carts
+            for item_id in rng.sample(range(1, n_items + 1), min(lines_per_cart, n_items))
+        ]
+        if lines:
+            session.execute(insert(CartItem), lines)
+        # Mark every cart stale, then fill in the stored totals the app would have maintained.
+        session.execute(update(Cart).values(total=None))
+        session.commit()
+        CartRepository(session).refresh_cart_totals()
+    engine.dispose()
+
+
+def render_request(scenario, n_items, n_carts, rng):
+    method, path, body = SCENARIOS[scenario]
+    values = {"cart": rng.randint(1, n_carts), "item": rng.randint(1, n_items)}
+    if body is not None:
+        body = {key: int(value.format(**values)) if isinstance(value, str) else value for key, value in body.items()}
+    return method, path.format(**values), body
+
+
+async def drive(base_url, scenario, clients, duration, n_items, n_carts, seed_value=0):
+    latencies, query_counts = [], []
+    errors = 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker(worker_id):
+            nonlocal errors
+            rng = random.Random(seed_value * 100003 + worker_id)
+            while time.perf_counter() < deadline:
+                method, url, body = render_request(scenario, n_items, n_carts, rng)
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, url, json=body)
+                    if response.status_code != 200:
+                        errors += 1
+                    elif "x-query-count" in response.headers:
+                        query_counts.append(int(response.headers["x-query-count"]))
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker(n) for n in range(clients)))
+    return latencies, query_counts, errors
+
+
+def summarize(latencies, query_counts, errors, duration):
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [latencies[0] if latencies else 0.0] * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / duration, 2),
+        "p50_ms": round(quantiles[49] * 1000, 3),
+        "p99_ms": round(quantiles[98] * 1000, 3),
+        "queries_per_request": round(statistics.fmean(query_counts), 3) if query_counts else None,
+    }
+
+
+def compare_results(baseline, current, threshold):
+    """Human-readable regressions of `current` against `baseline`: any metric worse by more than `threshold`."""
+    regressions = []
+    for scenario, before in baseline["scenarios"].items():
+        after = current["scenarios"].get(scenario)
+        if after is None:
+            continue
+        for metric in LOWER_IS_BETTER + ("throughput_rps",):
+            old, new = before.get(metric), after.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if metric == "throughput_rps":
+                change = -change
+            if change > threshold:
+                regressions.append(f"{scenario}: {metric} {old} -> {new} ({change:+.0%} worse)")
+    return regressions
+
+
+def run(args):
+    seed(args.database_url, args.items, args.carts, args.lines)
+    env = {**os.environ, "DATABASE_URL": args.database_url, "QUERY_COUNT_HEADER": "true"}
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", APPS[args.app], "--port", str(args.port), "--log-level", "warning"],
+        env=env,
+    )
+    scenarios = {}
+    try:
+        wait_until_up(base_url)
+        for scenario in args.scenarios:
+            latencies, query_counts, errors = asyncio.run(
+                drive(base_url, scenario, args.clients, args.duration, args.items, args.carts)
+            )
+            scenarios[scenario] = summarize(latencies, query_counts, errors, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "app": args.app,
+            "database": args.database_url.split("://")[0],
+            "python": platform.python_version(),
+            "clients": args.clients,
+            "duration": args.duration,
+            "items": args.items,
+            "carts": args.carts,
+            "lines": args.lines,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./load_suite.db"))
+    parser.add_argument("--app", choices=sorted(APPS), default="sync")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--carts", type=int, default=1000)
+    parser.add_argument("--lines", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", default="load_suite_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare this run against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+
+    print(f"{'scenario':>10} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7}")
+    for scenario, summary in results["scenarios"].items():
+        queries = summary["queries_per_request"]
+        print(
+            f"{scenario:>10} {summary['throughput_rps']:>10.1f} {summary['p50_ms']:>8.1f} {summary['p99_ms']:>8.1f} "
+            f"{queries if queries is not None else '-':>8} {summary['errors']:>7}"
+        )
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare_results(json.load(baseline_file), results, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Compare every cart's stored total and line count with a full recompute from its lines.
+
+Exits with status 1 when any cart disagrees. --fix recomputes those carts (and any stale ones).
+"""
+import argparse
+import sys
+
+from infrastructure.database import SessionLocal
+from infrastructure.repository import CartRepository
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fix", action="store_true", help="Rewrite the stored totals of mismatched and stale carts")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        cart_repo = CartRepository(db)
+        mismatches = cart_repo.check_cart_totals()
+        for mismatch in mismatches:
+            print(
+                f"cart {mismatch.cart_id}: stored total {mismatch.stored_total} over {mismatch.stored_line_count} lines, "
+                f"recomputed {mismatch.total} over {mismatch.line_count} lines"
+            )
+        if args.fix:
+            fixed = cart_repo.refresh_cart_totals([mismatch.cart_id for mismatch in mismatches]) if mismatches else 0
+            stale = cart_repo.refresh_cart_totals()
+            print(f"Recomputed {fixed} mismatched and {stale} stale carts")
+        elif mismatches:
+            sys.exit(1)
+        else:
+            print("All cart totals are consistent")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
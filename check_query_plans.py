@@ -0,0 +1,200 @@
+"""EXPLAIN every query issued by the repositories in infrastructure/repository.py and flag sequential scans.
+
+Builds a scratch database from the migrations at --database-url, seeds it, runs each
+repository method, and EXPLAINs every distinct statement they issued. The tables at
+--database-url are dropped, so it is required and may not be the application's DATABASE_URL.
+Exits with status 1 when a query reads a table of at least --min-rows rows in full, or when a
+repository method is missing from EXERCISES. Methods that read whole tables by design are
+listed in FULL_SCANS.
+
+    python check_query_plans.py --database-url postgresql://... [--items 20000] [--min-rows 1000]
+"""
+import argparse
+import random
+import sys
+from datetime import timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import sessionmaker
+
+from domain.models import Base, Cart, CartItem, Product
+from infrastructure.database import DATABASE_URL, create_db_engine
+from infrastructure.migrations import upgrade
+from infrastructure.query_plans import QueryRecorder, find_seq_scans
+from infrastructure.repository import (
+    CartRepository,
+    IdempotencyRepository,
+    ItemChangeRepository,
+    ItemRepository,
+    StockJournalRepository,
+)
+from populate_db import bulk_populate, synthetic_items
+
+
+def keys(items):
+    return IdempotencyRepository(items.db_session)
+
+
+def item_changes(items):
+    return ItemChangeRepository(items.db_session)
+
+
+def stock_journal(items):
+    return StockJournalRepository(items.db_session)
+
+
+def claim_times(carts):
+    now = carts.clock()
+    return now, now - timedelta(days=1), now - timedelta(minutes=1)
+
+
+def new_item(n):
+    return Product(name=f"Check item {n}", price=Decimal("9.99"), description="", thumbnail="t.jpg", stock=100)
+
+
+# (repository method, call); `n` is the seeded item and cart count. Methods run in this order.
+EXERCISES = [
+    ("ItemRepository.create", lambda items, carts, n: items.create(new_item(n + 1))),
+    ("ItemRepository.get", lambda items, carts, n: items.get(n // 2)),
+    ("ItemRepository.list", lambda items, carts, n: items.list()),
+    ("ItemRepository.get_many", lambda items, carts, n: items.get_many([1, n // 2, n])),
+    ("ItemRepository.list_page", lambda items, carts, n: [
+        items.list_page(after_id=n // 2, limit=50, fields=("id", "name", "price", "stock"), sort=sort, descending=descending)
+        for sort in ("id", "name", "price") for descending in (False, True)
+    ]),
+    ("ItemRepository.update", lambda items, carts, n: items.update(n // 3, {"price": Decimal("19.99"), "stock": 500})),
+    ("ItemChangeRepository.pending_count", lambda items, carts, n: item_changes(items).pending_count()),
+    ("ItemChangeRepository.reprice_next_batch", lambda items, carts, n: item_changes(items).reprice_next_batch(500, carts.clock())),
+    ("ItemRepository.reserve_stock", lambda items, carts, n: items.reserve_stock(n // 4, 1)),
+    ("ItemRepository.release_stock", lambda items, carts, n: items.release_stock(n // 4, 1)),
+    ("ItemRepository.set_stock_shards", lambda items, carts, n: items.set_stock_shards(n // 5, 4)),
+    # Later stock calls on n // 3 go through its journal.
+    ("ItemRepository.set_stock_journal", lambda items, carts, n: items.set_stock_journal(n // 3, True)),
+    ("ItemRepository.stock_levels", lambda items, carts, n: items.stock_levels([1, n // 5, n // 3])),
+    ("ItemRepository.apply_stock_deltas", lambda items, carts, n: items.apply_stock_deltas(
+        {n // 4: -1, n // 5: -1, n // 3: 2}, cart_id=n // 2
+    )),
+    ("StockJournalRepository.pending_items", lambda items, carts, n: stock_journal(items).pending_items(100)),
+    ("StockJournalRepository.compact", lambda items, carts, n: stock_journal(items).compact(n // 3)),
+    ("StockJournalRepository.movements", lambda items, carts, n: stock_journal(items).movements(n // 3, after_id=0)),
+    ("StockJournalRepository.check", lambda items, carts, n: stock_journal(items).check()),
+    ("StockJournalRepository.rebuild", lambda items, carts, n: stock_journal(items).rebuild([n // 3])),
+    ("ItemRepository.bulk_create", lambda items, carts, n: items.bulk_create([
+        {"name": "Bulk item", "price": Decimal("1.00"), "description": "", "thumbnail": "t.jpg", "stock": 1, "type": "Product"}
+    ])),
+    ("ItemRepository.bulk_update", lambda items, carts, n: items.bulk_update([
+        {"id": n // 6, "price": Decimal("2.00")}, {"id": n // 3, "stock": 400}
+    ])),
+    ("ItemRepository.existing_ids", lambda items, carts, n: items.existing_ids([1, n // 2, n * 2])),
+    ("ItemRepository.delete", lambda items, carts, n: items.delete(n + 1)),
+    ("CartRepository.create", lambda items, carts, n: carts.create()),
+    ("CartRepository.get", lambda items, carts, n: carts.get(n // 2)),
+    ("CartRepository.get_version", lambda items, carts, n: carts.get_version(n // 2)),
+    ("CartRepository.list", lambda items, carts, n: carts.list()),
+    ("CartRepository.get_cart_display", lambda items, carts, n: carts.get_cart_display(n // 2)),
+    ("CartRepository.get_cart_row", lambda items, carts, n: carts.get_cart_row(n // 2)),
+    ("CartRepository.get_versioned_cart_display", lambda items, carts, n: carts.get_versioned_cart_display(n // 2)),
+    ("CartRepository.get_versioned_cart_row", lambda items, carts, n: carts.get_versioned_cart_row(n // 2)),
+    ("CartRepository.list_cart_rows", lambda items, carts, n: carts.list_cart_rows(after_id=n // 2, limit=20)),
+    ("CartRepository.list_cart_displays", lambda items, carts, n: carts.list_cart_displays(after_id=n // 2, limit=20)),
+    ("CartRepository.iter_cart_displays", lambda items, carts, n: list(carts.iter_cart_displays(after_id=n // 2, limit=20))),
+    ("CartRepository.get_cart_item", lambda items, carts, n: carts.get_cart_item(n // 2, 1)),
+    ("CartRepository.add_cart_item", lambda items, carts, n: carts.add_cart_item(CartItem(cart_id=n + 1, item_id=n // 7, quantity=1))),
+    ("CartRepository.upsert_cart_item", lambda items, carts, n: carts.upsert_cart_item(n + 1, n // 8, 2)),
+    ("CartRepository.get_cart_lines", lambda items, carts, n: carts.get_cart_lines(n // 2)),
+    ("CartRepository.set_cart_lines", lambda items, carts, n: carts.set_cart_lines(n + 1, {n // 7: 0, n // 9: 3})),
+    ("CartRepository.update_cart_item", lambda items, carts, n: carts.update_cart_item(n + 1, n // 9, {"quantity": 1})),
+    ("CartRepository.remove_cart_item", lambda items, carts, n: carts.remove_cart_item(carts.get_cart_item(n + 1, n // 8))),
+    ("CartRepository.remove_cart_units", lambda items, carts, n: carts.remove_cart_units(n + 1, n // 9, 1)),
+    ("CartRepository.refresh_cart_totals", lambda items, carts, n: carts.refresh_cart_totals([n // 2])),
+    ("CartRepository.cart_stats", lambda items, carts, n: carts.cart_stats()),
+    ("CartRepository.release_expired_reservations", lambda items, carts, n: carts.release_expired_reservations(
+        carts.clock() - timedelta(days=1), 100
+    )),
+    ("CartRepository.check_cart_totals", lambda items, carts, n: carts.check_cart_totals()),
+    ("CartRepository.delete", lambda items, carts, n: carts.delete(carts.create().id)),
+    ("IdempotencyRepository.claim", lambda items, carts, n: keys(items).claim("check", "f", *claim_times(carts))),
+    ("IdempotencyRepository.get", lambda items, carts, n: keys(items).get("check")),
+    ("IdempotencyRepository.complete", lambda items, carts, n: keys(items).complete("check", 200, "application/json", b"{}")),
+    ("IdempotencyRepository.release", lambda items, carts, n: keys(items).release("check")),
+    ("IdempotencyRepository.delete_expired", lambda items, carts, n: keys(items).delete_expired(carts.clock(), 500)),
+]
+
+# Reads of whole tables by design: the full catalog, every cart, and whole-table reports.
+FULL_SCANS = {
+    "ItemRepository.list",
+    "CartRepository.list",
+    "CartRepository.cart_stats",
+    "CartRepository.check_cart_totals",
+}
+
+
+def unexercised_methods():
+    """Public repository methods no entry of EXERCISES calls."""
+    exercised = {label for label, _ in EXERCISES}
+    return sorted(
+        f"{cls.__name__}.{name}"
+        for cls in (ItemRepository, CartRepository, ItemChangeRepository, StockJournalRepository, IdempotencyRepository)
+        for name in vars(cls)
+        if not name.startswith("_") and callable(getattr(cls, name)) and f"{cls.__name__}.{name}" not in exercised
+    )
+
+
+def seed(engine, n, lines_per_cart=5, seed_value=0):
+    rng = random.Random(seed_value)
+    with sessionmaker(bind=engine)() as session:
+        bulk_populate(session, synthetic_items(n, seed_value))
+        session.execute(insert(Cart), [{"total": None, "line_count": 0, "version": 0} for _ in range(n)])
+        session.execute(insert(CartItem), [
+            {"cart_id": cart_id, "item_id": item_id, "quantity": rng.randint(1, 3)}
+            for cart_id in range(1, n + 1)
+            for item_id in rng.sample(range(1, n + 1), lines_per_cart)
+        ])
+        session.commit()
+        CartRepository(session).refresh_cart_totals()
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", required=True, help="A scratch database; its tables are dropped")
+    parser.add_argument("--items", type=int, default=20_000, help="Items and carts to seed")
+    parser.add_argument("--min-rows", type=int, default=1000, help="Smallest table whose full scan is flagged")
+    args = parser.parse_args()
+    if args.database_url == DATABASE_URL:
+        parser.error("--database-url is the application's DATABASE_URL; pass a scratch database, whose tables are dropped")
+
+    engine = create_db_engine(args.database_url)
+    Base.metadata.drop_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    upgrade(args.database_url)
+    seed(engine, args.items)
+
+    recorder = QueryRecorder(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with recorder.recording():
+        for label, exercise in EXERCISES:
+            with Session() as session, recorder.labelled(label):
+                exercise(ItemRepository(session), CartRepository(session), args.items)
+
+    scans = find_seq_scans(engine, list(recorder.queries.values()), args.min_rows, allowed=FULL_SCANS)
+    missing = unexercised_methods()
+    print(f"EXPLAINed {len(recorder.queries)} distinct statements from {len(EXERCISES)} repository methods")
+    for scan in scans:
+        print(f"SEQ SCAN {scan.label}: {scan.table} ({scan.rows} rows)\n    {' '.join(scan.statement.split())}")
+    for method in missing:
+        print(f"NOT EXERCISED {method}")
+    Base.metadata.drop_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    engine.dispose()
+    if scans or missing:
+        sys.exit(1)
+    print("No sequential scans of large tables")
+
+
+if __name__ == "__main__":
+    main()
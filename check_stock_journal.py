@@ -0,0 +1,35 @@
+"""Compare every journaled item's stock snapshot with the sum of its journal movements.
+
+Exits with status 1 when any item disagrees. --fix rebuilds those snapshots from the journal.
+"""
+import argparse
+import sys
+
+from infrastructure.database import SessionLocal
+from infrastructure.repository import StockJournalRepository
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fix", action="store_true", help="Rebuild the snapshots of mismatched items from their journals")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        stock_journal = StockJournalRepository(db)
+        mismatches = stock_journal.check()
+        for mismatch in mismatches:
+            print(f"item {mismatch.item_id}: snapshot {mismatch.stock}, journal {mismatch.journal_stock}")
+        if args.fix:
+            rebuilt = stock_journal.rebuild([mismatch.item_id for mismatch in mismatches]) if mismatches else 0
+            print(f"Rebuilt {rebuilt} stock snapshots")
+        elif mismatches:
+            sys.exit(1)
+        else:
+            print("All stock snapshots match their journals")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
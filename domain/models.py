@@ -1,22 +1,118 @@
-from sqlalchemy import Float, ForeignKey, Integer, String
-from sqlalchemy.orm import Mapped, declarative_base, mapped_column, relationship
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import (
+    DDL, Boolean, DateTime, ForeignKey, Index, Integer, LargeBinary, Numeric, String, case, event, false, func, select, text
+)
+from sqlalchemy.orm import Mapped, column_property, declarative_base, mapped_column, relationship
 
 Base = declarative_base()
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ItemStockShard(Base):
+    """One of the counters a sharded item's stock is split across."""
+    __tablename__ = "item_stock_shard"
+    item_id: Mapped[int] = mapped_column(ForeignKey("item.id", ondelete="CASCADE"), primary_key=True)
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
+    stock: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class StockMovement(Base):
+    """One change to a journaled item's stock, appended instead of rewriting the item row.
+
+    The StockCompactor folds movements into Item.stock; they are kept as the item's audit trail,
+    and the sum of all of an item's movements is its stock. No foreign keys, so the trail
+    outlives the item and its carts.
+    """
+    __tablename__ = "stock_movement"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    item_id: Mapped[int] = mapped_column(Integer)
+    # Units added to stock: negative for reservations.
+    delta: Mapped[int] = mapped_column(Integer)
+    cart_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # open, restock, reserve, release or expire.
+    reason: Mapped[str] = mapped_column(String(16))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+
+    # An item's movements after its snapshot, and its audit trail, in order.
+    __table_args__ = (Index("ix_stock_movement_item_id_id", "item_id", "id"),)
+
+
 class Item(Base):
     __tablename__ = "item"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String, index=True)
-    price: Mapped[float] = mapped_column(Float)
+    price: Mapped[Decimal] = mapped_column(Numeric(12, 2))
     description: Mapped[str] = mapped_column(String)
     thumbnail: Mapped[str] = mapped_column(String)
     stock: Mapped[int] = mapped_column(Integer, default=0)
     type: Mapped[str] = mapped_column(String)
+    # Number of ItemStockShard rows the stock is spread over; 0 keeps it all in `stock`.
+    stock_shards: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Price changes whose carts the CartRepricer has not repriced yet. While above 0, carts
+    # holding the item are totalled from their lines on read instead of using the stored total.
+    reprice_pending: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Journaled items take and return stock by appending StockMovement rows instead of updating
+    # this row. `stock` is then a snapshot: the sum of their movements up to stock_snapshot_id.
+    stock_journaled: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false())
+    stock_snapshot_id: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # What can be reserved: `stock` plus the shard counters, plus a journaled item's movements
+    # since its snapshot. Sharded items keep `stock` at 0 except for units handed back by batched releases.
+    available_stock: Mapped[int] = column_property(
+        stock
+        + select(func.coalesce(func.sum(ItemStockShard.stock), 0))
+        .where(ItemStockShard.item_id == id)
+        .correlate_except(ItemStockShard)
+        .scalar_subquery()
+        + case(
+            (
+                stock_journaled,
+                select(func.coalesce(func.sum(StockMovement.delta), 0))
+                .where(StockMovement.item_id == id, StockMovement.id > stock_snapshot_id)
+                .correlate_except(StockMovement)
+                .scalar_subquery(),
+            ),
+            else_=0,
+        )
+    )
 
+    # Keyset pages of GET /item/all sorted by price seek on (price, id); search filters by type
+    # and a price range. `stock` is deliberately unindexed: it is rewritten by every reservation,
+    # and an index on it would stop PostgreSQL from updating those rows in place (HOT updates).
+    # The partial index lists journaled items for the StockCompactor; it never changes when stock
+    # does. Its SQLite predicate is spelled the way SQLite queries compare booleans, or they skip it.
+    __table_args__ = (
+        Index("ix_item_price_id", "price", "id"),
+        Index("ix_item_type_price", "type", "price"),
+        Index(
+            "ix_item_stock_journaled",
+            "id",
+            postgresql_where=text("stock_journaled"),
+            sqlite_where=text("stock_journaled = 1"),
+        ),
+    )
     __mapper_args__ = {"polymorphic_identity": "item", "polymorphic_on": type}
 
 
+# Weighted full-text vector of an item: name terms rank as A, description terms as B. The GIN
+# index and the search queries must spell it identically for PostgreSQL to use the index.
+ITEM_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A')"
+    " || setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+event.listen(
+    Item.__table__,
+    "after_create",
+    DDL(f"CREATE INDEX ix_item_search ON item USING GIN (({ITEM_SEARCH_VECTOR}))").execute_if(dialect="postgresql"),
+)
+
+
 class Product(Item):
     __mapper_args__ = {
         "polymorphic_identity": "Product",
@@ -32,8 +128,20 @@ class Event(Item):
 class Cart(Base):
     __tablename__ = "cart"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Denormalized invoice, kept in step by every cart line mutation. A NULL total means an item
+    # price changed and the total must be recomputed from the lines.
+    total: Mapped[Optional[Decimal]] = mapped_column(Numeric(14, 2), default=Decimal("0.00"), nullable=True)
+    line_count: Mapped[int] = mapped_column(Integer, default=0)
+    # Bumped by every change to the cart's lines or their prices; served as the ETag of GET /cart/{id}.
+    version: Mapped[int] = mapped_column(Integer, default=0)
     items: Mapped[list["CartItem"]] = relationship("CartItem", back_populates="cart")
 
+    # Serves the top carts by value in GET /cart/stats.
+    __table_args__ = (Index("ix_cart_total", "total"),)
+    # ORM flushes of a Cart check the version they loaded. The totals UPDATEs in the repository
+    # bump it themselves, so the ORM does not generate versions.
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+
 
 class CartItem(Base):
     __tablename__ = "cart_item"
@@ -44,5 +152,50 @@ class CartItem(Base):
         Integer, ForeignKey("item.id"), primary_key=True
     )
     quantity: Mapped[int] = mapped_column(Integer)
+    # When stock for this line was last reserved; the reservation sweeper releases lines older than the TTL.
+    reserved_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=True)
     cart: Mapped["Cart"] = relationship("Cart", back_populates="items")
     item: Mapped["Item"] = relationship("Item")
+
+    # The primary key leads with cart_id; this covers lookups and aggregates by item, lets
+    # GET /cart/stats sum quantities per item from the index alone, and gives the CartRepricer
+    # the carts holding an item in cart ID order.
+    __table_args__ = (
+        Index("ix_cart_item_item_id_cart_id_quantity", "item_id", "cart_id", "quantity"),
+        Index("ix_cart_item_reserved_at", "reserved_at"),
+    )
+
+
+class ItemChangeEvent(Base):
+    """Outbox of item price changes, written in the same transaction as the change and worked off by the CartRepricer.
+
+    Processed events are kept as a record of the change. No foreign key, so that record
+    outlives the item.
+    """
+    __tablename__ = "item_change_event"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    item_id: Mapped[int] = mapped_column(Integer)
+    old_price: Mapped[Decimal] = mapped_column(Numeric(12, 2))
+    new_price: Mapped[Decimal] = mapped_column(Numeric(12, 2))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    # The last cart repriced, so a large fan-out resumes where the previous batch stopped.
+    cart_cursor: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    processed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # The repricer takes the oldest unprocessed event.
+    __table_args__ = (Index("ix_item_change_event_pending", "processed_at", "id"),)
+
+
+class IdempotencyKey(Base):
+    """The response to replay for a client's Idempotency-Key; `status_code` is NULL while the first request runs."""
+    __tablename__ = "idempotency_key"
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    # SHA-256 of the method, path and body, so a key reused for a different request is rejected.
+    fingerprint: Mapped[str] = mapped_column(String(64))
+    status_code: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    content_type: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    body: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+
+    # Expired keys are deleted oldest first, in bounded batches.
+    __table_args__ = (Index("ix_idempotency_key_created_at", "created_at"),)
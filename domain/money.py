@@ -0,0 +1,53 @@
+"""Exact money arithmetic for invoices.
+
+Prices are Decimal amounts with two decimal places (Numeric(12, 2) in the database). A quantity
+times a two-place price is exact in Decimal, so subtotals and totals never drift the way float
+sums do (3 * 39.99 == 119.97, not 119.97000000000001).
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from itertools import accumulate
+from typing import List, Optional, Sequence, Tuple, Union
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+Amount = Union[Decimal, int, float, str]
+
+
+def to_decimal(amount: Amount) -> Decimal:
+    """`amount` as a Decimal rounded to cents; floats go through their shortest repr (19.99, not 19.989999...)."""
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def line_subtotals(quantities: Sequence[int], prices: Sequence[Amount]) -> List[Decimal]:
+    """Subtotal of each (quantity, unit price) line."""
+    return [quantity * to_decimal(price) for quantity, price in zip(quantities, prices)]
+
+
+def group_totals(subtotals: Sequence[Decimal], group_sizes: Sequence[int]) -> List[Decimal]:
+    """Sum consecutive runs of `subtotals`, one total per entry of `group_sizes` (which may be 0).
+
+    A single running sum over every line serves all groups, so a page of carts is totalled in one pass.
+    """
+    running = list(accumulate(subtotals, initial=ZERO))
+    ends = list(accumulate(group_sizes, initial=0))
+    return [running[end] - running[start] for start, end in zip(ends, ends[1:])]
+
+
+def invoice(quantities: Sequence[int], prices: Sequence[Amount]) -> Tuple[List[Decimal], Decimal]:
+    """Line subtotals and the total of one invoice."""
+    subtotals = line_subtotals(quantities, prices)
+    return subtotals, sum(subtotals, ZERO)
+
+
+def reference_invoice(quantities: Sequence[int], prices: Sequence[Amount]) -> Tuple[List[Decimal], Decimal]:
+    """Textbook Decimal arithmetic, rounding every step to cents; `invoice` must match it exactly."""
+    subtotals = [(quantity * to_decimal(price)).quantize(CENT) for quantity, price in zip(quantities, prices)]
+    total = sum(subtotals, ZERO).quantize(CENT)
+    return subtotals, total
+
+
+def line_subtotal(quantity: int, price: Optional[Amount]) -> Decimal:
+    return quantity * to_decimal(price or 0)
@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from .models import Item, Cart, CartItem
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from .models import Item, Cart, CartItem, IdempotencyKey, StockMovement
+from schemas.cart import CartDisplay, CartStats, CartTotalsMismatch, ReleasedReservation, RepricedBatch
+from schemas.item import StockJournalMismatch
 
 class IItemRepository(ABC):
     @abstractmethod
@@ -18,6 +22,26 @@ class IItemRepository(ABC):
         """List all items."""
         pass
 
+    @abstractmethod
+    def list_page(
+        self,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        fields: Sequence[str] = ("id",),
+        sort: str = "id",
+        descending: bool = False,
+    ) -> List[dict]:
+        """Items as {field: value} dicts of just `fields`, ordered by `sort` then ID (keyset pagination).
+
+        The page starts after the item `after_id` in that order.
+        """
+        pass
+
+    @abstractmethod
+    def get_many(self, item_ids: List[int]) -> List[Item]:
+        """Retrieve the items with the given IDs, in no particular order; missing IDs are skipped."""
+        pass
+
     @abstractmethod
     def update(self, item_id: int, item_data: dict) -> Optional[Item]:
         """Update an existing item. Returns the updated item, or None if not found."""
@@ -28,6 +52,55 @@ class IItemRepository(ABC):
         """Delete an item by its ID."""
         pass
 
+    @abstractmethod
+    def reserve_stock(self, item_id: int, quantity: int, cart_id: Optional[int] = None) -> Optional[Item]:
+        """Atomically take `quantity` units of stock for `cart_id`. Returns the updated item, or None if it is missing or short on stock."""
+        pass
+
+    @abstractmethod
+    def release_stock(self, item_id: int, quantity: int, cart_id: Optional[int] = None) -> Optional[Item]:
+        """Atomically return `quantity` units of stock from `cart_id`. Returns the updated item, or None if not found."""
+        pass
+
+    @abstractmethod
+    def set_stock_shards(self, item_id: int, shards: int) -> Optional[Item]:
+        """Spread the item's stock over `shards` counters (0 merges them back) and commit. Returns None if not found."""
+        pass
+
+    @abstractmethod
+    def set_stock_journal(self, item_id: int, enabled: bool) -> Optional[Item]:
+        """Switch the item's stock to (or back from) an append-only journal and commit. Returns None if not found."""
+        pass
+
+    @abstractmethod
+    def stock_levels(self, item_ids: Optional[List[int]] = None) -> Dict[int, int]:
+        """Return current stock by item ID, for the given items or the whole catalog."""
+        pass
+
+    @abstractmethod
+    def apply_stock_deltas(self, deltas: Dict[int, int], cart_id: Optional[int] = None) -> bool:
+        """Take (positive) or return (negative) stock for many items in one round trip, without committing.
+
+        Every row is conditional on enough stock being left; if any is short, the transaction is
+        rolled back and False is returned.
+        """
+        pass
+
+    @abstractmethod
+    def bulk_create(self, rows: List[dict]) -> int:
+        """Insert many items (as column dicts) in one round trip and commit. Returns the number inserted."""
+        pass
+
+    @abstractmethod
+    def bulk_update(self, rows: List[dict]) -> int:
+        """Update many items (column dicts including `id`) by primary key and commit. Returns the number updated."""
+        pass
+
+    @abstractmethod
+    def existing_ids(self, item_ids: List[int]) -> List[int]:
+        """Return which of the given item IDs exist."""
+        pass
+
 class ICartRepository(ABC):
     @abstractmethod
     def create(self) -> Cart:
@@ -39,11 +112,53 @@ class ICartRepository(ABC):
         """Retrieve a cart by its ID. Returns None if not found."""
         pass
 
+    @abstractmethod
+    def get_version(self, cart_id: int) -> Optional[int]:
+        """Return a cart's version, bumped by every change to its lines. Returns None if not found."""
+        pass
+
     @abstractmethod
     def list(self) -> List[Cart]:
         """List all carts."""
         pass
 
+    @abstractmethod
+    def get_cart_display(self, cart_id: int) -> Optional[CartDisplay]:
+        """Retrieve a cart invoice (lines, subtotals and total) in a single query. Returns None if not found."""
+        pass
+
+    @abstractmethod
+    def list_cart_displays(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[CartDisplay]:
+        """List cart invoices ordered by ID, starting after `after_id` (keyset pagination)."""
+        pass
+
+    @abstractmethod
+    def get_versioned_cart_display(self, cart_id: int) -> Optional[Tuple[CartDisplay, int]]:
+        """Like get_cart_display, with the cart version read by the same SELECT, so an ETag built from it matches the body."""
+        pass
+
+    @abstractmethod
+    def get_cart_row(self, cart_id: int) -> Optional[dict]:
+        """Like get_cart_display, as plain dicts and Decimals shaped like CartDisplay, without building models."""
+        pass
+
+    @abstractmethod
+    def get_versioned_cart_row(self, cart_id: int) -> Optional[Tuple[dict, int]]:
+        """Like get_cart_row, with the cart version read by the same SELECT."""
+        pass
+
+    @abstractmethod
+    def list_cart_rows(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[dict]:
+        """Like list_cart_displays, as plain dicts and Decimals shaped like CartDisplay, without building models."""
+        pass
+
+    @abstractmethod
+    def iter_cart_displays(
+        self, after_id: Optional[int] = None, limit: Optional[int] = None, batch_size: int = 500
+    ) -> Iterator[CartDisplay]:
+        """Lazily yield cart invoices ordered by ID, fetching `batch_size` carts per query."""
+        pass
+
     @abstractmethod
     def delete(self, cart_id: int) -> None:
         """Delete an cart by its ID."""
@@ -60,13 +175,182 @@ class ICartRepository(ABC):
         pass
 
     @abstractmethod
-    def remove_cart_item(self, cart_item: CartItem) -> None:
-        """Remove a CartItem from a cart."""
+    def upsert_cart_item(
+        self, cart_id: int, item_id: int, quantity: int, expected_version: Optional[int] = None
+    ) -> CartItem:
+        """Insert a cart line or increase its quantity, committing the current transaction.
+
+        With `expected_version`, raises StaleDataError (after rolling back) if the cart is no longer at that version.
+        """
+        pass
+
+    @abstractmethod
+    def get_cart_lines(self, cart_id: int) -> Dict[int, int]:
+        """Return the quantity of every line of a cart, by item ID."""
+        pass
+
+    @abstractmethod
+    def set_cart_lines(self, cart_id: int, quantities: Dict[int, int], expected_version: Optional[int] = None) -> None:
+        """Set the quantity of many lines at once (0 removes the line), committing the current transaction.
+
+        With `expected_version`, raises StaleDataError (after rolling back) if the cart is no longer at that version.
+        """
         pass
 
     @abstractmethod
-    def update_cart_item(self, cart_item: CartItem) -> None:
-        """Update an existing CartItem."""
+    def refresh_cart_totals(self, cart_ids: Optional[List[int]] = None) -> int:
+        """Recompute the stored total and line count of `cart_ids` (default: every stale cart) and commit."""
+        pass
+
+    @abstractmethod
+    def cart_stats(self, top: int = 10) -> CartStats:
+        """Aggregate every cart: counts, units and value held per item and per type, and the `top` carts by value."""
+        pass
+
+    @abstractmethod
+    def release_expired_reservations(self, cutoff: datetime, limit: int) -> List[ReleasedReservation]:
+        """Remove up to `limit` cart lines reserved before `cutoff`, return their stock and commit."""
+        pass
+
+    @abstractmethod
+    def check_cart_totals(self) -> List[CartTotalsMismatch]:
+        """Compare every cart's stored total and line count with a full recompute, returning the carts that differ."""
+        pass
+
+    @abstractmethod
+    def remove_cart_item(self, cart_item: CartItem, expected_version: Optional[int] = None) -> None:
+        """Remove a CartItem from a cart, checking `expected_version` like upsert_cart_item."""
+        pass
+
+    @abstractmethod
+    def remove_cart_units(
+        self, cart_id: int, item_id: int, quantity: Optional[int] = None, expected_version: Optional[int] = None
+    ) -> Optional[int]:
+        """Take `quantity` units (default: all) off a cart line and return them to stock, committing the transaction.
+
+        Returns the units taken, or None (after rolling back) if the line is missing or holds fewer.
+        Checks `expected_version` like upsert_cart_item.
+        """
+        pass
+
+    @abstractmethod
+    def update_cart_item(
+        self, cart_id: int, item_id: int, changes: dict, expected_version: Optional[int] = None
+    ) -> Optional[CartItem]:
+        """Update an existing CartItem, checking `expected_version` like upsert_cart_item."""
+        pass
+
+class IIdempotencyRepository(ABC):
+    @abstractmethod
+    def claim(self, key: str, fingerprint: str, now: datetime, expired_before: datetime, abandoned_before: datetime) -> bool:
+        """Record `key` as in progress and commit; False when a live record already holds it.
+
+        Records created before `expired_before`, and in-progress ones created before
+        `abandoned_before` (their request died), are replaced.
+        """
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[IdempotencyKey]:
+        """Retrieve the record of a key. Returns None if there is none."""
+        pass
+
+    @abstractmethod
+    def complete(self, key: str, status_code: int, content_type: Optional[str], body: bytes) -> None:
+        """Store the response to replay for a claimed key and commit."""
+        pass
+
+    @abstractmethod
+    def release(self, key: str) -> None:
+        """Drop an in-progress claim whose request failed, so a retry runs again, and commit."""
+        pass
+
+    @abstractmethod
+    def delete_expired(self, cutoff: datetime, limit: int) -> int:
+        """Delete at most `limit` records created before `cutoff`, oldest first; return how many."""
+        pass
+
+
+class IItemChangeRepository(ABC):
+    @abstractmethod
+    def pending_count(self) -> int:
+        """Return how many item change events still have carts to reprice."""
+        pass
+
+    @abstractmethod
+    def reprice_next_batch(self, limit: int, now: datetime) -> Optional[RepricedBatch]:
+        """Reprice up to `limit` carts of the oldest pending event and commit; None when no event is pending."""
+        pass
+
+
+class IStockJournalRepository(ABC):
+    @abstractmethod
+    def pending_items(self, limit: int) -> List[int]:
+        """Return up to `limit` journaled items with movements their snapshot does not cover yet, in ID order."""
+        pass
+
+    @abstractmethod
+    def compact(self, item_id: int) -> int:
+        """Fold the item's movements since its snapshot into it and commit; return how many were folded."""
+        pass
+
+    @abstractmethod
+    def movements(self, item_id: int, after_id: Optional[int] = None, limit: int = 100) -> List[StockMovement]:
+        """The item's journal, oldest first, starting after the movement `after_id` (keyset pagination)."""
+        pass
+
+    @abstractmethod
+    def check(self) -> List[StockJournalMismatch]:
+        """Compare every journaled item's snapshot with the sum of its journal, returning the items that differ."""
+        pass
+
+    @abstractmethod
+    def rebuild(self, item_ids: List[int]) -> int:
+        """Recompute the snapshots of `item_ids` from their journals and commit; return how many were rewritten."""
+        pass
+
+
+class ICatalogRevision(ABC):
+    @abstractmethod
+    def bump(self) -> None:
+        """Record that the item catalog (items or their stock) changed, invalidating anything derived from it."""
+        pass
+
+class IItemSearch(ABC):
+    @abstractmethod
+    def search(
+        self,
+        query: str,
+        item_type: Optional[str] = None,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Tuple[int, List[Tuple[int, float]]]:
+        """Items matching every word of `query` (the last one as a prefix), best first.
+
+        Returns the number of matches and one page of (item ID, rank) pairs.
+        """
+        pass
+
+    @abstractmethod
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[int, str]]:
+        """(item ID, name) of the items whose names match `prefix` as typed so far, best first."""
+        pass
+
+    @abstractmethod
+    def item_saved(self, item: Item) -> None:
+        """Index a created or updated item."""
+        pass
+
+    @abstractmethod
+    def item_deleted(self, item_id: int) -> None:
+        """Drop a deleted item from the index."""
+        pass
+
+    @abstractmethod
+    def catalog_changed(self) -> None:
+        """Items changed in bulk; rebuild the index before the next search."""
         pass
 
 class ICartService(ABC):
@@ -79,3 +363,112 @@ class ICartService(ABC):
     def remove_item_from_cart(self, cart_id: int, item_id: int, quantity: Optional[int] = None) -> None:
         """Remove an item from the specified cart."""
         pass
+
+class IAsyncItemRepository(ABC):
+    """Asyncio counterpart of IItemRepository, for AsyncSession-backed repositories."""
+
+    @abstractmethod
+    async def create(self, item: Item) -> Item:
+        """Create and return a new item."""
+        pass
+
+    @abstractmethod
+    async def get(self, item_id: int) -> Optional[Item]:
+        """Retrieve an item by its ID. Returns None if not found."""
+        pass
+
+    @abstractmethod
+    async def list(self) -> List[Item]:
+        """List all items."""
+        pass
+
+    @abstractmethod
+    async def update(self, item_id: int, item_data: dict) -> Optional[Item]:
+        """Update an existing item. Returns the updated item, or None if not found."""
+        pass
+
+    @abstractmethod
+    async def delete(self, item_id: int) -> None:
+        """Delete an item by its ID."""
+        pass
+
+    @abstractmethod
+    async def reserve_stock(self, item_id: int, quantity: int, cart_id: Optional[int] = None) -> Optional[Item]:
+        """Atomically take `quantity` units of stock for `cart_id`. Returns the updated item, or None if it is missing or short on stock."""
+        pass
+
+    @abstractmethod
+    async def release_stock(self, item_id: int, quantity: int, cart_id: Optional[int] = None) -> Optional[Item]:
+        """Atomically return `quantity` units of stock from `cart_id`. Returns the updated item, or None if not found."""
+        pass
+
+class IAsyncCartRepository(ABC):
+    """Asyncio counterpart of ICartRepository, for AsyncSession-backed repositories."""
+
+    @abstractmethod
+    async def create(self) -> Cart:
+        """Create and return a new cart."""
+        pass
+
+    @abstractmethod
+    async def get(self, cart_id: int) -> Optional[Cart]:
+        """Retrieve a cart by its ID. Returns None if not found."""
+        pass
+
+    @abstractmethod
+    async def get_version(self, cart_id: int) -> Optional[int]:
+        """Return a cart's version, bumped by every change to its lines. Returns None if not found."""
+        pass
+
+    @abstractmethod
+    async def get_cart_display(self, cart_id: int) -> Optional[CartDisplay]:
+        """Retrieve a cart invoice (lines, subtotals and total) in a single query. Returns None if not found."""
+        pass
+
+    @abstractmethod
+    async def get_versioned_cart_display(self, cart_id: int) -> Optional[Tuple[CartDisplay, int]]:
+        """Like get_cart_display, with the cart version read by the same SELECT, so an ETag built from it matches the body."""
+        pass
+
+    @abstractmethod
+    async def list_cart_displays(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[CartDisplay]:
+        """List cart invoices ordered by ID, starting after `after_id` (keyset pagination)."""
+        pass
+
+    @abstractmethod
+    async def get_cart_item(self, cart_id: int, item_id: int) -> Optional[CartItem]:
+        """Retrieve a CartItem by cart and item IDs. Returns None if not found."""
+        pass
+
+    @abstractmethod
+    async def upsert_cart_item(
+        self, cart_id: int, item_id: int, quantity: int, expected_version: Optional[int] = None
+    ) -> CartItem:
+        """Insert a cart line or increase its quantity, committing the current transaction.
+
+        With `expected_version`, raises StaleDataError (after rolling back) if the cart is no longer at that version.
+        """
+        pass
+
+    @abstractmethod
+    async def remove_cart_item(self, cart_item: CartItem, expected_version: Optional[int] = None) -> None:
+        """Remove a CartItem from a cart, checking `expected_version` like upsert_cart_item."""
+        pass
+
+    @abstractmethod
+    async def remove_cart_units(
+        self, cart_id: int, item_id: int, quantity: Optional[int] = None, expected_version: Optional[int] = None
+    ) -> Optional[int]:
+        """Take `quantity` units (default: all) off a cart line and return them to stock, committing the transaction.
+
+        Returns the units taken, or None (after rolling back) if the line is missing or holds fewer.
+        Checks `expected_version` like upsert_cart_item.
+        """
+        pass
+
+    @abstractmethod
+    async def update_cart_item(
+        self, cart_id: int, item_id: int, changes: dict, expected_version: Optional[int] = None
+    ) -> Optional[CartItem]:
+        """Update an existing CartItem, checking `expected_version` like upsert_cart_item."""
+        pass
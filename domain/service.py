@@ -1,13 +1,48 @@
-from typing import Optional, List
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Any, Iterator, Optional, List, Tuple
 from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.orm.exc import StaleDataError
+from domain import money
 from domain.models import Item, CartItem
-from schemas.cart import CartItemDisplay, CartDisplay
-from schemas.item import ItemCreate, ItemDisplay, ItemUpdate
-from domain.repo_interfaces import ICartRepository, IItemRepository
+from schemas.cart import CartItemDisplay, CartDisplay, CartOperation, CartStats
+from schemas.item import (
+    ITEM_FIELDS,
+    ITEM_SORT_FIELDS,
+    ItemBulkError,
+    ItemBulkResult,
+    ItemBulkUpdate,
+    ItemCreate,
+    ItemDisplay,
+    ItemSearchHit,
+    ItemSearchPage,
+    ItemSuggestion,
+    ItemUpdate,
+)
+from domain.repo_interfaces import (
+    IAsyncCartRepository,
+    IAsyncItemRepository,
+    ICartRepository,
+    ICatalogRevision,
+    IItemRepository,
+    IItemSearch,
+)
 
 class ItemService:
-    def __init__(self, item_repo: IItemRepository):
+    def __init__(
+        self,
+        item_repo: IItemRepository,
+        catalog_revision: Optional[ICatalogRevision] = None,
+        item_search: Optional[IItemSearch] = None,
+    ):
         self.item_repo = item_repo
+        self.catalog_revision = catalog_revision
+        self.item_search = item_search
+
+    def _catalog_changed(self) -> None:
+        if self.catalog_revision is not None:
+            self.catalog_revision.bump()
 
     def create_item(self, item_data: ItemCreate) -> ItemDisplay:
         if item_data.type not in ["Event", "Product"]:
@@ -22,6 +57,9 @@ class ItemService:
             type=item_data.type
         )
         created_item = self.item_repo.create(item)
+        self._catalog_changed()
+        if self.item_search is not None:
+            self.item_search.item_saved(created_item)
         return created_item
 
     def update_item(self, item_id: int, item_data: ItemUpdate) -> ItemDisplay:
@@ -30,34 +68,195 @@ class ItemService:
 
         item_dict = item_data.model_dump()
         updated_item = self.item_repo.update(item_id, item_dict)
+        self._catalog_changed()
+        if updated_item is not None and self.item_search is not None:
+            self.item_search.item_saved(updated_item)
         return updated_item
 
+    def list_items_page(
+        self,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        fields: Optional[str] = None,
+        sort: str = "id",
+    ) -> List[dict]:
+        """One keyset page of the catalog with just the comma-separated `fields` (all when None).
+
+        `sort` is one of ITEM_SORT_FIELDS, prefixed with "-" for descending order. The ID is
+        always included, since it is the cursor for the next page.
+        """
+        requested = [field.strip() for field in fields.split(",") if field.strip()] if fields else list(ITEM_FIELDS)
+        unknown = [field for field in requested if field not in ITEM_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}; choose from {list(ITEM_FIELDS)}")
+        sort_field = sort.removeprefix("-")
+        if sort_field not in ITEM_SORT_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Items can only be sorted by {list(ITEM_SORT_FIELDS)}")
+        # In ItemDisplay field order, so both JSON encoders produce the same bytes.
+        columns = [field for field in ITEM_FIELDS if field == "id" or field in requested]
+        return self.item_repo.list_page(after_id, limit, columns, sort_field, sort.startswith("-"))
+
+    def search_items(
+        self,
+        query: str,
+        item_type: Optional[str] = None,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> ItemSearchPage:
+        """One page of ranked matches; stock is read fresh from the repository, not from the search index."""
+        total, hits = self.item_search.search(query, item_type, min_price, max_price, limit, offset)
+        items = {item.id: item for item in self.item_repo.get_many([item_id for item_id, _ in hits])}
+        return ItemSearchPage(
+            total=total,
+            items=[
+                ItemSearchHit.model_validate(items[item_id]).model_copy(update={"rank": rank})
+                for item_id, rank in hits
+                if item_id in items
+            ],
+        )
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[ItemSuggestion]:
+        return [ItemSuggestion(id=item_id, name=name) for item_id, name in self.item_search.suggest(prefix, limit)]
+
+    def set_stock_shards(self, item_id: int, shards: int) -> Optional[ItemDisplay]:
+        """Spread an item's stock over `shards` counters so reservations of a hot item stop queueing on one row."""
+        item = self.item_repo.set_stock_shards(item_id, shards)
+        self._catalog_changed()
+        return item
+
+    def set_stock_journal(self, item_id: int, enabled: bool) -> Optional[ItemDisplay]:
+        """Record an item's stock changes in an append-only journal, so reservations stop rewriting its row."""
+        item = self.item_repo.set_stock_journal(item_id, enabled)
+        self._catalog_changed()
+        return item
+
+    def delete_item(self, item_id: int) -> None:
+        """Delete an item. Raises ValueError if it does not exist."""
+        self.item_repo.delete(item_id)
+        self._catalog_changed()
+        if self.item_search is not None:
+            self.item_search.item_deleted(item_id)
+
+    def _validate_bulk_rows(self, rows: List[Any], offset: int, schema, errors: List[ItemBulkError]) -> List[tuple]:
+        """Validate raw rows against `schema`, returning (index, item) pairs and collecting per-row errors."""
+        valid = []
+        for index, row in enumerate(rows, start=offset):
+            try:
+                item_data = schema.model_validate(row)
+            except ValidationError as e:
+                detail = [f"{'.'.join(str(loc) for loc in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()]
+                errors.append(ItemBulkError(index=index, detail=detail))
+                continue
+            if item_data.type is not None and item_data.type not in ["Event", "Product"]:
+                errors.append(ItemBulkError(index=index, detail="Item type must be either 'Event' or 'Product'"))
+                continue
+            valid.append((index, item_data))
+        return valid
+
+    def _bulk_result(self, written: int, errors: List[ItemBulkError]) -> ItemBulkResult:
+        if written:
+            self._catalog_changed()
+            if self.item_search is not None:
+                self.item_search.catalog_changed()
+        return ItemBulkResult(succeeded=written, failed=len(errors), errors=errors)
+
+    def bulk_create_items(self, rows: List[Any], offset: int = 0) -> ItemBulkResult:
+        """Validate a batch of raw rows and insert the valid ones in one round trip.
+
+        Rows are indexed from `offset` in the reported errors, so callers can feed a long
+        import batch by batch. If the insert itself fails, every valid row of the batch is
+        reported with the database error.
+        """
+        errors: List[ItemBulkError] = []
+        valid = self._validate_bulk_rows(rows, offset, ItemCreate, errors)
+        written = 0
+        if valid:
+            try:
+                written = self.item_repo.bulk_create([item_data.model_dump() for _, item_data in valid])
+            except ValueError as e:
+                errors.extend(ItemBulkError(index=index, detail=str(e)) for index, _ in valid)
+        return self._bulk_result(written, errors)
+
+    def bulk_update_items(self, rows: List[Any], offset: int = 0) -> ItemBulkResult:
+        """Validate a batch of partial updates (each with an `id`) and apply the valid ones in one round trip."""
+        errors: List[ItemBulkError] = []
+        valid = self._validate_bulk_rows(rows, offset, ItemBulkUpdate, errors)
+        existing = set(self.item_repo.existing_ids([item_data.id for _, item_data in valid])) if valid else set()
+        found = []
+        for index, item_data in valid:
+            if item_data.id in existing:
+                found.append((index, item_data))
+            else:
+                errors.append(ItemBulkError(index=index, detail="Item not found"))
+        written = 0
+        if found:
+            try:
+                written = self.item_repo.bulk_update(
+                    [item_data.model_dump(exclude_unset=True, exclude_none=True) for _, item_data in found]
+                )
+            except ValueError as e:
+                errors.extend(ItemBulkError(index=index, detail=str(e)) for index, _ in found)
+        return self._bulk_result(written, errors)
+
+def check_cart_version(cart, expected_version: Optional[int]) -> None:
+    """412 if an If-Match version was given and the cart has moved past it."""
+    if expected_version is not None and cart.version != expected_version:
+        raise HTTPException(status_code=412, detail="Cart has changed since it was read")
+
+
+@contextmanager
+def cart_version_guard() -> Iterator[None]:
+    """Turn a version conflict caught by a guarded cart UPDATE (already rolled back) into a 412."""
+    try:
+        yield
+    except StaleDataError:
+        raise HTTPException(status_code=412, detail="Cart has changed since it was read")
+
+
+# How often apply_cart_operations re-reads a cart that changed under it before giving up.
+CART_OPERATION_ATTEMPTS = 3
+
+
 class CartService:
-    def __init__(self, cart_repository: ICartRepository, item_repository: IItemRepository):
+    def __init__(
+        self,
+        cart_repository: ICartRepository,
+        item_repository: IItemRepository,
+        catalog_revision: Optional[ICatalogRevision] = None,
+    ):
         self.cart_repository = cart_repository
         self.item_repository = item_repository
+        self.catalog_revision = catalog_revision
+
+    def _catalog_changed(self) -> None:
+        # Reservations change item stock, which is part of the published catalog.
+        if self.catalog_revision is not None:
+            self.catalog_revision.bump()
 
-    def calculate_subtotal(self, quantity: int, price: float) -> float:
+    def calculate_subtotal(self, quantity: int, price: Decimal) -> Decimal:
         """Calculate subtotal based on quantity and unit price."""
-        return quantity * price
+        return money.line_subtotal(quantity, price)
 
-    def add_item_to_cart(self, cart_id: int, item_id: int, quantity: int):
+    def add_item_to_cart(self, cart_id: int, item_id: int, quantity: int, expected_version: Optional[int] = None):
         cart = self.cart_repository.get(cart_id)
         if not cart:
             raise HTTPException(status_code=404, detail="Cart not found")
-        item = self.item_repository.get(item_id)
+        check_cart_version(cart, expected_version)
+
+        # Checking and taking stock is a single conditional UPDATE, so concurrent
+        # requests can never oversell; the line upsert commits both together.
+        item = self.item_repository.reserve_stock(item_id, quantity, cart_id)
         if not item:
-            raise HTTPException(status_code=404, detail="Item not found")
-        if item.stock < quantity:
+            if not self.item_repository.get(item_id):
+                raise HTTPException(status_code=404, detail="Item not found")
             raise HTTPException(status_code=400, detail="Insufficient stock")
-
-        cart_item = self.cart_repository.get_cart_item(cart_id, item_id)
-        if cart_item:
-            self.cart_repository.update_cart_item(cart_id, item_id, {'quantity': cart_item.quantity + quantity})
-        else:
-            cart_item = CartItem(cart_id=cart_id, item_id=item_id, quantity=quantity)
-            self.cart_repository.add_cart_item(cart_item)
-        self.item_repository.update(item_id, {'stock': item.stock - quantity})
+        # With an If-Match version, the totals UPDATE only matches the cart at that version; a
+        # concurrent change rolls back the reservation as well, and no lock is taken up front.
+        with cart_version_guard():
+            cart_item = self.cart_repository.upsert_cart_item(cart_id, item_id, quantity, expected_version)
+        self._catalog_changed()
 
         subtotal = self.calculate_subtotal(quantity, item.price)
 
@@ -70,87 +269,228 @@ class CartService:
         return cart_item_display
 
     def get_cart_details(self, cart_id: int) -> CartDisplay:
+        cart_display = self.cart_repository.get_cart_display(cart_id)
+        if cart_display is None:
+            raise HTTPException(status_code=404, detail="Cart not found")
+        return cart_display
+
+    def list_carts_with_details(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[CartDisplay]:
+        return self.cart_repository.list_cart_displays(after_id=after_id, limit=limit)
+
+    def get_versioned_cart_details(self, cart_id: int) -> Tuple[CartDisplay, int]:
+        """The invoice and the cart version it shows, read together, for a body and its ETag."""
+        versioned = self.cart_repository.get_versioned_cart_display(cart_id)
+        if versioned is None:
+            raise HTTPException(status_code=404, detail="Cart not found")
+        return versioned
+
+    def get_cart_version(self, cart_id: int) -> int:
+        """The cart's version alone, as its ETag shows it."""
+        version = self.cart_repository.get_version(cart_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Cart not found")
+        return version
+
+    def get_cart_row(self, cart_id: int) -> dict:
+        """get_cart_details as a plain CartDisplay-shaped dict, for the fast JSON path."""
+        cart_row = self.cart_repository.get_cart_row(cart_id)
+        if cart_row is None:
+            raise HTTPException(status_code=404, detail="Cart not found")
+        return cart_row
+
+    def get_versioned_cart_row(self, cart_id: int) -> Tuple[dict, int]:
+        """get_versioned_cart_details as a plain CartDisplay-shaped dict, for the fast JSON path."""
+        versioned = self.cart_repository.get_versioned_cart_row(cart_id)
+        if versioned is None:
+            raise HTTPException(status_code=404, detail="Cart not found")
+        return versioned
+
+    def list_cart_rows(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[dict]:
+        return self.cart_repository.list_cart_rows(after_id=after_id, limit=limit)
+
+    def apply_cart_operations(
+        self, cart_id: int, operations: List[CartOperation], expected_version: Optional[int] = None
+    ) -> CartDisplay:
+        """Apply a batch of add/remove/set operations in one transaction, all or nothing.
+
+        The cart lines and the stock of every touched item are read with one query each,
+        the operations are folded into a final quantity per line, and stock and lines are
+        then written with one statement each, so the cost does not grow with the batch.
+
+        The lines are written as absolute quantities, so the write only applies to the cart
+        version the lines were read at. Without If-Match, a batch that lost that race to another
+        change (an add, a removal, the reservation sweeper) is rolled back and folded again over
+        the new lines, up to CART_OPERATION_ATTEMPTS times before answering 409.
+        """
+        for _ in range(CART_OPERATION_ATTEMPTS):
+            cart = self.cart_repository.get(cart_id)
+            if not cart:
+                raise HTTPException(status_code=404, detail="Cart not found")
+            check_cart_version(cart, expected_version)
+            try:
+                self._write_cart_operations(cart_id, cart.version, operations)
+            except StaleDataError:
+                if expected_version is not None:
+                    raise HTTPException(status_code=412, detail="Cart has changed since it was read")
+                continue
+            return self.get_cart_details(cart_id)
+        raise HTTPException(status_code=409, detail="Cart kept changing while the operations were applied; retry")
+
+    def _write_cart_operations(self, cart_id: int, version: int, operations: List[CartOperation]) -> None:
+        """Fold `operations` over the cart lines read at `version` and write the result; StaleDataError if the cart moved on."""
+        current = self.cart_repository.get_cart_lines(cart_id)
+        stock = self.item_repository.stock_levels(list({operation.item_id for operation in operations}))
+        quantities = dict(current)
+        for operation in operations:
+            if operation.item_id not in stock:
+                raise HTTPException(status_code=404, detail=f"Item {operation.item_id} not found")
+            in_cart = quantities.get(operation.item_id, 0)
+            if operation.op == "add":
+                quantities[operation.item_id] = in_cart + operation.quantity
+            elif operation.op == "set":
+                quantities[operation.item_id] = operation.quantity
+            else:
+                if operation.item_id not in quantities or in_cart == 0:
+                    raise HTTPException(status_code=404, detail=f"Item {operation.item_id} not found in cart")
+                if operation.quantity is not None and operation.quantity > in_cart:
+                    raise HTTPException(status_code=400, detail=f"Cannot remove {operation.quantity} items. Only {in_cart} available in cart.")
+                quantities[operation.item_id] = in_cart - (in_cart if operation.quantity is None else operation.quantity)
+
+        deltas = {
+            item_id: quantity - current.get(item_id, 0)
+            for item_id, quantity in quantities.items()
+            if quantity != current.get(item_id, 0)
+        }
+        short = [item_id for item_id, delta in deltas.items() if delta > stock[item_id]]
+        if short:
+            raise HTTPException(status_code=400, detail=f"Insufficient stock for items {short}")
+        if deltas:
+            # The conditional UPDATE re-checks stock, in case another request took it since the read above.
+            if not self.item_repository.apply_stock_deltas(deltas, cart_id):
+                raise HTTPException(status_code=400, detail="Insufficient stock")
+            # Rolls back the stock deltas too when the cart is no longer at `version`.
+            self.cart_repository.set_cart_lines(cart_id, {item_id: quantities[item_id] for item_id in deltas}, version)
+            self._catalog_changed()
+
+    def get_cart_stats(self, top: int = 10) -> CartStats:
+        return self.cart_repository.cart_stats(top=top)
+
+    def stream_carts_with_details(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> Iterator[CartDisplay]:
+        return self.cart_repository.iter_cart_displays(after_id=after_id, limit=limit)
+
+    def remove_item_from_cart(
+        self, cart_id: int, item_id: int, quantity: Optional[int] = None, expected_version: Optional[int] = None
+    ):
         cart = self.cart_repository.get(cart_id)
         if not cart:
             raise HTTPException(status_code=404, detail="Cart not found")
+        check_cart_version(cart, expected_version)
 
-        items_display = []
-        cart_total = 0
-
-        for cart_item in cart.items:
-            item = self.item_repository.get(cart_item.item_id)
-            if item:
-                subtotal = self.calculate_subtotal(cart_item.quantity, item.price)
-                cart_total += subtotal
-
-                items_display.append(
-                    CartItemDisplay(
-                        item_id=cart_item.item_id,
-                        quantity=cart_item.quantity,
-                        item=item,
-                        subtotal=subtotal,
-                    )
-                )
+        # The line is checked and changed in one statement, so concurrent removals release each unit once.
+        with cart_version_guard():
+            removed = self.cart_repository.remove_cart_units(cart_id, item_id, quantity, expected_version)
+        if removed is None:
+            cart_item = self.cart_repository.get_cart_item(cart_id, item_id)
+            if not cart_item:
+                raise HTTPException(status_code=404, detail="Item not found in cart")
+            raise HTTPException(status_code=400, detail=f"Cannot remove {quantity} items. Only {cart_item.quantity} available in cart.")
+        self._catalog_changed()
+
+
+class AsyncItemService:
+    """ItemService for the async app: same rules, awaiting an IAsyncItemRepository."""
 
-        return CartDisplay(
-            id=cart.id,
-            items=items_display,
-            total=cart_total,
+    def __init__(self, item_repo: IAsyncItemRepository):
+        self.item_repo = item_repo
+
+    async def create_item(self, item_data: ItemCreate) -> ItemDisplay:
+        if item_data.type not in ["Event", "Product"]:
+            raise HTTPException(status_code=400, detail="Item type must be either 'Event' or 'Product'")
+
+        item = Item(
+            name=item_data.name,
+            description=item_data.description,
+            price=item_data.price,
+            thumbnail=item_data.thumbnail,
+            stock=item_data.stock,
+            type=item_data.type
         )
+        return await self.item_repo.create(item)
 
-    def list_carts_with_details(self) -> List[CartDisplay]:
-        carts = self.cart_repository.list()
-        cart_displays = []
-
-        for cart in carts:
-            items_display = []
-            cart_total = 0
-
-            for cart_item in cart.items:
-                item = self.item_repository.get(cart_item.item_id)
-                if item:
-                    subtotal = self.calculate_subtotal(cart_item.quantity, item.price)
-                    cart_total += subtotal
-
-                    items_display.append(
-                        CartItemDisplay(
-                            item_id=cart_item.item_id,
-                            quantity=cart_item.quantity,
-                            item=item,
-                            subtotal=subtotal,
-                        )
-                    )
-
-            cart_displays.append(
-                CartDisplay(
-                    id=cart.id,
-                    items=items_display,
-                    total=cart_total,
-                )
-            )
+    async def update_item(self, item_id: int, item_data: ItemUpdate) -> ItemDisplay:
+        if item_data.type not in ["Event", "Product"]:
+            raise HTTPException(status_code=400, detail="Item type must be either 'Event' or 'Product'")
 
-        return cart_displays
+        return await self.item_repo.update(item_id, item_data.model_dump())
 
-    def remove_item_from_cart(self, cart_id: int, item_id: int, quantity: Optional[int] = None):
-        cart = self.cart_repository.get(cart_id)
+class AsyncCartService:
+    """CartService for the async app: same rules, awaiting async repositories."""
+
+    def __init__(self, cart_repository: IAsyncCartRepository, item_repository: IAsyncItemRepository):
+        self.cart_repository = cart_repository
+        self.item_repository = item_repository
+
+    def calculate_subtotal(self, quantity: int, price: Decimal) -> Decimal:
+        """Calculate subtotal based on quantity and unit price."""
+        return money.line_subtotal(quantity, price)
+
+    async def add_item_to_cart(
+        self, cart_id: int, item_id: int, quantity: int, expected_version: Optional[int] = None
+    ) -> CartItemDisplay:
+        cart = await self.cart_repository.get(cart_id)
         if not cart:
             raise HTTPException(status_code=404, detail="Cart not found")
+        check_cart_version(cart, expected_version)
 
-        cart_item = self.cart_repository.get_cart_item(cart_id, item_id)
-        if not cart_item:
-            raise HTTPException(status_code=404, detail="Item not found in cart")
-
-        item = self.item_repository.get(item_id)
+        item = await self.item_repository.reserve_stock(item_id, quantity, cart_id)
         if not item:
-            raise HTTPException(status_code=404, detail="Item not found")
+            if not await self.item_repository.get(item_id):
+                raise HTTPException(status_code=404, detail="Item not found")
+            raise HTTPException(status_code=400, detail="Insufficient stock")
+        with cart_version_guard():
+            cart_item = await self.cart_repository.upsert_cart_item(cart_id, item_id, quantity, expected_version)
 
-        if quantity is not None and quantity > cart_item.quantity:
-            raise HTTPException(status_code=400, detail=f"Cannot remove {quantity} items. Only {cart_item.quantity} available in cart.")
+        return CartItemDisplay(
+            item_id=cart_item.item_id,
+            quantity=cart_item.quantity,
+            item=item,
+            subtotal=self.calculate_subtotal(quantity, item.price),
+        )
 
-        if quantity is None or quantity >= cart_item.quantity:
-            item.stock += cart_item.quantity
-            self.cart_repository.remove_cart_item(cart_item)
-        else:
-            cart_item.quantity -= quantity
-            item.stock += quantity
-            self.cart_repository.update_cart_item(cart_id, item_id, {'quantity': cart_item.quantity})
\ No newline at end of file
+    async def get_cart_version(self, cart_id: int) -> int:
+        version = await self.cart_repository.get_version(cart_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Cart not found")
+        return version
+
+    async def get_versioned_cart_details(self, cart_id: int) -> Tuple[CartDisplay, int]:
+        versioned = await self.cart_repository.get_versioned_cart_display(cart_id)
+        if versioned is None:
+            raise HTTPException(status_code=404, detail="Cart not found")
+        return versioned
+
+    async def get_cart_details(self, cart_id: int) -> CartDisplay:
+        cart_display = await self.cart_repository.get_cart_display(cart_id)
+        if cart_display is None:
+            raise HTTPException(status_code=404, detail="Cart not found")
+        return cart_display
+
+    async def list_carts_with_details(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[CartDisplay]:
+        return await self.cart_repository.list_cart_displays(after_id=after_id, limit=limit)
+
+    async def remove_item_from_cart(
+        self, cart_id: int, item_id: int, quantity: Optional[int] = None, expected_version: Optional[int] = None
+    ):
+        cart = await self.cart_repository.get(cart_id)
+        if not cart:
+            raise HTTPException(status_code=404, detail="Cart not found")
+        check_cart_version(cart, expected_version)
+
+        # The line is checked and changed in one statement, so concurrent removals release each unit once.
+        with cart_version_guard():
+            removed = await self.cart_repository.remove_cart_units(cart_id, item_id, quantity, expected_version)
+        if removed is None:
+            cart_item = await self.cart_repository.get_cart_item(cart_id, item_id)
+            if not cart_item:
+                raise HTTPException(status_code=404, detail="Item not found in cart")
+            raise HTTPException(status_code=400, detail=f"Cannot remove {quantity} items. Only {cart_item.quantity} available in cart.")
@@ -16,6 +16,16 @@ python init_db.py
 echo "Populating the database with random items..."
 python populate_db.py
 
-# Start the FastAPI application
-echo "Starting FastAPI application..."
-exec uvicorn app.main:app --host 0.0.0.0 --reload
+# Start the FastAPI application, on the async engine when DB_ASYNC is enabled
+APP_MODULE="app.main:app"
+if [ "${DB_ASYNC,,}" = "true" ] || [ "$DB_ASYNC" = "1" ]; then
+    APP_MODULE="app.async_main:app"
+fi
+# One auto-reloading process for development; otherwise serve.py's worker processes
+# (WEB_CONCURRENCY of them, or one per CPU when it is 0).
+if [ "${WEB_CONCURRENCY:-1}" = "1" ]; then
+    echo "Starting FastAPI application ($APP_MODULE)..."
+    exec uvicorn "$APP_MODULE" --host 0.0.0.0 --reload
+fi
+echo "Starting FastAPI application ($APP_MODULE) with serve.py..."
+exec python serve.py --app "$APP_MODULE" --host 0.0.0.0
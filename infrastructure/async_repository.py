@@ -0,0 +1,188 @@
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+from domain.models import Item, Cart, CartItem, utcnow
+from domain.repo_interfaces import IAsyncItemRepository, IAsyncCartRepository
+from infrastructure.repository import (
+    adjust_cart_totals_query,
+    cart_display_page_query,
+    cart_invoice_query,
+    give_stock_off_row,
+    group_cart_displays,
+    price_change_queries,
+    refresh_cart_totals_query,
+    release_stock_query,
+    reserve_stock_query,
+    take_cart_units,
+    take_stock_off_row,
+    unsharded_item,
+    upsert_cart_item_query,
+    write_stock_off_row,
+)
+from schemas.cart import CartDisplay
+from typing import Callable, List, Optional, Tuple
+
+POPULATE_EXISTING = {"populate_existing": True}
+
+
+class AsyncItemRepository(IAsyncItemRepository):
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def create(self, item: Item) -> Item:
+        self.db_session.add(item)
+        await self.db_session.commit()
+        await self.db_session.refresh(item)
+        return item
+
+    async def get(self, item_id: int) -> Optional[Item]:
+        return await self.db_session.scalar(select(Item).where(Item.id == item_id))
+
+    async def list(self) -> List[Item]:
+        return list(await self.db_session.scalars(select(Item)))
+
+    async def update(self, item_id: int, item_data: dict) -> Optional[Item]:
+        item = await self.get(item_id)
+        if item:
+            if "price" in item_data and item_data["price"] != item.price:
+                for stmt in price_change_queries({item_id: (item.price, item_data["price"])}):
+                    await self.db_session.execute(stmt)
+            if item_data.get("stock") is not None and await self.db_session.run_sync(
+                write_stock_off_row, item, item_data["stock"]
+            ):
+                item_data = {key: value for key, value in item_data.items() if key != "stock"}
+            for key, value in item_data.items():
+                setattr(item, key, value)
+            await self.db_session.commit()
+            await self.db_session.refresh(item)
+        return item
+
+    async def delete(self, item_id: int) -> None:
+        item_to_delete = await self.get(item_id)
+        if item_to_delete:
+            await self.db_session.delete(item_to_delete)
+            await self.db_session.commit()
+        else:
+            raise ValueError("Item not found")
+
+    async def reserve_stock(self, item_id: int, quantity: int, cart_id: Optional[int] = None) -> Optional[Item]:
+        """Check and take stock in one conditional UPDATE (or from the shards or journal of the item), without committing."""
+        result = await self.db_session.execute(
+            reserve_stock_query(item_id, quantity), execution_options=POPULATE_EXISTING
+        )
+        item = unsharded_item(result.scalar_one_or_none())
+        if item is None and await self.db_session.run_sync(take_stock_off_row, item_id, quantity, cart_id):
+            item = await self.db_session.get(Item, item_id, populate_existing=True)
+        return item
+
+    async def release_stock(self, item_id: int, quantity: int, cart_id: Optional[int] = None) -> Optional[Item]:
+        """Give stock back in one UPDATE (to a random shard, or the journal), without committing."""
+        result = await self.db_session.execute(
+            release_stock_query(item_id, quantity), execution_options=POPULATE_EXISTING
+        )
+        item = unsharded_item(result.scalar_one_or_none())
+        if item is None and await self.db_session.run_sync(give_stock_off_row, item_id, quantity, cart_id):
+            item = await self.db_session.get(Item, item_id, populate_existing=True)
+        return item
+
+class AsyncCartRepository(IAsyncCartRepository):
+    def __init__(self, db_session: AsyncSession, clock: Callable[[], datetime] = utcnow):
+        self.db_session = db_session
+        self.clock = clock
+
+    async def create(self) -> Cart:
+        # An explicitly empty collection keeps CartDisplay from lazy-loading items, which AsyncSession cannot do.
+        new_cart = Cart(items=[])
+        self.db_session.add(new_cart)
+        await self.db_session.commit()
+        return new_cart
+
+    async def get(self, cart_id: int) -> Optional[Cart]:
+        return await self.db_session.scalar(select(Cart).where(Cart.id == cart_id))
+
+    async def get_version(self, cart_id: int) -> Optional[int]:
+        return await self.db_session.scalar(select(Cart.version).where(Cart.id == cart_id))
+
+    async def get_cart_display(self, cart_id: int) -> Optional[CartDisplay]:
+        versioned = await self.get_versioned_cart_display(cart_id)
+        return None if versioned is None else versioned[0]
+
+    async def get_versioned_cart_display(self, cart_id: int) -> Optional[Tuple[CartDisplay, int]]:
+        rows = (await self.db_session.execute(cart_invoice_query(cart_id))).all()
+        if not rows:
+            return None
+        cart_display = next(group_cart_displays(rows))
+        if rows[0].total is None:
+            await self.db_session.execute(refresh_cart_totals_query([cart_id]))
+            await self.db_session.commit()
+        return cart_display, rows[0].version
+
+    async def list_cart_displays(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[CartDisplay]:
+        rows = (await self.db_session.execute(cart_display_page_query(after_id, limit))).all()
+        return list(group_cart_displays(rows))
+
+    async def get_cart_item(self, cart_id: int, item_id: int) -> Optional[CartItem]:
+        return await self.db_session.get(CartItem, (cart_id, item_id))
+
+    async def _update_cart(self, stmt, cart_id: int, expected_version: Optional[int]) -> None:
+        """Run a version-bumping cart UPDATE; roll back and raise StaleDataError if the cart left `expected_version`."""
+        if (await self.db_session.execute(stmt)).rowcount == 0 and expected_version is not None:
+            await self.db_session.rollback()
+            raise StaleDataError(f"Cart {cart_id} is no longer at version {expected_version}")
+
+    async def upsert_cart_item(
+        self, cart_id: int, item_id: int, quantity: int, expected_version: Optional[int] = None
+    ) -> CartItem:
+        """Insert a cart line or add `quantity` to the existing one, then commit the transaction."""
+        result = await self.db_session.execute(
+            upsert_cart_item_query(self.db_session, cart_id, item_id, quantity, self.clock()),
+            execution_options=POPULATE_EXISTING,
+        )
+        cart_item, inserted = result.one()
+        await self._update_cart(
+            adjust_cart_totals_query(cart_id, item_id, quantity, int(inserted), expected_version), cart_id, expected_version
+        )
+        await self.db_session.commit()
+        return cart_item
+
+    async def remove_cart_item(self, cart_item: CartItem, expected_version: Optional[int] = None) -> None:
+        await self._update_cart(
+            adjust_cart_totals_query(cart_item.cart_id, cart_item.item_id, -cart_item.quantity, -1, expected_version),
+            cart_item.cart_id,
+            expected_version,
+        )
+        await self.db_session.delete(cart_item)
+        await self.db_session.commit()
+
+    async def remove_cart_units(
+        self, cart_id: int, item_id: int, quantity: Optional[int] = None, expected_version: Optional[int] = None
+    ) -> Optional[int]:
+        """Take units off a line and return them to stock (see take_cart_units), then commit the transaction."""
+        taken = await self.db_session.run_sync(take_cart_units, cart_id, item_id, quantity)
+        if taken is None:
+            await self.db_session.rollback()
+            return None
+        units, emptied = taken
+        await self._update_cart(
+            adjust_cart_totals_query(cart_id, item_id, -units, -1 if emptied else 0, expected_version), cart_id, expected_version
+        )
+        await self.db_session.commit()
+        return units
+
+    async def update_cart_item(
+        self, cart_id: int, item_id: int, changes: dict, expected_version: Optional[int] = None
+    ) -> Optional[CartItem]:
+        """Update a cart item with the given changes and commit the transaction."""
+        cart_item = await self.get_cart_item(cart_id, item_id)
+        if cart_item:
+            quantity_delta = changes.get("quantity", cart_item.quantity) - cart_item.quantity
+            for key, value in changes.items():
+                setattr(cart_item, key, value)
+            if quantity_delta or expected_version is not None:
+                await self._update_cart(
+                    adjust_cart_totals_query(cart_id, item_id, quantity_delta, 0, expected_version), cart_id, expected_version
+                )
+            await self.db_session.commit()
+        return cart_item
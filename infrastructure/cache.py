@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+ITEM_CACHE_BACKEND = os.getenv("ITEM_CACHE_BACKEND", "none").lower()
+ITEM_CACHE_TTL = float(os.getenv("ITEM_CACHE_TTL", "300"))
+ITEM_CACHE_MAXSIZE = int(os.getenv("ITEM_CACHE_MAXSIZE", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+class CacheBackend(ABC):
+    """Key/value cache of JSON-compatible values, counting hits and misses on every lookup."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    @abstractmethod
+    def _get(self, key: str):
+        """Return the cached value for `key`, or None if absent or expired."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value) -> None:
+        """Store `value` under `key` for the backend's TTL."""
+        pass
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        """Drop the given keys, if present."""
+        pass
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class TTLLRUCache(CacheBackend):
+    """In-process cache bounded by size (least recently used entries are evicted first) and by age."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return {**super().stats(), "size": len(self._entries)}
+
+
+class KeyValueStoreCache(CacheBackend):
+    """Cache shared between processes through a key/value store.
+
+    `client` only needs the redis-py subset `get(key)`, `set(key, value, ex=seconds)` and
+    `delete(*keys)`, so a redis.Redis instance or FakeKeyValueClient can be plugged in.
+    """
+
+    def __init__(self, client, ttl: float = 300, prefix: str = "shopping-cart:"):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value) -> None:
+        self.client.set(self.prefix + key, json.dumps(value, default=str), ex=max(1, int(self.ttl)))
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+
+class FakeKeyValueClient:
+    """Dict-backed stand-in for a redis client, for tests and single-process development."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.data: Dict[str, tuple] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.data.get(key)
+        if entry is None or (entry[0] is not None and entry[0] <= self.clock()):
+            self.data.pop(key, None)
+            return None
+        return entry[1]
+
+    def set(self, key: str, value: str, ex: Optional[int] = None) -> None:
+        self.data[key] = (None if ex is None else self.clock() + ex, value)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.data.pop(key, None)
+
+
+def build_item_cache(backend: str = ITEM_CACHE_BACKEND) -> Optional[CacheBackend]:
+    """Create the catalog cache selected by ITEM_CACHE_BACKEND: none, memory or redis."""
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return TTLLRUCache(maxsize=ITEM_CACHE_MAXSIZE, ttl=ITEM_CACHE_TTL)
+    if backend == "redis":
+        import redis
+
+        return KeyValueStoreCache(redis.Redis.from_url(REDIS_URL), ttl=ITEM_CACHE_TTL)
+    raise ValueError(f"Unknown ITEM_CACHE_BACKEND: {backend}")
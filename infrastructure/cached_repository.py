@@ -0,0 +1,129 @@
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from domain.models import Item
+from domain.money import to_decimal
+from domain.repo_interfaces import IItemRepository
+from infrastructure.cache import CacheBackend
+
+# Catalog fields that are safe to cache. Stock is volatile: it changes on every cart
+# reservation, so it is never cached and is always read fresh from the database.
+CATALOG_FIELDS = ("id", "name", "price", "description", "thumbnail", "type")
+LIST_KEY = "item:list"
+
+
+def item_key(item_id: int) -> str:
+    return f"item:{item_id}"
+
+
+def catalog_fields(item: Item) -> dict:
+    return {field: getattr(item, field) for field in CATALOG_FIELDS}
+
+
+def cached_item(fields: dict, stock: int) -> Item:
+    """Rebuild a transient (session-less) Item from cached catalog fields and a fresh stock level."""
+    # Prices come back from JSON-backed caches as strings.
+    item = Item(**{**fields, "price": to_decimal(fields["price"])}, stock=stock)
+    set_committed_value(item, "available_stock", stock)
+    return item
+
+
+class CachedItemRepository(IItemRepository):
+    """Read-through cache in front of an IItemRepository.
+
+    Reads of `get` and `list` serve names, prices and descriptions from `cache` and overlay
+    stock from a narrow `stock_levels` query, so a cache hit never hides a stock change.
+    That is a deliberate trade-off: a hit still costs one round trip (a primary-key read for
+    `get`, a read of every item's stock for `list`) and only saves reading, decoding and
+    mapping the wide catalog columns. Caching stock too would let a hit skip the database,
+    at the price of showing stock that cart reservations have already taken.
+    Writes go to the wrapped repository and invalidate the entries they touch.
+    """
+
+    def __init__(self, item_repo: IItemRepository, cache: CacheBackend):
+        self.item_repo = item_repo
+        self.cache = cache
+
+    def create(self, item: Item) -> Item:
+        created_item = self.item_repo.create(item)
+        self.cache.delete(LIST_KEY)
+        return created_item
+
+    def get(self, item_id: int) -> Optional[Item]:
+        fields = self.cache.get(item_key(item_id))
+        if fields is None:
+            item = self.item_repo.get(item_id)
+            if item is not None:
+                self.cache.set(item_key(item_id), catalog_fields(item))
+            return item
+        stock = self.item_repo.stock_levels([item_id]).get(item_id)
+        if stock is None:
+            self.cache.delete(item_key(item_id))
+            return None
+        return cached_item(fields, stock)
+
+    def list(self) -> List[Item]:
+        catalog = self.cache.get(LIST_KEY)
+        if catalog is None:
+            items = self.item_repo.list()
+            self.cache.set(LIST_KEY, [catalog_fields(item) for item in items])
+            return items
+        stock_levels = self.item_repo.stock_levels()
+        return [cached_item(fields, stock_levels[fields["id"]]) for fields in catalog if fields["id"] in stock_levels]
+
+    def list_page(
+        self,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        fields: Sequence[str] = ("id",),
+        sort: str = "id",
+        descending: bool = False,
+    ) -> List[dict]:
+        return self.item_repo.list_page(after_id, limit, fields, sort, descending)
+
+    def get_many(self, item_ids: List[int]) -> List[Item]:
+        return self.item_repo.get_many(item_ids)
+
+    def update(self, item_id: int, item_data: dict) -> Optional[Item]:
+        updated_item = self.item_repo.update(item_id, item_data)
+        self.cache.delete(item_key(item_id), LIST_KEY)
+        return updated_item
+
+    def delete(self, item_id: int) -> None:
+        try:
+            self.item_repo.delete(item_id)
+        finally:
+            self.cache.delete(item_key(item_id), LIST_KEY)
+
+    def reserve_stock(self, item_id: int, quantity: int, cart_id: Optional[int] = None) -> Optional[Item]:
+        return self.item_repo.reserve_stock(item_id, quantity, cart_id)
+
+    def release_stock(self, item_id: int, quantity: int, cart_id: Optional[int] = None) -> Optional[Item]:
+        return self.item_repo.release_stock(item_id, quantity, cart_id)
+
+    def set_stock_shards(self, item_id: int, shards: int) -> Optional[Item]:
+        return self.item_repo.set_stock_shards(item_id, shards)
+
+    def set_stock_journal(self, item_id: int, enabled: bool) -> Optional[Item]:
+        return self.item_repo.set_stock_journal(item_id, enabled)
+
+    def stock_levels(self, item_ids: Optional[List[int]] = None) -> Dict[int, int]:
+        return self.item_repo.stock_levels(item_ids)
+
+    def apply_stock_deltas(self, deltas: Dict[int, int], cart_id: Optional[int] = None) -> bool:
+        return self.item_repo.apply_stock_deltas(deltas, cart_id)
+
+    def bulk_create(self, rows: List[dict]) -> int:
+        created = self.item_repo.bulk_create(rows)
+        self.cache.delete(LIST_KEY)
+        return created
+
+    def bulk_update(self, rows: List[dict]) -> int:
+        try:
+            return self.item_repo.bulk_update(rows)
+        finally:
+            self.cache.delete(LIST_KEY, *(item_key(row["id"]) for row in rows))
+
+    def existing_ids(self, item_ids: List[int]) -> List[int]:
+        return self.item_repo.existing_ids(item_ids)
@@ -0,0 +1,69 @@
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from domain.repo_interfaces import ICatalogRevision
+
+# The revision counter is per process, so writes made by other workers are only
+# picked up once the cached body expires.
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "5"))
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    revision: int
+    body: bytes
+    etag: str
+    expires_at: float
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches `etag` (weak comparison, as RFC 9110 requires)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+class CatalogResponseCache(ICatalogRevision):
+    """The serialized GET /item/all body, versioned by a catalog revision counter.
+
+    Item writes and stock changes call `bump`, which discards the cached body; the next
+    read rebuilds it. The ETag is a hash of the body, so it is stable across workers that
+    serve the same catalog.
+    """
+
+    def __init__(self, ttl: float = CATALOG_CACHE_TTL, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.revision = 0
+        self._entry: Optional[CachedBody] = None
+        self._lock = threading.Lock()
+
+    def bump(self) -> None:
+        with self._lock:
+            self.revision += 1
+            self._entry = None
+
+    def get(self) -> Optional[CachedBody]:
+        entry = self._entry
+        if entry is None or entry.revision != self.revision or entry.expires_at <= self.clock():
+            return None
+        return entry
+
+    def store(self, revision: int, body: bytes) -> CachedBody:
+        """Cache `body`, built from the catalog as of `revision`, unless the catalog changed meanwhile."""
+        entry = CachedBody(
+            revision=revision,
+            body=body,
+            etag='"' + hashlib.sha1(body).hexdigest() + '"',
+            expires_at=self.clock() + self.ttl,
+        )
+        with self._lock:
+            if revision == self.revision:
+                self._entry = entry
+        return entry
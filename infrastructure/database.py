@@ -1,9 +1,18 @@
 import os
+import threading
+import time
 from contextlib import contextmanager
+from functools import lru_cache
+from typing import Tuple
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from infrastructure.instrumentation import install_sql_hooks
 
 load_dotenv()
 
@@ -13,9 +22,168 @@ POSTGRES_DB = os.getenv("POSTGRES_DB")
 POSTGRES_HOST = os.getenv("POSTGRES_HOST")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT")
 
-DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}",
+)
+
+# Serve requests from the async app (app.async_main) on an AsyncSession engine.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+# The repositories write with INSERT ... ON CONFLICT, which only these databases are built for.
+SUPPORTED_BACKENDS = ("postgresql", "sqlite")
+
+
+def to_async_url(url: str) -> str:
+    """Swap the blocking driver of a database URL for its asyncio counterpart."""
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+# Connection pool settings. Keep DB_POOL_SIZE + DB_MAX_OVERFLOW at least as large as
+# FastAPI's threadpool (40 threads): sync handlers blocked waiting for a connection
+# otherwise starve the threads that would release one.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Connections all worker processes together may hold: PostgreSQL's max_connections (100 by
+# default) minus headroom for migrations, psql and standalone scripts. serve.py divides it.
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "90"))
+
+# With DB_ASYNC, requests run on the async engine and the sync engine only serves the
+# background jobs, the idempotency store and warm-up, from this fixed pool (no overflow).
+DB_SYNC_POOL_SIZE = int(os.getenv("DB_SYNC_POOL_SIZE", "4"))
+
+
+def worker_pool_budget(
+    workers: int, max_connections: int = DB_MAX_CONNECTIONS, pool_size: int = DB_POOL_SIZE, reserved: int = 0
+) -> Tuple[int, int]:
+    """(pool_size, max_overflow) for each of `workers` processes, so together they stay within `max_connections`.
+
+    `reserved` connections of each worker's share are left out, for a second engine it holds.
+    """
+    per_worker = max_connections // workers - reserved
+    if per_worker < 1:
+        reserving = f", {reserved} of them reserved per worker" if reserved else ""
+        raise ValueError(f"{max_connections} database connections cannot be shared by {workers} workers{reserving}")
+    pool_size = min(pool_size, per_worker)
+    return pool_size, per_worker - pool_size
+
+
+class PoolWaitStats:
+    """How often, and for how long, checkouts had to wait for a pooled connection."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+
+class WaitTimingPoolMixin:
+    """Times QueuePool._do_get, the step where a checkout blocks when the pool is exhausted."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return connection
 
-engine = create_engine(DATABASE_URL)
+
+class InstrumentedQueuePool(WaitTimingPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(WaitTimingPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(url: str, pool_class, pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW) -> dict:
+    """Engine keyword arguments for the configured pool; in-memory SQLite keeps its single-connection pool."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": pool_class,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def check_backend(url: str) -> None:
+    """Refuse a database the repositories cannot write to, before any request finds out."""
+    backend = make_url(url).get_backend_name()
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported database {backend!r} in {make_url(url)!r}; use one of {', '.join(SUPPORTED_BACKENDS)}")
+
+
+def create_db_engine(url: str = DATABASE_URL, **kwargs):
+    """The engine factory shared by the app, init_db.py and populate_db.py."""
+    check_backend(url)
+    return create_engine(url, **{**pool_options(url, InstrumentedQueuePool), **kwargs})
+
+
+def pool_metrics(db_engine) -> dict:
+    """Current occupancy and cumulative wait statistics of an engine's connection pool."""
+    pool = db_engine.pool
+    metrics = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        metrics.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        metrics.update(
+            checkouts=wait_stats.checkouts,
+            timeouts=wait_stats.timeouts,
+            wait_seconds_total=wait_stats.total_wait,
+            wait_seconds_max=wait_stats.max_wait,
+        )
+    return metrics
+
+
+install_sql_hooks()
+
+engine = (
+    create_db_engine(**pool_options(DATABASE_URL, InstrumentedQueuePool, DB_SYNC_POOL_SIZE, 0))
+    if DB_ASYNC
+    else create_db_engine()
+)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -30,4 +198,21 @@ def db_session():
 
 def get_db():
     with db_session() as db:
-        yield db
\ No newline at end of file
+        yield db
+
+
+@lru_cache
+def get_async_engine():
+    """Build the async engine on first use, so the sync app never needs an asyncio driver installed."""
+    check_backend(ASYNC_DATABASE_URL)
+    return create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, InstrumentedAsyncAdaptedQueuePool))
+
+
+@lru_cache
+def get_async_sessionmaker() -> async_sessionmaker:
+    return async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
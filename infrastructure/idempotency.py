@@ -0,0 +1,145 @@
+"""Idempotency-Key records: a database table shared by all workers, behind an in-process LRU."""
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Tuple
+
+from domain.models import IdempotencyKey, utcnow
+from infrastructure.repository import IdempotencyRepository
+
+# How long a key's response is replayed.
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# Completed responses kept in each process's LRU.
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+# An in-progress key older than this is taken to belong to a request that died, and may be claimed again.
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status_code: Optional[int] = None
+    content_type: Optional[str] = None
+    body: bytes = b""
+
+    @property
+    def in_progress(self) -> bool:
+        return self.status_code is None
+
+    @classmethod
+    def from_record(cls, record: IdempotencyKey) -> "StoredResponse":
+        return cls(record.fingerprint, record.status_code, record.content_type, record.body or b"")
+
+
+class IdempotencyStore:
+    """Claims keys and stores their responses in the database, caching completed responses in an LRU.
+
+    Retries usually reach the worker that served the first attempt, so most replays never query
+    the database. Expired records are deleted `cleanup_batch` at a time, once every
+    `cleanup_every` claims, so the cost of expiry is bounded and spread across requests.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        ttl: float = IDEMPOTENCY_TTL,
+        cache_size: int = IDEMPOTENCY_CACHE_SIZE,
+        lock_timeout: float = IDEMPOTENCY_LOCK_TIMEOUT,
+        cleanup_every: int = 100,
+        cleanup_batch: int = 500,
+        clock: Callable[[], datetime] = utcnow,
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.lock_timeout = lock_timeout
+        self.cleanup_every = cleanup_every
+        self.cleanup_batch = cleanup_batch
+        self.clock = clock
+        self.claims = 0
+        self.replays = 0
+        self.expired_deleted = 0
+        self._cache: "OrderedDict[str, Tuple[datetime, StoredResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, key: str) -> Optional[StoredResponse]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            created_at, stored = entry
+            if self.clock() - created_at >= timedelta(seconds=self.ttl):
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return stored
+
+    def _cache_completed(self, key: str, stored: StoredResponse, created_at: datetime) -> None:
+        with self._lock:
+            self._cache[key] = (created_at, stored)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def begin(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """Claim `key` for this request (None: run it), or return the key's existing record to replay or wait on."""
+        cached = self._cached(key)
+        if cached is not None:
+            self.replays += 1
+            return cached
+        now = self.clock()
+        with self.session_factory() as db:
+            repo = IdempotencyRepository(db)
+            claimed = repo.claim(
+                key,
+                fingerprint,
+                now,
+                expired_before=now - timedelta(seconds=self.ttl),
+                abandoned_before=now - timedelta(seconds=self.lock_timeout),
+            )
+            if claimed:
+                self.claims += 1
+                if self.claims % self.cleanup_every == 0:
+                    self.expired_deleted += repo.delete_expired(now - timedelta(seconds=self.ttl), self.cleanup_batch)
+                return None
+            record = repo.get(key)
+        if record is None:
+            # The holder gave up on its claim in the meantime: report it as running, so the caller waits and retries.
+            return StoredResponse(fingerprint)
+        stored = StoredResponse.from_record(record)
+        if not stored.in_progress:
+            self.replays += 1
+            # Cached until the record itself expires, not for a fresh TTL from this replay.
+            created_at = record.created_at
+            if created_at.tzinfo is None:
+                # SQLite hands back naive datetimes; they were stored in UTC.
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            self._cache_completed(key, stored, created_at)
+        return stored
+
+    def complete(self, key: str, fingerprint: str, status_code: int, content_type: Optional[str], body: bytes) -> None:
+        with self.session_factory() as db:
+            IdempotencyRepository(db).complete(key, status_code, content_type, body)
+        self._cache_completed(key, StoredResponse(fingerprint, status_code, content_type, body), self.clock())
+
+    def abandon(self, key: str) -> None:
+        with self.session_factory() as db:
+            IdempotencyRepository(db).release(key)
+
+    def delete_expired(self, limit: Optional[int] = None) -> int:
+        with self.session_factory() as db:
+            deleted = IdempotencyRepository(db).delete_expired(
+                self.clock() - timedelta(seconds=self.ttl), limit or self.cleanup_batch
+            )
+        self.expired_deleted += deleted
+        return deleted
+
+    def stats(self) -> dict:
+        return {
+            "claims": self.claims,
+            "replays": self.replays,
+            "expired_deleted": self.expired_deleted,
+            "cached": len(self._cache),
+        }
@@ -0,0 +1,153 @@
+"""Request instrumentation: SQL statement counts and timings per request, route latency histograms.
+
+SQLAlchemy cursor events charge each statement to the RequestStats in `current_request_stats`,
+which app.middleware.RequestMetricsMiddleware sets for every request.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("shopping_cart.sql")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class InstrumentationConfig:
+    """Response headers added by RequestMetricsMiddleware; read on every request, so tests can toggle them."""
+
+    def __init__(self):
+        self.server_timing = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+        # Test mode: report each request's SQL statement count in an X-Query-Count header.
+        self.query_count_header = os.getenv("QUERY_COUNT_HEADER", "false").lower() in ("1", "true", "yes")
+
+
+config = InstrumentationConfig()
+
+
+@dataclass
+class RequestStats:
+    query_count: int = 0
+    query_seconds: float = 0.0
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|\$\d+|(?<!:):\w+|\?")
+_IN_LISTS = re.compile(r"\bIN \((?:\?(?:, )?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Collapse a statement to its shape: literals and bind markers become ?, IN lists become IN (?...)."""
+    normalized = _LITERALS.sub("?", _WHITESPACE.sub(" ", statement).strip())
+    return _IN_LISTS.sub("IN (?...)", normalized)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.query_count += 1
+        stats.query_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, normalize_sql(statement))
+
+
+def install_sql_hooks(target=Engine) -> None:
+    """Listen to cursor events on `target` (by default every Engine, including test and async engines)."""
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Route-level request metrics, keyed by method and route template (not the raw path)."""
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.queries: Dict[Tuple[str, str], int] = {}
+        self.query_seconds: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, route)
+        with self._lock:
+            self.latency.setdefault(key, Histogram()).observe(seconds)
+            self.responses[(method, route, status)] = self.responses.get((method, route, status), 0) + 1
+            self.queries[key] = self.queries.get(key, 0) + stats.query_count
+            self.query_seconds[key] = self.query_seconds.get(key, 0.0) + stats.query_seconds
+
+    def render(self, gauges: Iterable[Tuple[str, str, float]] = ()) -> str:
+        """Prometheus text exposition of the request metrics plus (name, help, value) gauges."""
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (method, route), histogram in sorted(self.latency.items()):
+                labels = f'method="{method}",route="{route}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.total}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+            lines += ["# HELP http_requests_total Responses by route and status.", "# TYPE http_requests_total counter"]
+            for (method, route, status), count in sorted(self.responses.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+            lines += [
+                "# HELP http_request_sql_queries_total SQL statements issued while serving each route.",
+                "# TYPE http_request_sql_queries_total counter",
+            ]
+            for (method, route), count in sorted(self.queries.items()):
+                lines.append(f'http_request_sql_queries_total{{method="{method}",route="{route}"}} {count}')
+            lines += [
+                "# HELP http_request_sql_seconds_total Time spent in SQL statements while serving each route.",
+                "# TYPE http_request_sql_seconds_total counter",
+            ]
+            for (method, route), seconds in sorted(self.query_seconds.items()):
+                lines.append(f'http_request_sql_seconds_total{{method="{method}",route="{route}"}} {seconds}')
+        for name, help_text, value in gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def metric_gauges(prefix: str, values: dict) -> List[Tuple[str, str, float]]:
+    """Numeric entries of a stats dict (pool_metrics, cache stats) as (name, help, value) gauges."""
+    return [
+        (f"{prefix}_{key}", f"{prefix} {key.replace('_', ' ')}.", value)
+        for key, value in values.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    ]
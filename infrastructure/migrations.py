@@ -0,0 +1,33 @@
+"""Apply the Alembic migrations in migrations/ to a database."""
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.pool import NullPool
+
+from infrastructure.database import DATABASE_URL
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+# The schema create_all built before migrations existed.
+BASELINE_REVISION = "0001"
+
+
+def alembic_config(url: str = DATABASE_URL) -> Config:
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    return config
+
+
+def upgrade(url: str = DATABASE_URL, revision: str = "head") -> None:
+    """Migrate to `revision`, first stamping databases that create_all built with the baseline revision."""
+    engine = create_engine(url, poolclass=NullPool)
+    with engine.connect() as connection:
+        tables = set(inspect(connection).get_table_names())
+    engine.dispose()
+    config = alembic_config(url)
+    if "item" in tables and "alembic_version" not in tables:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
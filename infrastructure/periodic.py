@@ -0,0 +1,29 @@
+"""Runs a blocking background job over and over from the event loop, for the sweeper, repricer and compactor."""
+import asyncio
+import logging
+from typing import Callable, Optional, TypeVar
+
+Report = TypeVar("Report")
+
+
+async def run_every(
+    interval: float,
+    step: Callable[[], Report],
+    logger: logging.Logger,
+    name: str,
+    again: Optional[Callable[[Report], bool]] = None,
+) -> None:
+    """Call `step` every `interval` seconds until cancelled; the blocking step runs in a worker thread.
+
+    A step that raises is logged as "`name` failed" and tried again after the interval. When
+    `again` is true of a step's report, the next step runs straight away instead.
+    """
+    while True:
+        try:
+            report = await asyncio.to_thread(step)
+        except Exception:
+            logger.exception("%s failed", name)
+        else:
+            if again is not None and again(report):
+                continue
+        await asyncio.sleep(interval)
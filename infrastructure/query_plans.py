@@ -0,0 +1,112 @@
+"""Record the SQL a block of code issues, EXPLAIN it and flag sequential scans of large tables."""
+import json
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+
+
+@dataclass(frozen=True)
+class RecordedQuery:
+    label: str
+    statement: str
+    parameters: object
+
+
+@dataclass(frozen=True)
+class SeqScan:
+    label: str
+    table: str
+    rows: int
+    statement: str
+
+
+class QueryRecorder:
+    """Collects each distinct statement executed on `engine`, tagged with the label active when it first ran."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.label = "?"
+        self.queries: Dict[str, RecordedQuery] = {}
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().lower().startswith(EXPLAINABLE) and statement not in self.queries:
+            if executemany:
+                parameters = parameters[0]
+            self.queries[statement] = RecordedQuery(self.label, statement, parameters)
+
+    @contextmanager
+    def recording(self) -> Iterator["QueryRecorder"]:
+        event.listen(self.engine, "before_cursor_execute", self._before_execute)
+        try:
+            yield self
+        finally:
+            event.remove(self.engine, "before_cursor_execute", self._before_execute)
+
+    @contextmanager
+    def labelled(self, label: str) -> Iterator[None]:
+        self.label = label
+        try:
+            yield
+        finally:
+            self.label = "?"
+
+
+def table_sizes(connection: Connection) -> Dict[str, int]:
+    return {
+        table: connection.execute(text(f'SELECT count(*) FROM "{table}"')).scalar_one()
+        for table in inspect(connection).get_table_names()
+    }
+
+
+def plan_nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def scanned_tables(connection: Connection, statement: str, parameters) -> List[str]:
+    """Tables the database plans to read in full for `statement`; index lookups do not count."""
+    if connection.dialect.name == "postgresql":
+        raw = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar_one()
+        plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+        return [node["Relation Name"] for node in plan_nodes(plan) if node["Node Type"] == "Seq Scan"]
+    # SQLite reports "SEARCH <table or alias> USING ..." for an index lookup, and "SCAN <table or
+    # alias>" when it reads every row, also when it walks a whole index ("SCAN ... USING INDEX").
+    # Walking a partial index only reads the rows it covers, so that does not count.
+    aliases = {alias: table for table, alias in re.findall(r"\b(\w+) AS (\w+)\b", statement)}
+    tables = []
+    for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+        detail = row[-1]
+        if detail.startswith("SCAN "):
+            name = detail.split()[1]
+            index = re.search(r"USING (?:COVERING )?INDEX (\w+)", detail)
+            if index and index.group(1) in partial_indexes(connection, aliases.get(name, name)):
+                continue
+            tables.append(aliases.get(name, name))
+    return tables
+
+
+def partial_indexes(connection: Connection, table: str) -> List[str]:
+    return [row[1] for row in connection.exec_driver_sql(f'PRAGMA index_list("{table}")') if row[4]]
+
+
+def find_seq_scans(engine: Engine, queries: List[RecordedQuery], min_rows: int, allowed: Optional[set] = None) -> List[SeqScan]:
+    """Sequential scans of tables holding at least `min_rows` rows, skipping queries labelled in `allowed`."""
+    allowed = allowed or set()
+    scans = []
+    with engine.connect() as connection:
+        sizes = table_sizes(connection)
+        for query in queries:
+            if query.label in allowed:
+                continue
+            for table in scanned_tables(connection, query.statement, query.parameters):
+                if sizes.get(table, 0) >= min_rows:
+                    scans.append(SeqScan(query.label, table, sizes[table], query.statement))
+        connection.rollback()
+    return scans
@@ -1,8 +1,797 @@
-from sqlalchemy.orm import Session
-from domain.models import Item, Cart, CartItem
-from domain.repo_interfaces import IItemRepository, ICartRepository
+import csv
+import io
+import random
+from datetime import datetime
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy import Integer, and_, bindparam, case, delete, func, insert, literal_column, null, or_, select, text, tuple_, union, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+from domain import money
+from domain.models import IdempotencyKey, Item, ItemChangeEvent, ItemStockShard, Cart, CartItem, StockMovement, utcnow
+from domain.repo_interfaces import (
+    IIdempotencyRepository,
+    IItemChangeRepository,
+    IItemRepository,
+    ICartRepository,
+    IStockJournalRepository,
+)
 from domain.models import Base
-from typing import List, Optional
+from schemas.cart import (
+    CartDisplay,
+    CartItemDisplay,
+    CartStats,
+    CartTotalsMismatch,
+    CartValue,
+    ItemReservation,
+    ReleasedReservation,
+    RepricedBatch,
+)
+from schemas.item import StockJournalMismatch
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+BULK_ITEM_COLUMNS = ("name", "price", "description", "thumbnail", "stock", "type")
+
+
+def invoice_totals(carts, prices: List) -> tuple:
+    """Line subtotals and per-cart totals of (cart_id, stored_total, lines) triples, `prices` listing every line's price.
+
+    A cart's stored total is used as is; only stale carts (stored_total None) are totalled,
+    in one batched pass of exact Decimal math over the line subtotals.
+    """
+    line_subtotals = money.line_subtotals([quantity for _, _, lines in carts for quantity, _ in lines], prices)
+    computed_totals = money.group_totals(line_subtotals, [len(lines) for _, _, lines in carts])
+    cart_totals = [
+        computed if stored_total is None else stored_total
+        for (_, stored_total, _), computed in zip(carts, computed_totals)
+    ]
+    return line_subtotals, cart_totals
+
+
+def build_cart_displays(carts) -> List[CartDisplay]:
+    """Build CartDisplays from (cart_id, stored_total, [(quantity, item), ...]) triples."""
+    carts = [(cart_id, stored_total, list(lines)) for cart_id, stored_total, lines in carts]
+    line_subtotals, cart_totals = invoice_totals(carts, [item.price for _, _, lines in carts for _, item in lines])
+    subtotals = iter(line_subtotals)
+    return [
+        CartDisplay(
+            id=cart_id,
+            items=[
+                CartItemDisplay(item_id=item.id, quantity=quantity, item=item, subtotal=next(subtotals))
+                for quantity, item in lines
+            ],
+            total=cart_total,
+        )
+        for (cart_id, _, lines), cart_total in zip(carts, cart_totals)
+    ]
+
+
+def build_cart_rows(carts) -> List[dict]:
+    """Like build_cart_displays, for items given as ItemDisplay-shaped dicts; returns CartDisplay-shaped dicts."""
+    carts = [(cart_id, stored_total, list(lines)) for cart_id, stored_total, lines in carts]
+    line_subtotals, cart_totals = invoice_totals(carts, [item["price"] for _, _, lines in carts for _, item in lines])
+    subtotals = iter(line_subtotals)
+    return [
+        {
+            "id": cart_id,
+            "items": [
+                {"item_id": item["id"], "quantity": quantity, "item": item, "subtotal": next(subtotals)}
+                for quantity, item in lines
+            ],
+            "total": cart_total,
+        }
+        for (cart_id, _, lines), cart_total in zip(carts, cart_totals)
+    ]
+
+
+def build_cart_display(cart_id: int, lines) -> CartDisplay:
+    """Build a CartDisplay from (quantity, item) pairs, computing subtotals and the total in one pass."""
+    return build_cart_displays([(cart_id, None, lines)])[0]
+
+
+def cart_item_columns(plain_items: bool) -> tuple:
+    """The Item entity, or with `plain_items` its ItemDisplay columns labelled item_<field>."""
+    if not plain_items:
+        return (Item,)
+    return tuple(column.label(f"item_{field}") for field, column in item_columns().items())
+
+
+def cart_invoice_query(cart_id: int, plain_items: bool = False):
+    """SELECT a cart with its version, its lines and their items with one outer join."""
+    return (
+        select(Cart.id, Cart.total, Cart.version, CartItem.quantity, Item.reprice_pending, *cart_item_columns(plain_items))
+        .outerjoin(CartItem, CartItem.cart_id == Cart.id)
+        .outerjoin(Item, Item.id == CartItem.item_id)
+        .where(Cart.id == cart_id)
+        .order_by(CartItem.item_id)
+    )
+
+
+def cart_display_page_query(after_id: Optional[int], limit: Optional[int], plain_items: bool = False):
+    """SELECT one keyset page of carts with their lines and items, as a single grouped query."""
+    carts = select(Cart.id, Cart.total, Cart.version).order_by(Cart.id)
+    if after_id is not None:
+        carts = carts.where(Cart.id > after_id)
+    if limit is not None:
+        carts = carts.limit(limit)
+    carts = carts.subquery()
+    return (
+        select(carts.c.id, carts.c.total, carts.c.version, CartItem.quantity, Item.reprice_pending, *cart_item_columns(plain_items))
+        .outerjoin(CartItem, CartItem.cart_id == carts.c.id)
+        .outerjoin(Item, Item.id == CartItem.item_id)
+        .order_by(carts.c.id, CartItem.item_id)
+    )
+
+
+def group_cart_lines(rows, make_item: Callable) -> Iterator[tuple]:
+    """Turn (cart_id, total, version, quantity, reprice_pending, *item) rows ordered by cart ID into (cart_id, stored_total, lines).
+
+    The stored total of a cart holding an item with a repricing pending is dropped, so the
+    cart is totalled at the item's new price until the CartRepricer has caught up.
+    """
+    for (cart_id, stored_total), group in groupby(rows, key=itemgetter(0, 1)):
+        lines, repricing = [], False
+        for _, _, _, quantity, reprice_pending, *item in group:
+            if item[0] is not None:
+                lines.append((quantity, make_item(item)))
+                repricing = repricing or reprice_pending > 0
+        yield cart_id, None if repricing else stored_total, lines
+
+
+def group_cart_displays(rows) -> Iterator[CartDisplay]:
+    """Turn (cart_id, total, version, quantity, reprice_pending, item) rows ordered by cart ID into one CartDisplay per cart."""
+    yield from build_cart_displays(group_cart_lines(rows, itemgetter(0)))
+
+
+def group_cart_rows(rows) -> List[dict]:
+    """Like group_cart_displays, for rows selected with `plain_items`; returns CartDisplay-shaped dicts."""
+    fields = list(item_columns())
+    return build_cart_rows(group_cart_lines(rows, lambda item: dict(zip(fields, item))))
+
+
+def item_columns():
+    """The column expression behind each ItemDisplay field; `stock` includes shard counters."""
+    return {
+        "id": Item.id,
+        "name": Item.name,
+        "price": Item.price,
+        "description": Item.description,
+        "thumbnail": Item.thumbnail,
+        "stock": Item.available_stock,
+        "type": Item.type,
+    }
+
+
+def item_page_query(after_id: Optional[int], limit: Optional[int], fields: Sequence[str], sort: str, descending: bool):
+    """SELECT just `fields` of one page of items, ordered by `sort` then ID, seeking past `after_id`.
+
+    The cursor is the (sort value, ID) pair of the `after_id` row, read by a subquery, so
+    clients only pass the last ID they saw whatever the sort order.
+    """
+    columns = item_columns()
+    sort_column = columns[sort]
+    query = select(*(columns[field].label(field) for field in fields))
+    if after_id is not None:
+        if sort == "id":
+            query = query.where(Item.id < after_id if descending else Item.id > after_id)
+        else:
+            cursor_item = aliased(Item)
+            cursor = select(getattr(cursor_item, sort), cursor_item.id).where(cursor_item.id == after_id).scalar_subquery()
+            key = tuple_(sort_column, Item.id)
+            query = query.where(key < cursor if descending else key > cursor)
+    order = [sort_column.desc(), Item.id.desc()] if descending else [sort_column, Item.id]
+    query = query.order_by(*(order[1:] if sort == "id" else order))
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+# INSERT constructs with ON CONFLICT, per dialect; create_db_engine accepts no other database.
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def upsert_insert(db_session: Session, model):
+    """Return a dialect-specific INSERT that supports ON CONFLICT for the session's database."""
+    return UPSERT_INSERTS[db_session.get_bind().dialect.name](model)
+
+
+def reserve_stock_query(item_id: int, quantity: int):
+    """UPDATE that takes stock only if enough is left, returning the item (no row when it is short, sharded or journaled)."""
+    return (
+        update(Item)
+        .where(Item.id == item_id, Item.stock_shards == 0, ~Item.stock_journaled, Item.stock >= quantity)
+        .values(stock=Item.stock - quantity)
+        .returning(Item)
+    )
+
+
+def release_stock_query(item_id: int, quantity: int):
+    """UPDATE that gives stock back, returning the item (no row when it is sharded or journaled)."""
+    return (
+        update(Item)
+        .where(Item.id == item_id, Item.stock_shards == 0, ~Item.stock_journaled)
+        .values(stock=Item.stock + quantity)
+        .returning(Item)
+    )
+
+
+def apply_stock_deltas_query(deltas: Dict[int, int]):
+    """UPDATE the stock of every item in {item_id: units} at once, taking (positive) or returning (negative) units.
+
+    The units come in as one VALUES list, in item ID order. Each row is taken only if enough
+    stock is left, and the IDs of the rows updated are returned, so a short item shows up as a
+    missing ID on any driver. SQLite cannot name the columns of VALUES in FROM, so they are
+    renamed from column1 and column2, which both databases call them.
+    """
+    rows = sorted(deltas.items())
+    params = [
+        param
+        for n, (item_id, delta) in enumerate(rows)
+        for param in (bindparam(f"id_{n}", item_id, Integer), bindparam(f"delta_{n}", delta, Integer))
+    ]
+    rows_sql = ", ".join(f"(:id_{n}, :delta_{n})" for n in range(len(rows)))
+    deltas_table = (
+        text(f"SELECT column1 AS id, column2 AS delta FROM (VALUES {rows_sql}) AS delta_rows")
+        .bindparams(*params)
+        .columns(id=Integer, delta=Integer)
+        .subquery("deltas")
+    )
+    item = Item.__table__
+    return (
+        update(item)
+        .where(item.c.id == deltas_table.c.id, item.c.stock >= deltas_table.c.delta)
+        .values(stock=item.c.stock - deltas_table.c.delta)
+        .returning(item.c.id)
+    )
+
+
+def unsharded_item(item: Optional[Item]) -> Optional[Item]:
+    """Fill in `available_stock` of an unsharded item loaded by UPDATE ... RETURNING, which leaves it unloaded."""
+    if item is not None:
+        set_committed_value(item, "available_stock", item.stock)
+    return item
+
+
+def take_from_shard_query(item_id: int, shard: int, quantity: int):
+    """UPDATE that takes stock from one shard counter only if enough is left in it."""
+    return (
+        update(ItemStockShard)
+        .where(ItemStockShard.item_id == item_id, ItemStockShard.shard == shard, ItemStockShard.stock >= quantity)
+        .values(stock=ItemStockShard.stock - quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def give_to_shard_query(item_id: int, shard: int, quantity: int):
+    return (
+        update(ItemStockShard)
+        .where(ItemStockShard.item_id == item_id, ItemStockShard.shard == shard)
+        .values(stock=ItemStockShard.stock + quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def split_stock(total: int, shards: int) -> List[int]:
+    """`total` spread evenly over `shards` counters, the first ones taking the remainder."""
+    base, extra = divmod(total, shards)
+    return [base + (1 if shard < extra else 0) for shard in range(shards)]
+
+
+def plan_take(counters: List[int], quantity: int) -> Optional[List[int]]:
+    """How much to take from each counter to make up `quantity`, draining them in order; None if they hold too little."""
+    if sum(counters) < quantity:
+        return None
+    taken = []
+    for available in counters:
+        take = min(available, quantity)
+        taken.append(take)
+        quantity -= take
+    return taken
+
+
+def take_stock_from_shards(db_session: Session, item_id: int, shards: int, quantity: int, rng=random) -> bool:
+    """Take `quantity` units of a sharded item's stock, without committing. Returns False if it is short.
+
+    Concurrent reservations start at different random shards, so they update different rows
+    instead of queueing on one. Only when no single shard holds enough are the item row and
+    all its shards locked (in shard order) and drained together.
+    """
+    start = rng.randrange(shards)
+    for offset in range(shards):
+        if db_session.execute(take_from_shard_query(item_id, (start + offset) % shards, quantity)).rowcount:
+            return True
+
+    row_stock = db_session.scalar(select(Item.stock).where(Item.id == item_id).with_for_update())
+    counters = db_session.execute(
+        select(ItemStockShard.shard, ItemStockShard.stock)
+        .where(ItemStockShard.item_id == item_id)
+        .order_by(ItemStockShard.shard)
+        .with_for_update()
+    ).all()
+    taken = plan_take([row_stock or 0] + [stock for _, stock in counters], quantity)
+    if taken is None:
+        return False
+    if taken[0]:
+        db_session.execute(
+            update(Item).where(Item.id == item_id).values(stock=Item.stock - taken[0])
+            .execution_options(synchronize_session=False)
+        )
+    drained = [
+        {"item_id": item_id, "shard": shard, "stock": stock - take}
+        for (shard, stock), take in zip(counters, taken[1:]) if take
+    ]
+    if drained:
+        db_session.execute(update(ItemStockShard), drained)
+    return True
+
+
+def give_stock_to_shard(db_session: Session, item_id: int, shards: int, quantity: int, rng=random) -> None:
+    db_session.execute(give_to_shard_query(item_id, rng.randrange(shards), quantity))
+
+
+def write_stock_shards(db_session: Session, item_id: int, shards: int, total: int) -> None:
+    """Set an item's stock to `total`, spread over `shards` counters (0 keeps it all on the item row), without committing."""
+    db_session.execute(delete(ItemStockShard).where(ItemStockShard.item_id == item_id))
+    if shards:
+        db_session.execute(
+            insert(ItemStockShard),
+            [{"item_id": item_id, "shard": shard, "stock": stock} for shard, stock in enumerate(split_stock(total, shards))],
+        )
+    db_session.execute(
+        update(Item).where(Item.id == item_id).values(stock=0 if shards else total, stock_shards=shards)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def lock_journaled_item(db_session: Session, item_id: int):
+    """Lock a journaled item's row and return its (stock, stock_snapshot_id); None if it is not journaled.
+
+    Every journal write holds this lock until it commits, so the compactor, which takes it too,
+    never moves the snapshot past a movement that is still to commit. FOR NO KEY UPDATE does not
+    block the foreign key checks of cart lines being written for the item.
+    """
+    return db_session.execute(
+        select(Item.stock, Item.stock_snapshot_id)
+        .where(Item.id == item_id, Item.stock_journaled)
+        .with_for_update(key_share=True)
+    ).one_or_none()
+
+
+def unfolded_movements_query(item_id: int, after_id: int):
+    """The sum, last ID and count of an item's movements after `after_id`."""
+    return select(
+        func.coalesce(func.sum(StockMovement.delta), 0), func.max(StockMovement.id), func.count()
+    ).where(StockMovement.item_id == item_id, StockMovement.id > after_id)
+
+
+def journaled_stock(db_session: Session, item_id: int) -> Optional[int]:
+    """Lock a journaled item and return its stock: the snapshot plus the movements since. None if it is not journaled."""
+    snapshot = lock_journaled_item(db_session, item_id)
+    if snapshot is None:
+        return None
+    delta, _, _ = db_session.execute(unfolded_movements_query(item_id, snapshot.stock_snapshot_id)).one()
+    return snapshot.stock + delta
+
+
+def record_stock_movement(db_session: Session, item_id: int, delta: int, reason: str, cart_id: Optional[int] = None) -> int:
+    return db_session.scalar(
+        insert(StockMovement).values(item_id=item_id, delta=delta, cart_id=cart_id, reason=reason).returning(StockMovement.id)
+    )
+
+
+def take_stock_from_journal(db_session: Session, item_id: int, quantity: int, cart_id: Optional[int] = None) -> bool:
+    """Take `quantity` units of a journaled item by appending a movement, without committing. False if it is short."""
+    available = journaled_stock(db_session, item_id)
+    if available is None or available < quantity:
+        return False
+    record_stock_movement(db_session, item_id, -quantity, "reserve", cart_id)
+    return True
+
+
+def give_stock_to_journal(db_session: Session, item_id: int, quantity: int, cart_id: Optional[int] = None) -> bool:
+    if lock_journaled_item(db_session, item_id) is None:
+        return False
+    record_stock_movement(db_session, item_id, quantity, "release", cart_id)
+    return True
+
+
+def write_stock_journal(db_session: Session, item_id: int, total: int) -> None:
+    """Set a journaled item's stock to `total` with a restock movement of the difference, without committing."""
+    available = journaled_stock(db_session, item_id)
+    if available is not None and available != total:
+        record_stock_movement(db_session, item_id, total - available, "restock")
+
+
+def compact_stock_journal(db_session: Session, item_id: int) -> int:
+    """Fold a journaled item's movements since its snapshot into `stock`, without committing. Returns how many."""
+    snapshot = lock_journaled_item(db_session, item_id)
+    if snapshot is None:
+        return 0
+    delta, last_id, count = db_session.execute(unfolded_movements_query(item_id, snapshot.stock_snapshot_id)).one()
+    if count:
+        db_session.execute(
+            update(Item).where(Item.id == item_id).values(stock=Item.stock + delta, stock_snapshot_id=last_id)
+            .execution_options(synchronize_session=False)
+        )
+    return count
+
+
+def open_stock_journal(db_session: Session, item_id: int) -> None:
+    """Start journaling an item's stock, merging its shards back first, without committing.
+
+    The opening movement brings the sum of the item's movements, including any from an earlier
+    spell of journaling, to its current stock.
+    """
+    row_stock = db_session.scalar(select(Item.stock).where(Item.id == item_id).with_for_update(key_share=True))
+    shard_stock = db_session.scalars(
+        select(ItemStockShard.stock)
+        .where(ItemStockShard.item_id == item_id)
+        .order_by(ItemStockShard.shard)
+        .with_for_update()
+    ).all()
+    total = row_stock + sum(shard_stock)
+    if shard_stock:
+        write_stock_shards(db_session, item_id, 0, total)
+    journal_total = db_session.scalar(
+        select(func.coalesce(func.sum(StockMovement.delta), 0)).where(StockMovement.item_id == item_id)
+    )
+    movement_id = record_stock_movement(db_session, item_id, total - journal_total, "open")
+    db_session.execute(
+        update(Item).where(Item.id == item_id).values(stock=total, stock_journaled=True, stock_snapshot_id=movement_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def close_stock_journal(db_session: Session, item_id: int) -> None:
+    """Fold an item's journal into `stock` and go back to updating the row, without committing. The movements stay."""
+    compact_stock_journal(db_session, item_id)
+    db_session.execute(
+        update(Item).where(Item.id == item_id).values(stock_journaled=False)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def take_stock_off_row(db_session: Session, item_id: int, quantity: int, cart_id: Optional[int] = None) -> bool:
+    """Take stock of an item that reserve_stock_query leaves alone: from its shards or its journal.
+
+    False if it is short, missing, or keeps its stock on the item row.
+    """
+    mode = db_session.execute(select(Item.stock_shards, Item.stock_journaled).where(Item.id == item_id)).one_or_none()
+    if mode is None:
+        return False
+    if mode.stock_journaled:
+        return take_stock_from_journal(db_session, item_id, quantity, cart_id)
+    return bool(mode.stock_shards) and take_stock_from_shards(db_session, item_id, mode.stock_shards, quantity)
+
+
+def give_stock_off_row(db_session: Session, item_id: int, quantity: int, cart_id: Optional[int] = None) -> bool:
+    """Give stock back to a sharded or journaled item; False if it is missing or keeps its stock on the item row."""
+    mode = db_session.execute(select(Item.stock_shards, Item.stock_journaled).where(Item.id == item_id)).one_or_none()
+    if mode is None:
+        return False
+    if mode.stock_journaled:
+        return give_stock_to_journal(db_session, item_id, quantity, cart_id)
+    if mode.stock_shards:
+        give_stock_to_shard(db_session, item_id, mode.stock_shards, quantity)
+        return True
+    return False
+
+
+def write_stock_off_row(db_session: Session, item, total: int) -> bool:
+    """Set the stock of a sharded or journaled item to `total`; False if it keeps its stock on the row.
+
+    `item` is an Item, or a row of its id, stock_shards and stock_journaled.
+    """
+    if item.stock_journaled:
+        write_stock_journal(db_session, item.id, total)
+    elif item.stock_shards:
+        write_stock_shards(db_session, item.id, item.stock_shards, total)
+    else:
+        return False
+    return True
+
+
+def journal_snapshot_stock():
+    """What a journaled item's `stock` should be: the sum of its movements up to its snapshot."""
+    return (
+        select(func.coalesce(func.sum(StockMovement.delta), 0))
+        .where(StockMovement.item_id == Item.id, StockMovement.id <= Item.stock_snapshot_id)
+        .correlate(Item)
+        .scalar_subquery()
+    )
+
+
+def stock_journal_check_query():
+    return select(Item.id, Item.stock, journal_snapshot_stock()).where(Item.stock_journaled).order_by(Item.id)
+
+
+def upsert_cart_item_query(db_session: Session, cart_id: int, item_id: int, quantity: int, reserved_at: datetime):
+    """INSERT a cart line, or add `quantity` to it when the line already exists, returning the line and whether it is new.
+
+    Either way the line's reservation is renewed as of `reserved_at`. The statement tells an
+    insert from an update itself, so concurrent first adds cannot both count a new line:
+    PostgreSQL leaves xmax at 0 on an inserted row, and elsewhere an updated line holds more
+    than `quantity`, since lines are never left empty.
+    """
+    stmt = upsert_insert(db_session, CartItem).values(
+        cart_id=cart_id, item_id=item_id, quantity=quantity, reserved_at=reserved_at
+    )
+    if db_session.get_bind().dialect.name == "postgresql":
+        inserted = literal_column("xmax") == text("'0'")
+    else:
+        inserted = CartItem.quantity == quantity
+    return stmt.on_conflict_do_update(
+        index_elements=[CartItem.cart_id, CartItem.item_id],
+        set_={"quantity": CartItem.quantity + stmt.excluded.quantity, "reserved_at": stmt.excluded.reserved_at},
+    ).returning(CartItem, inserted.label("inserted"))
+
+
+def take_cart_units(db_session: Session, cart_id: int, item_id: int, quantity: Optional[int]) -> Optional[Tuple[int, bool]]:
+    """Take `quantity` units (all of them when None) off a cart line and give them back to stock, without committing.
+
+    The line is read and changed by one conditional statement, DELETE ... RETURNING or
+    UPDATE ... WHERE quantity >= :n, which keeps it locked until the commit: concurrent removals,
+    the reservation sweeper and /ops batches never release the same units twice. Like the
+    sweeper, the line is locked before the item's stock. Returns (units taken, whether the line
+    is gone); None when the line is missing or holds fewer than `quantity`.
+    """
+    line = and_(CartItem.cart_id == cart_id, CartItem.item_id == item_id)
+    if quantity is None:
+        taken = db_session.scalar(
+            delete(CartItem).where(line).returning(CartItem.quantity).execution_options(synchronize_session=False)
+        )
+        emptied = True
+    else:
+        left = db_session.scalar(
+            update(CartItem)
+            .where(line, CartItem.quantity >= quantity)
+            .values(quantity=CartItem.quantity - quantity)
+            .returning(CartItem.quantity)
+            .execution_options(synchronize_session=False)
+        )
+        taken, emptied = (None, False) if left is None else (quantity, left == 0)
+        if emptied:
+            db_session.execute(delete(CartItem).where(line).execution_options(synchronize_session=False))
+    if taken is None:
+        return None
+    if db_session.execute(release_stock_query(item_id, taken)).first() is None:
+        give_stock_off_row(db_session, item_id, taken, cart_id)
+    return taken, emptied
+
+
+def expire_reservations_query(cutoff: datetime, limit: int):
+    """DELETE up to `limit` cart lines reserved before `cutoff`, oldest first, returning what they held.
+
+    On PostgreSQL the lines are picked with FOR UPDATE SKIP LOCKED, so a sweep never waits on
+    (or steals) a line that a request is changing: removals lock the line with the statement that
+    changes it (see take_cart_units), and adds with their upsert. An /ops batch only writes the
+    lines at the cart version it read them at, which the sweep bumps, so it re-reads them instead.
+    """
+    expired = (
+        select(CartItem.cart_id, CartItem.item_id)
+        .where(CartItem.reserved_at < cutoff)
+        .order_by(CartItem.reserved_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        delete(CartItem)
+        .where(tuple_(CartItem.cart_id, CartItem.item_id).in_(expired))
+        .returning(CartItem.cart_id, CartItem.item_id, CartItem.quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def cart_totals_from_lines():
+    """Correlated subqueries recomputing a cart's total and line count from its lines."""
+    total = (
+        select(func.coalesce(func.sum(CartItem.quantity * Item.price), 0))
+        .join(Item, Item.id == CartItem.item_id)
+        .where(CartItem.cart_id == Cart.id)
+        .scalar_subquery()
+    )
+    line_count = select(func.count()).select_from(CartItem).where(CartItem.cart_id == Cart.id).scalar_subquery()
+    return total, line_count
+
+
+def cart_awaits_reprice():
+    """Correlated EXISTS: the cart holds an item whose price change the CartRepricer has not applied yet."""
+    return (
+        select(CartItem.cart_id)
+        .join(Item, Item.id == CartItem.item_id)
+        .where(CartItem.cart_id == Cart.id, Item.reprice_pending > 0)
+        .exists()
+    )
+
+
+def bump_cart_version(stmt, expected_version: Optional[int] = None):
+    """Make a cart UPDATE bump the version; with `expected_version`, only of a cart still at that version.
+
+    The version check is part of the UPDATE's WHERE clause, so a concurrent change is detected
+    from the rowcount without locking the cart beforehand.
+    """
+    stmt = stmt.values(version=Cart.version + 1)
+    return stmt if expected_version is None else stmt.where(Cart.version == expected_version)
+
+
+def adjust_cart_totals_query(
+    cart_id: int, item_id: int, quantity_delta: int, line_delta: int, expected_version: Optional[int] = None
+):
+    """UPDATE a cart's stored total by `quantity_delta` units of the item's current price.
+
+    A stale (NULL) total stays NULL, so it is still recomputed in full on the next read. The total
+    of a cart holding an item whose reprice is pending is made stale too: it was summed at the old
+    price, and a line removed now would drop out of the repricer's reach. The changed item is
+    checked on its own as well, since its line may already be gone.
+    """
+    price = select(Item.price).where(Item.id == item_id).scalar_subquery()
+    item_awaits_reprice = select(Item.reprice_pending).where(Item.id == item_id).scalar_subquery() > 0
+    total = case(
+        (or_(item_awaits_reprice, cart_awaits_reprice()), null()), else_=Cart.total + quantity_delta * price
+    )
+    return bump_cart_version(
+        update(Cart)
+        .where(Cart.id == cart_id)
+        .values(total=total, line_count=Cart.line_count + line_delta)
+        .execution_options(synchronize_session=False),
+        expected_version,
+    )
+
+
+def refresh_cart_totals_query(cart_ids: Optional[List[int]] = None):
+    """UPDATE the stored totals of `cart_ids` (or of every stale cart) from a full recompute.
+
+    The version is left alone: a recompute does not change what the cart holds, so a read that
+    refreshes a stale total serves an ETag that stays valid.
+    """
+    total, line_count = cart_totals_from_lines()
+    where = Cart.total.is_(None) if cart_ids is None else Cart.id.in_(cart_ids)
+    return (
+        update(Cart)
+        .where(where)
+        .values(total=total, line_count=line_count)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def price_change_queries(changes: Dict[int, tuple]):
+    """INSERT an outbox event per repriced item, {item_id: (old_price, new_price)}, and count it as pending on the item.
+
+    The carts holding the items are left to the CartRepricer, so a price change writes the
+    same few rows however many carts hold the item.
+    """
+    events = insert(ItemChangeEvent).values([
+        {"item_id": item_id, "old_price": old_price, "new_price": new_price}
+        for item_id, (old_price, new_price) in sorted(changes.items())
+    ])
+    pending = (
+        update(Item)
+        .where(Item.id.in_(sorted(changes)))
+        .values(reprice_pending=Item.reprice_pending + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return events, pending
+
+
+def cart_ids_holding_item_query(item_id: int, after_cart_id: int, limit: int):
+    """SELECT the next `limit` carts holding `item_id` after `after_cart_id`, from ix_cart_item_item_id_cart_id_quantity."""
+    return (
+        select(CartItem.cart_id)
+        .where(CartItem.item_id == item_id, CartItem.cart_id > after_cart_id)
+        .order_by(CartItem.cart_id)
+        .limit(limit)
+    )
+
+
+def cart_totals_check_query():
+    """SELECT every cart's stored total and line count next to a full recompute of both, and whether it awaits repricing."""
+    total, line_count = cart_totals_from_lines()
+    return select(Cart.id, Cart.total, Cart.line_count, total, line_count, cart_awaits_reprice()).order_by(Cart.id)
+
+
+def cart_totals_mismatches(rows) -> List[CartTotalsMismatch]:
+    """Keep the (cart_id, stored total, stored line count, total, line count, repricing) rows that disagree.
+
+    Stale carts (NULL total) and carts awaiting the CartRepricer are pending a recompute, so
+    only their line count is checked.
+    """
+    mismatches = []
+    for cart_id, stored_total, stored_line_count, total, line_count, repricing in rows:
+        total = money.to_decimal(total)
+        pending = stored_total is None or repricing
+        if (not pending and money.to_decimal(stored_total) != total) or stored_line_count != line_count:
+            mismatches.append(
+                CartTotalsMismatch(
+                    cart_id=cart_id,
+                    stored_total=stored_total,
+                    stored_line_count=stored_line_count,
+                    total=total,
+                    line_count=line_count,
+                )
+            )
+    return mismatches
+
+
+def reserved_by_item_query():
+    """SELECT the lines, units and value held in carts per item, in one aggregate over cart_item joined with item."""
+    units = func.sum(CartItem.quantity)
+    return (
+        select(Item.id, Item.type, func.count(), units, func.sum(CartItem.quantity * Item.price))
+        .select_from(CartItem)
+        .join(Item, Item.id == CartItem.item_id)
+        .group_by(Item.id, Item.type)
+        .order_by(units.desc(), Item.id)
+    )
+
+
+def top_carts_query(top: int):
+    """SELECT the `top` carts with the highest stored totals, leaving out the carts pending a recompute."""
+    return (
+        select(Cart.id, Cart.total)
+        .where(Cart.total.is_not(None), ~cart_awaits_reprice())
+        .order_by(Cart.total.desc(), Cart.id)
+        .limit(top)
+    )
+
+
+def pending_cart_totals_query(top: int):
+    """SELECT the `top` carts with the highest current totals among those whose stored total is stale or awaits repricing.
+
+    The carts are found from the items with a pending reprice (a pass over the catalog, not the
+    carts), through ix_cart_item_item_id_cart_id_quantity, and from the stale totals, through
+    ix_cart_total; only they are totalled from their lines, and ranked and cut to `top` in SQL. Reading them
+    this way leaves the stored totals to the CartRepricer and the writers, so a report never writes.
+    """
+    total, _ = cart_totals_from_lines()
+    total = total.label("current_total")
+    repricing_items = select(Item.id).where(Item.reprice_pending > 0)
+    pending = union(
+        select(CartItem.cart_id).where(CartItem.item_id.in_(repricing_items)),
+        select(Cart.id).where(Cart.total.is_(None)),
+    ).subquery()
+    return (
+        select(Cart.id, total)
+        .join(pending, pending.c.cart_id == Cart.id)
+        .order_by(total.desc(), Cart.id)
+        .limit(top)
+    )
+
+
+def build_cart_stats(cart_count: int, reserved_rows, top_cart_rows, top: int = 10) -> CartStats:
+    """Fold per-item (item_id, type, lines, units, value) rows into the cart-wide summary.
+
+    `top_cart_rows` are (cart_id, total) pairs, of which the `top` highest totals are kept.
+    """
+    reserved_by_item = []
+    value_by_type: Dict[str, Decimal] = {}
+    line_count = 0
+    for item_id, item_type, lines, units, value in reserved_rows:
+        value = money.to_decimal(value)
+        line_count += lines
+        value_by_type[item_type] = value_by_type.get(item_type, money.ZERO) + value
+        reserved_by_item.append(ItemReservation(item_id=item_id, type=item_type, quantity=units, value=value))
+    return CartStats(
+        cart_count=cart_count,
+        line_count=line_count,
+        units_reserved=sum(reservation.quantity for reservation in reserved_by_item),
+        total_value=sum(value_by_type.values(), money.ZERO),
+        value_by_type=value_by_type,
+        reserved_by_item=reserved_by_item,
+        top_carts=[
+            CartValue(cart_id=cart_id, total=total)
+            for total, cart_id in sorted(
+                ((money.to_decimal(total), cart_id) for cart_id, total in top_cart_rows),
+                key=lambda row: (-row[0], row[1]),
+            )[:top]
+        ],
+    )
+
 
 class ItemRepository(IItemRepository):
     def __init__(self, db_session: Session):
@@ -19,14 +808,33 @@ class ItemRepository(IItemRepository):
     def list(self) -> List[Item]:
         return self.db_session.query(Item).all()
 
+    def get_many(self, item_ids: List[int]) -> List[Item]:
+        return list(self.db_session.scalars(select(Item).where(Item.id.in_(item_ids))))
+
+    def list_page(
+        self,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        fields: Sequence[str] = ("id",),
+        sort: str = "id",
+        descending: bool = False,
+    ) -> List[dict]:
+        """Plain rows of the selected columns; no Item objects are built."""
+        rows = self.db_session.execute(item_page_query(after_id, limit, fields, sort, descending))
+        return [dict(row) for row in rows.mappings()]
+
     def update(self, item_id: int, item_data: dict) -> Optional[Item]:
         item = self.db_session.query(Item).filter(Item.id == item_id).one_or_none()
         if item:
+            if "price" in item_data and item_data["price"] != item.price:
+                for stmt in price_change_queries({item_id: (item.price, item_data["price"])}):
+                    self.db_session.execute(stmt)
+            if item_data.get("stock") is not None and write_stock_off_row(self.db_session, item, item_data["stock"]):
+                item_data = {key: value for key, value in item_data.items() if key != "stock"}
             for key, value in item_data.items():
                 setattr(item, key, value)
-            self.db_session.flush()
+            self.db_session.commit()
             return item
-        self.db_session.commit()
         return None
 
     def delete(self, item_id: int) -> None:
@@ -46,9 +854,157 @@ class ItemRepository(IItemRepository):
         else:
             raise ValueError("Item not found")
 
+    def reserve_stock(self, item_id: int, quantity: int, cart_id: Optional[int] = None) -> Optional[Item]:
+        """Check and take stock in one conditional UPDATE, without committing.
+
+        Sharded items are taken from their shard counters instead (see take_stock_from_shards),
+        and journaled items by appending a movement (see take_stock_from_journal).
+        """
+        item = unsharded_item(self.db_session.execute(
+            reserve_stock_query(item_id, quantity), execution_options={"populate_existing": True}
+        ).scalar_one_or_none())
+        if item is None and take_stock_off_row(self.db_session, item_id, quantity, cart_id):
+            item = self.db_session.get(Item, item_id, populate_existing=True)
+        return item
+
+    def release_stock(self, item_id: int, quantity: int, cart_id: Optional[int] = None) -> Optional[Item]:
+        """Give stock back in one UPDATE (to a random shard, or the journal), without committing."""
+        item = unsharded_item(self.db_session.execute(
+            release_stock_query(item_id, quantity), execution_options={"populate_existing": True}
+        ).scalar_one_or_none())
+        if item is None and give_stock_off_row(self.db_session, item_id, quantity, cart_id):
+            item = self.db_session.get(Item, item_id, populate_existing=True)
+        return item
+
+    def set_stock_shards(self, item_id: int, shards: int) -> Optional[Item]:
+        """Sharding a journaled item turns its journal off first."""
+        close_stock_journal(self.db_session, item_id)
+        row_stock = self.db_session.scalar(select(Item.stock).where(Item.id == item_id).with_for_update())
+        if row_stock is None:
+            return None
+        shard_stock = self.db_session.scalars(
+            select(ItemStockShard.stock)
+            .where(ItemStockShard.item_id == item_id)
+            .order_by(ItemStockShard.shard)
+            .with_for_update()
+        ).all()
+        write_stock_shards(self.db_session, item_id, shards, row_stock + sum(shard_stock))
+        self.db_session.commit()
+        return self.db_session.get(Item, item_id, populate_existing=True)
+
+    def set_stock_journal(self, item_id: int, enabled: bool) -> Optional[Item]:
+        journaled = self.db_session.scalar(
+            select(Item.stock_journaled).where(Item.id == item_id).with_for_update(key_share=True)
+        )
+        if journaled is None:
+            return None
+        if enabled and not journaled:
+            open_stock_journal(self.db_session, item_id)
+        elif journaled and not enabled:
+            close_stock_journal(self.db_session, item_id)
+        self.db_session.commit()
+        return self.db_session.get(Item, item_id, populate_existing=True)
+
+    def stock_levels(self, item_ids: Optional[List[int]] = None) -> Dict[int, int]:
+        query = select(Item.id, Item.available_stock)
+        if item_ids is not None:
+            query = query.where(Item.id.in_(item_ids))
+        return dict(self.db_session.execute(query).tuples().all())
+
+    def apply_stock_deltas(self, deltas: Dict[int, int], cart_id: Optional[int] = None) -> bool:
+        if not deltas:
+            return True
+        off_row = set(
+            self.db_session.scalars(
+                select(Item.id).where(Item.id.in_(list(deltas)), or_(Item.stock_shards > 0, Item.stock_journaled))
+            )
+        )
+        on_row = {item_id: delta for item_id, delta in deltas.items() if item_id not in off_row}
+        applied = len(self.db_session.execute(apply_stock_deltas_query(on_row)).all()) if on_row else 0
+        for item_id in sorted(off_row):
+            delta = deltas[item_id]
+            if delta < 0:
+                give_stock_off_row(self.db_session, item_id, -delta, cart_id)
+            elif not take_stock_off_row(self.db_session, item_id, delta, cart_id):
+                break
+            applied += 1
+        if applied != len(deltas):
+            self.db_session.rollback()
+            return False
+        return True
+
+    def bulk_create(self, rows: List[dict]) -> int:
+        """Insert with PostgreSQL COPY when running on psycopg2, otherwise with one multi-row INSERT."""
+        if not rows:
+            return 0
+        dialect = self.db_session.get_bind().dialect
+        try:
+            if dialect.driver == "psycopg2":
+                self._copy_items(rows)
+            else:
+                self.db_session.execute(insert(Item), rows)
+            self.db_session.commit()
+        except (SQLAlchemyError, dialect.loaded_dbapi.Error) as e:
+            self.db_session.rollback()
+            raise ValueError(str(getattr(e, "orig", e)))
+        return len(rows)
+
+    def _copy_items(self, rows: List[dict]) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([row[column] for column in BULK_ITEM_COLUMNS])
+        buffer.seek(0)
+        cursor = self.db_session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY item ({', '.join(BULK_ITEM_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+    def bulk_update(self, rows: List[dict]) -> int:
+        if not rows:
+            return 0
+        new_prices = {row["id"]: row["price"] for row in rows if "price" in row}
+        restocked = [row["id"] for row in rows if "stock" in row]
+        try:
+            old_prices = dict(
+                self.db_session.execute(select(Item.id, Item.price).where(Item.id.in_(new_prices))).tuples().all()
+            ) if new_prices else {}
+            repriced = {
+                item_id: (old_prices[item_id], price)
+                for item_id, price in new_prices.items()
+                if item_id in old_prices and price != old_prices[item_id]
+            }
+            off_row = {
+                item.id: item for item in self.db_session.execute(
+                    select(Item.id, Item.stock_shards, Item.stock_journaled)
+                    .where(Item.id.in_(restocked), or_(Item.stock_shards > 0, Item.stock_journaled))
+                )
+            } if restocked else {}
+            for row in rows:
+                if row["id"] in off_row:
+                    write_stock_off_row(self.db_session, off_row[row["id"]], row["stock"])
+            # Stock of sharded and journaled items was written to their shards or journals above.
+            updates = [{key: value for key, value in row.items() if key != "stock" or row["id"] not in off_row} for row in rows]
+            updates = [row for row in updates if len(row) > 1]
+            if updates:
+                self.db_session.execute(update(Item), updates)
+            if repriced:
+                for stmt in price_change_queries(repriced):
+                    self.db_session.execute(stmt)
+            self.db_session.commit()
+        except SQLAlchemyError as e:
+            self.db_session.rollback()
+            raise ValueError(str(getattr(e, "orig", e)))
+        return len(rows)
+
+    def existing_ids(self, item_ids: List[int]) -> List[int]:
+        return list(self.db_session.scalars(select(Item.id).where(Item.id.in_(item_ids))))
+
 class CartRepository(ICartRepository):
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, clock: Callable[[], datetime] = utcnow):
         self.db_session = db_session
+        self.clock = clock
 
     def create(self) -> Cart:
         new_cart = Cart()
@@ -59,9 +1015,75 @@ class CartRepository(ICartRepository):
     def get(self, cart_id: int) -> Optional[Cart]:
         return self.db_session.query(Cart).filter(Cart.id == cart_id).one_or_none()
 
+    def get_version(self, cart_id: int) -> Optional[int]:
+        return self.db_session.scalar(select(Cart.version).where(Cart.id == cart_id))
+
     def list(self) -> List[Cart]:
         return self.db_session.query(Cart).all()
 
+    def get_cart_display(self, cart_id: int) -> Optional[CartDisplay]:
+        versioned = self.get_versioned_cart_display(cart_id)
+        return None if versioned is None else versioned[0]
+
+    def get_versioned_cart_display(self, cart_id: int) -> Optional[Tuple[CartDisplay, int]]:
+        """Load the cart, its version, its lines and their items with one outer-joined SELECT.
+
+        A stale stored total is recomputed and saved, so later reads use it again.
+        """
+        rows = self.db_session.execute(cart_invoice_query(cart_id)).all()
+        if not rows:
+            return None
+        cart_display = next(group_cart_displays(rows))
+        if rows[0].total is None:
+            self.refresh_cart_totals([cart_id])
+        return cart_display, rows[0].version
+
+    def get_cart_row(self, cart_id: int) -> Optional[dict]:
+        versioned = self.get_versioned_cart_row(cart_id)
+        return None if versioned is None else versioned[0]
+
+    def get_versioned_cart_row(self, cart_id: int) -> Optional[Tuple[dict, int]]:
+        rows = self.db_session.execute(cart_invoice_query(cart_id, plain_items=True)).all()
+        if not rows:
+            return None
+        [cart_row] = group_cart_rows(rows)
+        if rows[0].total is None:
+            self.refresh_cart_totals([cart_id])
+        return cart_row, rows[0].version
+
+    def list_cart_rows(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[dict]:
+        return group_cart_rows(self.db_session.execute(cart_display_page_query(after_id, limit, plain_items=True)))
+
+    def _cart_display_page(self, after_id: Optional[int], limit: Optional[int]) -> Iterator[CartDisplay]:
+        return group_cart_displays(self.db_session.execute(cart_display_page_query(after_id, limit)))
+
+    def list_cart_displays(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[CartDisplay]:
+        return list(self._cart_display_page(after_id, limit))
+
+    def iter_cart_displays(
+        self, after_id: Optional[int] = None, limit: Optional[int] = None, batch_size: int = 500
+    ) -> Iterator[CartDisplay]:
+        """Yield invoices page by page so memory stays bounded by `batch_size` carts.
+
+        The session is closed once iteration ends: streaming responses outlive the
+        request's session dependency, so the connection must be released here.
+        """
+        remaining = limit
+        try:
+            while remaining is None or remaining > 0:
+                page_size = batch_size if remaining is None else min(batch_size, remaining)
+                count = 0
+                for cart_display in self._cart_display_page(after_id, page_size):
+                    count += 1
+                    after_id = cart_display.id
+                    yield cart_display
+                if count < page_size:
+                    break
+                if remaining is not None:
+                    remaining -= count
+        finally:
+            self.db_session.close()
+
     def delete(self, cart_id: int) -> None:
         cart_to_delete = self.db_session.query(Cart).filter(Cart.id == cart_id).one_or_none()
         if cart_to_delete:
@@ -75,18 +1097,304 @@ class CartRepository(ICartRepository):
 
     def add_cart_item(self, cart_item: CartItem) -> None:
         self.db_session.add(cart_item)
+        self.db_session.execute(adjust_cart_totals_query(cart_item.cart_id, cart_item.item_id, cart_item.quantity, 1))
+        self.db_session.commit()
+
+    def _update_cart(self, stmt, cart_id: int, expected_version: Optional[int]) -> None:
+        """Run a version-bumping cart UPDATE; roll back and raise StaleDataError if the cart left `expected_version`."""
+        if self.db_session.execute(stmt).rowcount == 0 and expected_version is not None:
+            self.db_session.rollback()
+            raise StaleDataError(f"Cart {cart_id} is no longer at version {expected_version}")
+
+    def upsert_cart_item(
+        self, cart_id: int, item_id: int, quantity: int, expected_version: Optional[int] = None
+    ) -> CartItem:
+        """Insert a cart line or add `quantity` to the existing one, then commit the transaction."""
+        cart_item, inserted = self.db_session.execute(
+            upsert_cart_item_query(self.db_session, cart_id, item_id, quantity, self.clock()),
+            execution_options={"populate_existing": True},
+        ).one()
+        self._update_cart(
+            adjust_cart_totals_query(cart_id, item_id, quantity, int(inserted), expected_version), cart_id, expected_version
+        )
         self.db_session.commit()
+        return cart_item
 
-    def remove_cart_item(self, cart_item: CartItem) -> None:
+    def get_cart_lines(self, cart_id: int) -> Dict[int, int]:
+        return dict(
+            self.db_session.execute(
+                select(CartItem.item_id, CartItem.quantity).where(CartItem.cart_id == cart_id)
+            ).tuples().all()
+        )
+
+    def set_cart_lines(self, cart_id: int, quantities: Dict[int, int], expected_version: Optional[int] = None) -> None:
+        """Upsert the non-zero lines and delete the zero ones with two statements, then commit."""
+        reserved_at = self.clock()
+        kept = [
+            {"cart_id": cart_id, "item_id": item_id, "quantity": quantity, "reserved_at": reserved_at}
+            for item_id, quantity in quantities.items()
+            if quantity > 0
+        ]
+        dropped = [item_id for item_id, quantity in quantities.items() if quantity == 0]
+        if kept:
+            stmt = upsert_insert(self.db_session, CartItem.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["cart_id", "item_id"],
+                set_={"quantity": stmt.excluded.quantity, "reserved_at": stmt.excluded.reserved_at},
+            )
+            self.db_session.execute(stmt, kept)
+        if dropped:
+            self.db_session.execute(
+                delete(CartItem.__table__).where(
+                    CartItem.__table__.c.cart_id == cart_id, CartItem.__table__.c.item_id.in_(dropped)
+                )
+            )
+        self._update_cart(
+            bump_cart_version(refresh_cart_totals_query([cart_id]), expected_version), cart_id, expected_version
+        )
+        self.db_session.commit()
+
+    def remove_cart_item(self, cart_item: CartItem, expected_version: Optional[int] = None) -> None:
+        self._update_cart(
+            adjust_cart_totals_query(cart_item.cart_id, cart_item.item_id, -cart_item.quantity, -1, expected_version),
+            cart_item.cart_id,
+            expected_version,
+        )
         self.db_session.delete(cart_item)
         self.db_session.commit()
 
-    def update_cart_item(self, cart_id: int, item_id: int, changes: dict) -> Optional[CartItem]:
+    def remove_cart_units(
+        self, cart_id: int, item_id: int, quantity: Optional[int] = None, expected_version: Optional[int] = None
+    ) -> Optional[int]:
+        """Take units off a line and return them to stock (see take_cart_units), then commit the transaction."""
+        taken = take_cart_units(self.db_session, cart_id, item_id, quantity)
+        if taken is None:
+            self.db_session.rollback()
+            return None
+        units, emptied = taken
+        self._update_cart(
+            adjust_cart_totals_query(cart_id, item_id, -units, -1 if emptied else 0, expected_version), cart_id, expected_version
+        )
+        self.db_session.commit()
+        return units
+
+    def update_cart_item(
+        self, cart_id: int, item_id: int, changes: dict, expected_version: Optional[int] = None
+    ) -> Optional[CartItem]:
         """Update a cart item with the given changes and commit the transaction."""
         cart_item = self.db_session.query(CartItem).filter_by(cart_id=cart_id, item_id=item_id).first()
         if cart_item:
+            quantity_delta = changes.get("quantity", cart_item.quantity) - cart_item.quantity
             for key, value in changes.items():
                 setattr(cart_item, key, value)
+            if quantity_delta or expected_version is not None:
+                self._update_cart(
+                    adjust_cart_totals_query(cart_id, item_id, quantity_delta, 0, expected_version), cart_id, expected_version
+                )
             self.db_session.commit()
             return cart_item
-        return None
\ No newline at end of file
+        return None
+
+    def refresh_cart_totals(self, cart_ids: Optional[List[int]] = None) -> int:
+        """Recompute the stored totals of `cart_ids`, or of every stale cart, and commit."""
+        refreshed = self.db_session.execute(refresh_cart_totals_query(cart_ids)).rowcount
+        self.db_session.commit()
+        return refreshed
+
+    def cart_stats(self, top: int = 10) -> CartStats:
+        """Summarize every cart with four aggregate queries; no cart line is loaded into Python.
+
+        Carts pending a recompute are totalled from their lines, so they rank by their current value.
+        Both top-carts queries stop at `top` rows, and the two short lists are merged.
+        """
+        cart_count = self.db_session.scalar(select(func.count()).select_from(Cart))
+        reserved_rows = self.db_session.execute(reserved_by_item_query()).all()
+        top_cart_rows = self.db_session.execute(top_carts_query(top)).all()
+        top_cart_rows += self.db_session.execute(pending_cart_totals_query(top)).all()
+        return build_cart_stats(cart_count, reserved_rows, top_cart_rows, top)
+
+    def release_expired_reservations(self, cutoff: datetime, limit: int) -> List[ReleasedReservation]:
+        """Drop up to `limit` lines reserved before `cutoff` and give their stock back, in one short transaction.
+
+        Set-based throughout: one DELETE picks the lines, one executemany UPDATE returns stock per
+        item (in ID order, so concurrent sweeps lock rows in the same order), and one UPDATE
+        recomputes the totals of the affected carts. Journaled items get one expire movement per
+        line instead, in one INSERT.
+        """
+        released = [
+            ReleasedReservation(cart_id=cart_id, item_id=item_id, quantity=quantity)
+            for cart_id, item_id, quantity in self.db_session.execute(expire_reservations_query(cutoff, limit))
+        ]
+        if released:
+            units: Dict[int, int] = {}
+            for line in released:
+                units[line.item_id] = units.get(line.item_id, 0) + line.quantity
+            journaled = set(self.db_session.scalars(
+                select(Item.id)
+                .where(Item.id.in_(list(units)), Item.stock_journaled)
+                .order_by(Item.id)
+                .with_for_update(key_share=True)
+            ))
+            if journaled:
+                self.db_session.execute(insert(StockMovement), [
+                    {"item_id": line.item_id, "delta": line.quantity, "cart_id": line.cart_id, "reason": "expire"}
+                    for line in released if line.item_id in journaled
+                ])
+            item = Item.__table__
+            row_units = [{"b_id": item_id, "b_units": units[item_id]} for item_id in sorted(units) if item_id not in journaled]
+            if row_units:
+                self.db_session.execute(
+                    update(item).where(item.c.id == bindparam("b_id")).values(stock=item.c.stock + bindparam("b_units")),
+                    row_units,
+                )
+            self.db_session.execute(
+                bump_cart_version(refresh_cart_totals_query(sorted({line.cart_id for line in released})))
+            )
+        self.db_session.commit()
+        return released
+
+    def check_cart_totals(self) -> List[CartTotalsMismatch]:
+        return cart_totals_mismatches(self.db_session.execute(cart_totals_check_query()))
+
+
+class IdempotencyRepository(IIdempotencyRepository):
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def claim(self, key: str, fingerprint: str, now: datetime, expired_before: datetime, abandoned_before: datetime) -> bool:
+        self.db_session.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.key == key,
+                or_(
+                    IdempotencyKey.created_at < expired_before,
+                    and_(IdempotencyKey.status_code.is_(None), IdempotencyKey.created_at < abandoned_before),
+                ),
+            )
+        )
+        # ON CONFLICT DO NOTHING: of concurrent claims for one key, exactly one inserts.
+        inserted = self.db_session.execute(
+            upsert_insert(self.db_session, IdempotencyKey)
+            .values(key=key, fingerprint=fingerprint, created_at=now)
+            .on_conflict_do_nothing(index_elements=[IdempotencyKey.key])
+        ).rowcount
+        self.db_session.commit()
+        return inserted == 1
+
+    def get(self, key: str) -> Optional[IdempotencyKey]:
+        return self.db_session.get(IdempotencyKey, key)
+
+    def complete(self, key: str, status_code: int, content_type: Optional[str], body: bytes) -> None:
+        self.db_session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key == key)
+            .values(status_code=status_code, content_type=content_type, body=body)
+        )
+        self.db_session.commit()
+
+    def release(self, key: str) -> None:
+        self.db_session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+        )
+        self.db_session.commit()
+
+    def delete_expired(self, cutoff: datetime, limit: int) -> int:
+        expired = (
+            select(IdempotencyKey.key)
+            .where(IdempotencyKey.created_at < cutoff)
+            .order_by(IdempotencyKey.created_at)
+            .limit(limit)
+        )
+        deleted = self.db_session.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(expired))).rowcount
+        self.db_session.commit()
+        return deleted
+
+
+class ItemChangeRepository(IItemChangeRepository):
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def pending_count(self) -> int:
+        return self.db_session.scalar(
+            select(func.count()).select_from(ItemChangeEvent).where(ItemChangeEvent.processed_at.is_(None))
+        )
+
+    def reprice_next_batch(self, limit: int, now: datetime) -> Optional[RepricedBatch]:
+        """Reprice the next `limit` carts of the oldest pending event in one short transaction; None when none is pending.
+
+        The event's cursor is advanced with a conditional UPDATE before the carts are touched,
+        so concurrent repricers never both process a batch: the one that loses the race
+        rolls back and reports an empty batch. Totals are recomputed from the lines rather
+        than adjusted by the price difference, so repricing a cart twice is harmless.
+        """
+        event = self.db_session.scalars(
+            select(ItemChangeEvent).where(ItemChangeEvent.processed_at.is_(None)).order_by(ItemChangeEvent.id).limit(1)
+        ).first()
+        if event is None:
+            self.db_session.rollback()
+            return None
+        event_id, item_id, cursor = event.id, event.item_id, event.cart_cursor
+        cart_ids = list(self.db_session.scalars(cart_ids_holding_item_query(item_id, cursor, limit)))
+        done = len(cart_ids) < limit
+        claim = (
+            update(ItemChangeEvent)
+            .where(ItemChangeEvent.id == event_id, ItemChangeEvent.cart_cursor == cursor, ItemChangeEvent.processed_at.is_(None))
+            .values(cart_cursor=cart_ids[-1] if cart_ids else cursor, processed_at=now if done else None)
+            .execution_options(synchronize_session=False)
+        )
+        if self.db_session.execute(claim).rowcount == 0:
+            self.db_session.rollback()
+            return RepricedBatch(event_id=event_id, item_id=item_id, carts=0, done=False)
+        if cart_ids:
+            self.db_session.execute(bump_cart_version(refresh_cart_totals_query(cart_ids)))
+        if done:
+            self.db_session.execute(
+                update(Item)
+                .where(Item.id == item_id)
+                .values(reprice_pending=Item.reprice_pending - 1)
+                .execution_options(synchronize_session=False)
+            )
+        self.db_session.commit()
+        return RepricedBatch(event_id=event_id, item_id=item_id, carts=len(cart_ids), done=done)
+
+
+class StockJournalRepository(IStockJournalRepository):
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def pending_items(self, limit: int) -> List[int]:
+        unfolded = select(StockMovement.id).where(
+            StockMovement.item_id == Item.id, StockMovement.id > Item.stock_snapshot_id
+        ).exists()
+        return list(self.db_session.scalars(
+            select(Item.id).where(Item.stock_journaled, unfolded).order_by(Item.id).limit(limit)
+        ))
+
+    def compact(self, item_id: int) -> int:
+        """Fold the item's new movements into its snapshot in one short transaction, rewriting its row once."""
+        folded = compact_stock_journal(self.db_session, item_id)
+        self.db_session.commit()
+        return folded
+
+    def movements(self, item_id: int, after_id: Optional[int] = None, limit: int = 100) -> List[StockMovement]:
+        query = select(StockMovement).where(StockMovement.item_id == item_id)
+        if after_id is not None:
+            query = query.where(StockMovement.id > after_id)
+        return list(self.db_session.scalars(query.order_by(StockMovement.id).limit(limit)))
+
+    def check(self) -> List[StockJournalMismatch]:
+        return [
+            StockJournalMismatch(item_id=item_id, stock=stock, journal_stock=journal_stock)
+            for item_id, stock, journal_stock in self.db_session.execute(stock_journal_check_query())
+            if stock != journal_stock
+        ]
+
+    def rebuild(self, item_ids: List[int]) -> int:
+        """Recompute each item's snapshot from its journal in one UPDATE."""
+        rebuilt = self.db_session.execute(
+            update(Item)
+            .where(Item.id.in_(item_ids), Item.stock_journaled)
+            .values(stock=journal_snapshot_stock())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        self.db_session.commit()
+        return rebuilt
@@ -0,0 +1,104 @@
+"""Reprices the carts holding an item after its price changed, working off the item_change_event outbox."""
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict
+
+from domain.models import utcnow
+from infrastructure.periodic import run_every
+from infrastructure.repository import ItemChangeRepository
+
+# 0 disables the background repricer; carts are then totalled from their lines until repriced by hand.
+REPRICE_INTERVAL = float(os.getenv("REPRICE_INTERVAL", "5"))
+REPRICE_BATCH = int(os.getenv("REPRICE_BATCH", "500"))
+REPRICE_MAX_BATCHES = int(os.getenv("REPRICE_MAX_BATCHES", "20"))
+
+logger = logging.getLogger("shopping_cart.repricing")
+
+
+@dataclass
+class RepriceReport:
+    batches: int = 0
+    events: int = 0
+    carts: int = 0
+    seconds: float = 0.0
+
+    @property
+    def carts_per_second(self) -> float:
+        return self.carts / self.seconds if self.seconds else 0.0
+
+
+class CartRepricer:
+    """Reprices carts in batches of `batch_size`, each batch in its own short transaction.
+
+    Events are taken oldest first, and the carts of one event in cart ID order, through the
+    index on cart_item (item_id, cart_id). A run stops after `max_batches` batches, so a
+    popular item's fan-out is spread over several runs instead of one long transaction.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        batch_size: int = REPRICE_BATCH,
+        max_batches: int = REPRICE_MAX_BATCHES,
+        clock: Callable[[], datetime] = utcnow,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.clock = clock
+        self.runs = 0
+        self.events_processed = 0
+        self.carts_repriced = 0
+        self.busy_seconds = 0.0
+
+    def run(self) -> RepriceReport:
+        report = RepriceReport()
+        start = time.perf_counter()
+        while report.batches < self.max_batches:
+            with self.session_factory() as db:
+                batch = ItemChangeRepository(db).reprice_next_batch(self.batch_size, self.clock())
+            if batch is None:
+                break
+            report.batches += 1
+            report.carts += batch.carts
+            report.events += batch.done
+            if not batch.done and batch.carts == 0:
+                # Another repricer claimed this batch first; leave the event to it.
+                break
+        report.seconds = time.perf_counter() - start
+
+        self.runs += 1
+        self.events_processed += report.events
+        self.carts_repriced += report.carts
+        self.busy_seconds += report.seconds
+        if report.carts:
+            logger.info(
+                "Repriced %d carts in %d batches (%d events done), %.0f carts/s",
+                report.carts, report.batches, report.events, report.carts_per_second,
+            )
+        return report
+
+    def pending(self) -> int:
+        with self.session_factory() as db:
+            return ItemChangeRepository(db).pending_count()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "runs": self.runs,
+            "events_processed": self.events_processed,
+            "carts_repriced": self.carts_repriced,
+            "carts_per_second": self.carts_repriced / self.busy_seconds if self.busy_seconds else 0.0,
+        }
+
+
+async def run_periodically(repricer: CartRepricer, interval: float = REPRICE_INTERVAL) -> None:
+    """Reprice every `interval` seconds until cancelled, and straight away again while a backlog remains.
+
+    The blocking run happens in a worker thread.
+    """
+    await run_every(
+        interval, repricer.run, logger, "Cart repricing", again=lambda report: report.batches >= repricer.max_batches
+    )
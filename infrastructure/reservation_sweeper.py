@@ -0,0 +1,90 @@
+"""Releases the stock held by cart lines whose reservation is older than RESERVATION_TTL seconds."""
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from domain.models import utcnow
+from domain.repo_interfaces import ICatalogRevision
+from infrastructure.periodic import run_every
+from infrastructure.repository import CartRepository
+
+# 0 disables expiry: reservations are then only released by removing items from carts.
+RESERVATION_TTL = float(os.getenv("RESERVATION_TTL", "0"))
+RESERVATION_SWEEP_INTERVAL = float(os.getenv("RESERVATION_SWEEP_INTERVAL", "60"))
+RESERVATION_SWEEP_BATCH = int(os.getenv("RESERVATION_SWEEP_BATCH", "500"))
+RESERVATION_SWEEP_MAX_BATCHES = int(os.getenv("RESERVATION_SWEEP_MAX_BATCHES", "20"))
+
+logger = logging.getLogger("shopping_cart.reservations")
+
+
+@dataclass
+class SweepReport:
+    cutoff: datetime
+    batches: int = 0
+    lines: int = 0
+    units_by_item: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def units(self) -> int:
+        return sum(self.units_by_item.values())
+
+
+class ReservationSweeper:
+    """Releases expired reservations in batches of `batch_size` lines, each batch in its own short transaction.
+
+    A run stops after `max_batches` batches, so a backlog is worked off over several runs instead
+    of holding locks for one long one. `clock` is injectable so tests can move time forward.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        ttl: float = RESERVATION_TTL,
+        batch_size: int = RESERVATION_SWEEP_BATCH,
+        max_batches: int = RESERVATION_SWEEP_MAX_BATCHES,
+        clock: Callable[[], datetime] = utcnow,
+        catalog_revision: Optional[ICatalogRevision] = None,
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.clock = clock
+        self.catalog_revision = catalog_revision
+        self.runs = 0
+        self.lines_released = 0
+        self.units_released = 0
+
+    def sweep(self) -> SweepReport:
+        report = SweepReport(cutoff=self.clock() - timedelta(seconds=self.ttl))
+        while report.batches < self.max_batches:
+            with self.session_factory() as db:
+                released = CartRepository(db, clock=self.clock).release_expired_reservations(report.cutoff, self.batch_size)
+            report.batches += 1
+            report.lines += len(released)
+            for line in released:
+                report.units_by_item[line.item_id] = report.units_by_item.get(line.item_id, 0) + line.quantity
+            if len(released) < self.batch_size:
+                break
+
+        self.runs += 1
+        self.lines_released += report.lines
+        self.units_released += report.units
+        if report.lines:
+            if self.catalog_revision is not None:
+                self.catalog_revision.bump()
+            logger.info(
+                "Released %d units of %d items from %d expired cart lines (reserved before %s)",
+                report.units, len(report.units_by_item), report.lines, report.cutoff.isoformat(),
+            )
+        return report
+
+    def stats(self) -> Dict[str, int]:
+        return {"runs": self.runs, "lines_released": self.lines_released, "units_released": self.units_released}
+
+
+async def run_periodically(sweeper: ReservationSweeper, interval: float = RESERVATION_SWEEP_INTERVAL) -> None:
+    """Sweep every `interval` seconds until cancelled; the blocking sweep runs in a worker thread."""
+    await run_every(interval, sweeper.sweep, logger, "Reservation sweep")
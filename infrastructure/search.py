@@ -0,0 +1,279 @@
+"""Catalog search: PostgreSQL full-text search over a GIN index, or an in-process inverted index elsewhere."""
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.orm import Session
+
+from domain.models import ITEM_SEARCH_VECTOR, Item
+from domain.repo_interfaces import IItemRepository, IItemSearch
+
+# The in-process index only sees writes made through this process, so it is rebuilt from the
+# database once it is this many seconds old.
+SEARCH_INDEX_TTL = float(os.getenv("SEARCH_INDEX_TTL", "300"))
+
+# ts_rank's default weights for A (name) and B (description) terms.
+NAME_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased words, split like PostgreSQL's `simple` text search configuration."""
+    return re.findall(r"[^\W_]+", (text or "").lower())
+
+
+def tsquery_text(terms: List[str], weights: str = "") -> str:
+    """A to_tsquery() string requiring every term, the last as a prefix: ["red", "sho"] -> "red & sho:*"."""
+    required = [f"{term}:{weights}" if weights else term for term in terms[:-1]]
+    return " & ".join(required + [f"{terms[-1]}:*{weights}"])
+
+
+def search_filters(item_type: Optional[str], min_price: Optional[Decimal], max_price: Optional[Decimal]) -> list:
+    filters = []
+    if item_type is not None:
+        filters.append(Item.type == item_type)
+    if min_price is not None:
+        filters.append(Item.price >= min_price)
+    if max_price is not None:
+        filters.append(Item.price <= max_price)
+    return filters
+
+
+class PostgresItemSearch(IItemSearch):
+    """Full-text search with ts_rank over the `ix_item_search` GIN expression index.
+
+    PostgreSQL keeps the index up to date on every write, so the maintenance hooks do nothing.
+    """
+
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def search(self, query, item_type=None, min_price=None, max_price=None, limit=20, offset=0):
+        terms = tokenize(query)
+        if not terms:
+            return 0, []
+        vector = literal_column(ITEM_SEARCH_VECTOR)
+        tsquery = func.to_tsquery("simple", tsquery_text(terms))
+        rank = func.ts_rank(vector, tsquery)
+        rows = self.db_session.execute(
+            select(Item.id, rank.label("rank"), func.count().over().label("total"))
+            .where(vector.op("@@")(tsquery), *search_filters(item_type, min_price, max_price))
+            .order_by(rank.desc(), Item.id)
+            .limit(limit)
+            .offset(offset)
+        ).all()
+        if rows:
+            return rows[0].total, [(row.id, row.rank) for row in rows]
+        if not offset:
+            return 0, []
+        total = self.db_session.scalar(
+            select(func.count())
+            .select_from(Item)
+            .where(vector.op("@@")(tsquery), *search_filters(item_type, min_price, max_price))
+        )
+        return total, []
+
+    def suggest(self, prefix, limit=10):
+        terms = tokenize(prefix)
+        if not terms:
+            return []
+        vector = literal_column(ITEM_SEARCH_VECTOR)
+        # Weight A restricts the match to name terms.
+        tsquery = func.to_tsquery("simple", tsquery_text(terms, weights="A"))
+        rows = self.db_session.execute(
+            select(Item.id, Item.name)
+            .where(vector.op("@@")(tsquery))
+            .order_by(func.ts_rank(vector, tsquery).desc(), func.length(Item.name), Item.id)
+            .limit(limit)
+        )
+        return [(item_id, name) for item_id, name in rows]
+
+    def item_saved(self, item: Item) -> None:
+        pass
+
+    def item_deleted(self, item_id: int) -> None:
+        pass
+
+    def catalog_changed(self) -> None:
+        pass
+
+
+@dataclass(frozen=True)
+class IndexedItem:
+    name: str
+    type: str
+    price: Decimal
+    name_terms: Set[str]
+    terms: Set[str]
+
+
+def name_matches(name_terms: Set[str], terms: List[str]) -> bool:
+    """Whether a name has every term, the last as a prefix, so autocomplete ignores description matches."""
+    return all(term in name_terms for term in terms[:-1]) and any(name_term.startswith(terms[-1]) for name_term in name_terms)
+
+
+class InvertedIndex:
+    """Term -> {item ID: weighted term frequency} postings over item names and descriptions.
+
+    A sorted term list answers prefix lookups with a binary search. Like ts_rank, an item ranks by
+    the weighted frequency of the matched terms, so name matches come before description matches.
+    One process-wide instance is shared by all requests; a lock serializes access.
+    """
+
+    def __init__(self, ttl: float = SEARCH_INDEX_TTL, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.built_at: Optional[float] = None
+        self._items: Dict[int, IndexedItem] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._sorted_terms: Optional[List[str]] = None
+        self._lock = threading.RLock()
+
+    def needs_rebuild(self) -> bool:
+        return self.built_at is None or self.clock() - self.built_at >= self.ttl
+
+    def invalidate(self) -> None:
+        self.built_at = None
+
+    def rebuild(self, items: Iterable[Item]) -> None:
+        with self._lock:
+            self._items, self._postings, self._sorted_terms = {}, {}, None
+            for item in items:
+                self._add(item)
+            self.built_at = self.clock()
+
+    def add(self, item: Item) -> None:
+        with self._lock:
+            self._remove(item.id)
+            self._add(item)
+
+    def remove(self, item_id: int) -> None:
+        with self._lock:
+            self._remove(item_id)
+
+    def _add(self, item: Item) -> None:
+        weights: Dict[str, float] = {}
+        name_terms = tokenize(item.name)
+        for term in name_terms:
+            weights[term] = weights.get(term, 0.0) + NAME_WEIGHT
+        for term in tokenize(item.description):
+            weights[term] = weights.get(term, 0.0) + DESCRIPTION_WEIGHT
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._sorted_terms = None
+            postings[item.id] = weight
+        self._items[item.id] = IndexedItem(item.name, item.type, item.price, set(name_terms), set(weights))
+
+    def _remove(self, item_id: int) -> None:
+        indexed = self._items.pop(item_id, None)
+        if indexed is None:
+            return
+        for term in indexed.terms:
+            del self._postings[term][item_id]
+            if not self._postings[term]:
+                del self._postings[term]
+                self._sorted_terms = None
+
+    def _expand(self, term: str, prefix: bool) -> List[str]:
+        """The indexed terms `term` matches: itself, or every term it starts when `prefix` is set."""
+        if not prefix:
+            return [term] if term in self._postings else []
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        matches = []
+        position = bisect_left(self._sorted_terms, term)
+        while position < len(self._sorted_terms) and self._sorted_terms[position].startswith(term):
+            matches.append(self._sorted_terms[position])
+            position += 1
+        return matches
+
+    def _scores(self, terms: List[str]) -> Dict[int, float]:
+        """Rank of every item matching all of `terms` (the last as a prefix)."""
+        scores: Optional[Dict[int, float]] = None
+        for position, term in enumerate(terms):
+            term_scores: Dict[int, float] = {}
+            for indexed in self._expand(term, prefix=position == len(terms) - 1):
+                for item_id, weight in self._postings[indexed].items():
+                    term_scores[item_id] = term_scores.get(item_id, 0.0) + weight
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {item_id: score + term_scores[item_id] for item_id, score in scores.items() if item_id in term_scores}
+            if not scores:
+                break
+        return scores or {}
+
+    def search(self, terms, item_type=None, min_price=None, max_price=None) -> List[Tuple[int, float]]:
+        with self._lock:
+            hits = []
+            for item_id, score in self._scores(terms).items():
+                item = self._items[item_id]
+                if item_type is not None and item.type != item_type:
+                    continue
+                if min_price is not None and item.price < min_price:
+                    continue
+                if max_price is not None and item.price > max_price:
+                    continue
+                hits.append((item_id, score))
+        hits.sort(key=lambda hit: (-hit[1], hit[0]))
+        return hits
+
+    def suggest(self, terms: List[str], limit: int) -> List[Tuple[int, str]]:
+        with self._lock:
+            hits = [
+                (item_id, score) for item_id, score in self._scores(terms).items()
+                if name_matches(self._items[item_id].name_terms, terms)
+            ]
+            hits.sort(key=lambda hit: (-hit[1], hit[0]))
+            return [(item_id, self._items[item_id].name) for item_id, _ in hits[:limit]]
+
+
+class InMemoryItemSearch(IItemSearch):
+    """Serves search from a shared InvertedIndex, (re)building it from `item_repo` when it is missing or expired."""
+
+    def __init__(self, index: InvertedIndex, item_repo: IItemRepository):
+        self.index = index
+        self.item_repo = item_repo
+
+    def _ready_index(self) -> InvertedIndex:
+        if self.index.needs_rebuild():
+            self.index.rebuild(self.item_repo.list())
+        return self.index
+
+    def search(self, query, item_type=None, min_price=None, max_price=None, limit=20, offset=0):
+        terms = tokenize(query)
+        if not terms:
+            return 0, []
+        hits = self._ready_index().search(terms, item_type, min_price, max_price)
+        return len(hits), hits[offset:offset + limit]
+
+    def suggest(self, prefix, limit=10):
+        terms = tokenize(prefix)
+        if not terms:
+            return []
+        return self._ready_index().suggest(terms, limit)
+
+    def item_saved(self, item: Item) -> None:
+        if not self.index.needs_rebuild():
+            self.index.add(item)
+
+    def item_deleted(self, item_id: int) -> None:
+        self.index.remove(item_id)
+
+    def catalog_changed(self) -> None:
+        self.index.invalidate()
+
+
+def build_item_search(db_session: Session, index: InvertedIndex, item_repo: IItemRepository) -> IItemSearch:
+    """PostgreSQL full-text search when the session is bound to PostgreSQL, the in-process index otherwise."""
+    if db_session.get_bind().dialect.name == "postgresql":
+        return PostgresItemSearch(db_session)
+    return InMemoryItemSearch(index, item_repo)
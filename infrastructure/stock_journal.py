@@ -0,0 +1,63 @@
+"""Folds the stock journal of journaled items into their snapshots, so reading their stock stays cheap."""
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict
+
+from infrastructure.periodic import run_every
+from infrastructure.repository import StockJournalRepository
+
+# 0 disables the background compactor; stock stays exact, but reading it sums an ever longer journal.
+STOCK_COMPACT_INTERVAL = float(os.getenv("STOCK_COMPACT_INTERVAL", "5"))
+STOCK_COMPACT_MAX_ITEMS = int(os.getenv("STOCK_COMPACT_MAX_ITEMS", "100"))
+
+logger = logging.getLogger("shopping_cart.stock_journal")
+
+
+@dataclass
+class CompactionReport:
+    items: int = 0
+    movements: int = 0
+    seconds: float = 0.0
+
+
+class StockCompactor:
+    """Compacts up to `max_items` journaled items per run, each in its own short transaction.
+
+    Each compaction rewrites the item row once, however many reservations it folds in.
+    """
+
+    def __init__(self, session_factory, max_items: int = STOCK_COMPACT_MAX_ITEMS):
+        self.session_factory = session_factory
+        self.max_items = max_items
+        self.runs = 0
+        self.items_compacted = 0
+        self.movements_folded = 0
+
+    def run(self) -> CompactionReport:
+        report = CompactionReport()
+        start = time.perf_counter()
+        with self.session_factory() as db:
+            journal = StockJournalRepository(db)
+            for item_id in journal.pending_items(self.max_items):
+                folded = journal.compact(item_id)
+                if folded:
+                    report.items += 1
+                    report.movements += folded
+        report.seconds = time.perf_counter() - start
+
+        self.runs += 1
+        self.items_compacted += report.items
+        self.movements_folded += report.movements
+        if report.items:
+            logger.info("Folded %d stock movements into %d items in %.3f s", report.movements, report.items, report.seconds)
+        return report
+
+    def stats(self) -> Dict[str, int]:
+        return {"runs": self.runs, "items_compacted": self.items_compacted, "movements_folded": self.movements_folded}
+
+
+async def run_periodically(compactor: StockCompactor, interval: float = STOCK_COMPACT_INTERVAL) -> None:
+    """Compact every `interval` seconds until cancelled; the blocking run happens in a worker thread."""
+    await run_every(interval, compactor.run, logger, "Stock journal compaction")
@@ -1,19 +1,4 @@
-import os
+"""Create or upgrade the database schema by running the migrations in migrations/."""
+from infrastructure.migrations import upgrade
 
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-
-from domain.models import Base
-
-load_dotenv()
-
-POSTGRES_USER = os.getenv("POSTGRES_USER")
-POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-POSTGRES_DB = os.getenv("POSTGRES_DB")
-POSTGRES_HOST = os.getenv("POSTGRES_HOST")
-POSTGRES_PORT = os.getenv("POSTGRES_PORT")
-
-DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
-
-engine = create_engine(DATABASE_URL)
-Base.metadata.create_all(engine)
+upgrade()
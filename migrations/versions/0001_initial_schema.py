@@ -0,0 +1,45 @@
+"""Initial schema: items, carts and cart lines
+
+The schema init_db.py built with create_all before migrations. init_db.py stamps databases
+created that way with this revision instead of running it.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "item",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.Column("thumbnail", sa.String(), nullable=False),
+        sa.Column("stock", sa.Integer(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+    )
+    op.create_index("ix_item_name", "item", ["name"])
+
+    op.create_table("cart", sa.Column("id", sa.Integer(), primary_key=True))
+
+    op.create_table(
+        "cart_item",
+        sa.Column("cart_id", sa.Integer(), sa.ForeignKey("cart.id"), primary_key=True),
+        sa.Column("item_id", sa.Integer(), sa.ForeignKey("item.id"), primary_key=True),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("cart_item")
+    op.drop_table("cart")
+    op.drop_table("item")
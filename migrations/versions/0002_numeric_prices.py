@@ -0,0 +1,31 @@
+"""Store item prices as NUMERIC(12, 2)
+
+Float prices made cart totals inexact. Existing prices are rounded to the cent.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("item") as batch:
+        batch.alter_column(
+            "price",
+            existing_type=sa.Float(),
+            type_=sa.Numeric(12, 2),
+            existing_nullable=False,
+            postgresql_using="round(price::numeric, 2)",
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("item") as batch:
+        batch.alter_column("price", existing_type=sa.Numeric(12, 2), type_=sa.Float(), existing_nullable=False)
@@ -0,0 +1,31 @@
+"""Stored cart totals, line counts and versions
+
+Existing carts start with a NULL (stale) total, which the next read recomputes from the lines,
+and with their line counts taken from the lines.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("cart", sa.Column("total", sa.Numeric(14, 2), nullable=True))
+    op.add_column("cart", sa.Column("line_count", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("cart", sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+    op.execute(
+        "UPDATE cart SET line_count = (SELECT count(*) FROM cart_item WHERE cart_item.cart_id = cart.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("cart", "version")
+    op.drop_column("cart", "line_count")
+    op.drop_column("cart", "total")
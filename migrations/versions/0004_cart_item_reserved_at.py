@@ -0,0 +1,26 @@
+"""Reservation time of cart lines, for the reservation sweeper
+
+Existing lines count as reserved when the migration runs, so they get a full TTL.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("cart_item", sa.Column("reserved_at", sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE cart_item SET reserved_at = CURRENT_TIMESTAMP")
+    op.create_index("ix_cart_item_reserved_at", "cart_item", ["reserved_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cart_item_reserved_at", table_name="cart_item")
+    op.drop_column("cart_item", "reserved_at")
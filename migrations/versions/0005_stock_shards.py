@@ -0,0 +1,30 @@
+"""Sharded stock counters for hot items
+
+Every existing item keeps all of its stock in item.stock (0 shards).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("item", sa.Column("stock_shards", sa.Integer(), nullable=False, server_default="0"))
+    op.create_table(
+        "item_stock_shard",
+        sa.Column("item_id", sa.Integer(), sa.ForeignKey("item.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("shard", sa.Integer(), primary_key=True),
+        sa.Column("stock", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("item_stock_shard")
+    op.drop_column("item", "stock_shards")
@@ -0,0 +1,39 @@
+"""Index item pages by price, item search, top carts and cart lines by item
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+from domain.models import ITEM_SEARCH_VECTOR
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_item_price_id", "item", ["price", "id"]),
+    ("ix_cart_total", "cart", ["total"]),
+    ("ix_cart_item_item_id_quantity", "cart_item", ["item_id", "quantity"]),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        # Build without blocking writes on a live database.
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+            op.execute(f"CREATE INDEX CONCURRENTLY ix_item_search ON item USING GIN (({ITEM_SEARCH_VECTOR}))")
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX ix_item_search")
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,28 @@
+"""Index item filters by type and price range
+
+Search filters items by type and a price range; without an index on type those filters read
+every item row. Lookups of cart lines by item already use ix_cart_item_item_id_quantity.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        # Build without blocking item writes on a live catalog.
+        with op.get_context().autocommit_block():
+            op.create_index("ix_item_type_price", "item", ["type", "price"], postgresql_concurrently=True)
+    else:
+        op.create_index("ix_item_type_price", "item", ["type", "price"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_item_type_price", table_name="item")
@@ -0,0 +1,51 @@
+"""Outbox of item price changes, and cart lines indexed by item then cart
+
+ItemRepository writes an item_change_event row with every price change, and counts it in
+item.reprice_pending until the CartRepricer has repriced the carts holding the item. The
+repricer walks those carts in cart ID order, so the item index gains cart_id; it still covers
+the per-item quantity sums of GET /cart/stats.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def swap_index(old: str, new: str, columns: list) -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        # Build the new index before dropping the old one, without blocking cart writes.
+        with op.get_context().autocommit_block():
+            op.create_index(new, "cart_item", columns, postgresql_concurrently=True)
+            op.drop_index(old, table_name="cart_item", postgresql_concurrently=True)
+    else:
+        op.create_index(new, "cart_item", columns)
+        op.drop_index(old, table_name="cart_item")
+
+
+def upgrade() -> None:
+    op.add_column("item", sa.Column("reprice_pending", sa.Integer(), nullable=False, server_default="0"))
+    op.create_table(
+        "item_change_event",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("item_id", sa.Integer(), nullable=False),
+        sa.Column("old_price", sa.Numeric(12, 2), nullable=False),
+        sa.Column("new_price", sa.Numeric(12, 2), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("cart_cursor", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_item_change_event_pending", "item_change_event", ["processed_at", "id"])
+    swap_index("ix_cart_item_item_id_quantity", "ix_cart_item_item_id_cart_id_quantity", ["item_id", "cart_id", "quantity"])
+
+
+def downgrade() -> None:
+    swap_index("ix_cart_item_item_id_cart_id_quantity", "ix_cart_item_item_id_quantity", ["item_id", "quantity"])
+    op.drop_table("item_change_event")
+    op.drop_column("item", "reprice_pending")
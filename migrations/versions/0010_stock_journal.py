@@ -0,0 +1,47 @@
+"""Append-only stock journal for items whose stock row is rewritten too often
+
+A journaled item records every reservation, release and restock as a stock_movement row
+instead of updating item.stock, which becomes a snapshot of the journal up to
+item.stock_snapshot_id. The StockCompactor moves the snapshot forward. Journaling is off for
+every existing item.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("item", sa.Column("stock_journaled", sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.add_column("item", sa.Column("stock_snapshot_id", sa.Integer(), nullable=False, server_default="0"))
+    op.create_index(
+        "ix_item_stock_journaled",
+        "item",
+        ["id"],
+        postgresql_where=sa.text("stock_journaled"),
+        sqlite_where=sa.text("stock_journaled = 1"),
+    )
+    op.create_table(
+        "stock_movement",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("item_id", sa.Integer(), nullable=False),
+        sa.Column("delta", sa.Integer(), nullable=False),
+        sa.Column("cart_id", sa.Integer(), nullable=True),
+        sa.Column("reason", sa.String(16), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_stock_movement_item_id_id", "stock_movement", ["item_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_table("stock_movement")
+    op.drop_index("ix_item_stock_journaled", table_name="item")
+    op.drop_column("item", "stock_snapshot_id")
+    op.drop_column("item", "stock_journaled")
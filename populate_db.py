@@ -1,5 +1,11 @@
+import argparse
+import random
+import time
+
 from infrastructure.database import SessionLocal
+from infrastructure.repository import ItemRepository
 from domain.models import Item
+from domain.service import ItemService
 
 item_data = [
     # Products
@@ -101,12 +107,48 @@ def add_items_to_db(items, db_session):
     db_session.commit()
 
 
+def synthetic_items(count, seed=0):
+    """Generate `count` random catalog rows for load tests."""
+    rng = random.Random(seed)
+    for n in range(count):
+        template = item_data[n % len(item_data)]
+        yield {
+            **template,
+            "name": f"{template['name']} #{n}",
+            "price": round(rng.uniform(1, 500), 2),
+            "stock": rng.randint(0, 1000),
+        }
+
+
+def bulk_populate(db_session, rows, batch_size=5000):
+    """Insert rows through ItemService.bulk_create_items, the same path as POST /item/bulk."""
+    item_service = ItemService(ItemRepository(db_session))
+    batch, offset, created = [], 0, 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            created += item_service.bulk_create_items(batch, offset).succeeded
+            offset, batch = offset + len(batch), []
+    if batch:
+        created += item_service.bulk_create_items(batch, offset).succeeded
+    return created
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Populate the catalog with sample items.")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="Add N random items for load tests")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
     db = SessionLocal()
-    if db.query(Item).count() == 0:
-        items = create_items(item_data)
-        add_items_to_db(items, db)
-    else:
+    try:
+        if args.synthetic:
+            start = time.perf_counter()
+            created = bulk_populate(db, synthetic_items(args.synthetic), args.batch_size)
+            print(f"Created {created} synthetic items in {time.perf_counter() - start:.1f}s")
+        elif db.query(Item).count() == 0:
+            bulk_populate(db, item_data)
+    finally:
         db.close()
 
 
@@ -1,6 +1,8 @@
-from pydantic import BaseModel, Field, constr
-from typing import Optional, Union, List
-from .item import ItemDisplay
+from decimal import Decimal
+
+from pydantic import BaseModel, Field, constr, model_validator
+from typing import Dict, Literal, Optional, Union, List
+from .item import ItemDisplay, MoneyAmount
 
 class CartItemRemoveRequest(BaseModel):
     item_id: int = Field(..., description="The ID of the item to remove from the cart")
@@ -13,15 +15,33 @@ class CartCreate(BaseModel):
 
 class CartItemCreate(BaseModel):
     item_id: int
-    quantity: int
+    quantity: int = Field(..., gt=0, description="Units to add to the cart")
+
+
+class CartOperation(BaseModel):
+    op: Literal["add", "remove", "set"] = Field(..., description="add and remove change the quantity by `quantity`; set replaces it")
+    item_id: int = Field(..., description="The ID of the item the operation applies to")
+    quantity: Optional[int] = Field(
+        None, ge=0, description="Units to add, remove or set. Omitting it on remove drops the whole line"
+    )
+
+    @model_validator(mode="after")
+    def require_quantity(self) -> "CartOperation":
+        if self.op != "remove" and self.quantity is None:
+            raise ValueError(f"quantity is required for {self.op}")
+        return self
+
+
+class CartOperationsRequest(BaseModel):
+    operations: List[CartOperation] = Field(..., min_length=1, description="Applied in order, all or nothing")
 
 
 class CartItemDisplay(BaseModel):
     item_id: int
     quantity: int
     item: ItemDisplay
-    subtotal: float = Field(
-        0, description="The subtotal price for this item based on the quantity"
+    subtotal: MoneyAmount = Field(
+        Decimal("0.00"), description="The subtotal price for this item based on the quantity"
     )
 
     class Config:
@@ -31,7 +51,50 @@ class CartItemDisplay(BaseModel):
 class CartDisplay(BaseModel):
     id: int
     items: list[CartItemDisplay] = []
-    total: float = Field(0, description="The total price of all items in the cart")
+    total: MoneyAmount = Field(Decimal("0.00"), description="The total price of all items in the cart")
 
     class Config:
         from_attributes = True
+
+
+class CartTotalsMismatch(BaseModel):
+    cart_id: int
+    stored_total: Optional[MoneyAmount] = Field(None, description="The denormalized total (None while stale)")
+    stored_line_count: int = Field(..., description="The denormalized number of lines")
+    total: MoneyAmount = Field(..., description="The total recomputed from the cart lines")
+    line_count: int = Field(..., description="The number of lines actually in the cart")
+
+
+class ItemReservation(BaseModel):
+    item_id: int
+    type: str
+    quantity: int = Field(..., description="Units of the item held in carts")
+    value: MoneyAmount = Field(..., description="quantity times the item's current price")
+
+
+class CartValue(BaseModel):
+    cart_id: int
+    total: MoneyAmount
+
+
+class CartStats(BaseModel):
+    cart_count: int = Field(..., description="Number of carts, including empty ones")
+    line_count: int = Field(..., description="Number of cart lines across all carts")
+    units_reserved: int = Field(..., description="Units held in carts across all items")
+    total_value: MoneyAmount = Field(..., description="Value of everything held in carts")
+    value_by_type: Dict[str, MoneyAmount] = Field(..., description="total_value split by item type")
+    reserved_by_item: List[ItemReservation] = Field(..., description="Items held in carts, most units first")
+    top_carts: List[CartValue] = Field(..., description="The most valuable carts, highest total first")
+
+
+class ReleasedReservation(BaseModel):
+    cart_id: int
+    item_id: int
+    quantity: int = Field(..., description="Units returned to the item's stock")
+
+
+class RepricedBatch(BaseModel):
+    event_id: int
+    item_id: int
+    carts: int = Field(..., description="Carts whose totals were recomputed at the item's new price")
+    done: bool = Field(..., description="Whether this batch finished the event")
@@ -1,9 +1,16 @@
-from pydantic import BaseModel, Field, constr
-from typing import Optional, Union, List
+from datetime import datetime
+from decimal import Decimal
+
+from pydantic import AliasChoices, BaseModel, Field, PlainSerializer, constr
+from typing import Annotated, Any, Optional, Union, List
+
+# Money is exact Decimal internally and a plain JSON number on the wire.
+MoneyAmount = Annotated[Decimal, PlainSerializer(float, return_type=float, when_used="json")]
+Price = Annotated[MoneyAmount, Field(max_digits=12, decimal_places=2)]
 
 class ItemCreate(BaseModel):
     name: str
-    price: float
+    price: Price
     description: str
     thumbnail: str
     stock: int
@@ -13,19 +20,76 @@ class ItemCreate(BaseModel):
 class ItemDisplay(BaseModel):
     id: int
     name: str
-    price: float
+    price: MoneyAmount
     description: str
     thumbnail: str
-    stock: int
+    # Read from Item.available_stock, which includes the shard counters of sharded items and the
+    # journal of journaled ones.
+    stock: int = Field(validation_alias=AliasChoices("available_stock", "stock"))
     type: str
 
     class Config:
         from_attributes = True
 
 
+# Fields a GET /item/all page can be projected to, and the (indexed) columns it can be sorted by.
+ITEM_FIELDS = tuple(ItemDisplay.model_fields)
+ITEM_SORT_FIELDS = ("id", "name", "price")
+
+
+class ItemProjection(BaseModel):
+    """An item with only the fields requested through `fields=`; unrequested fields are left out of the JSON."""
+    id: int
+    name: Optional[str] = None
+    price: Optional[MoneyAmount] = None
+    description: Optional[str] = None
+    thumbnail: Optional[str] = None
+    stock: Optional[int] = None
+    type: Optional[str] = None
+
+
+class ItemSearchHit(ItemDisplay):
+    rank: float = Field(0.0, description="Relevance to the query; higher is better")
+
+
+class ItemSearchPage(BaseModel):
+    total: int = Field(..., description="Items matching the query and filters")
+    items: List[ItemSearchHit] = Field(..., description="This page of matches, best first")
+
+
+class ItemSuggestion(BaseModel):
+    id: int
+    name: str
+
+
+class ItemStockShards(BaseModel):
+    shards: int = Field(..., ge=0, le=64, description="Counters to spread the item's stock over (0 turns sharding off)")
+
+
+class ItemStockJournal(BaseModel):
+    enabled: bool = Field(..., description="Record stock changes as journal movements instead of rewriting the item row")
+
+
+class StockMovementDisplay(BaseModel):
+    id: int
+    delta: int = Field(..., description="Units added to stock; reservations are negative")
+    cart_id: Optional[int] = None
+    reason: str = Field(..., description="open, restock, reserve, release or expire")
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class StockJournalMismatch(BaseModel):
+    item_id: int
+    stock: int = Field(..., description="The item's stored snapshot")
+    journal_stock: int = Field(..., description="The sum of the journal movements the snapshot covers")
+
+
 class ItemUpdate(BaseModel):
     name: Optional[constr(min_length=1)] = Field(default=None, description="The name of the item")
-    price: Optional[float] = Field(default=None, description="The price of the item")
+    price: Optional[Price] = Field(default=None, description="The price of the item")
     description: Optional[constr(min_length=1)] = Field(default=None, description="A description of the item")
     thumbnail: Optional[constr(min_length=1)] = Field(default=None, description="URL to an image of the item")
     stock: Optional[int] = Field(default=None, description="How many of these items are in stock")
@@ -35,6 +99,28 @@ class ItemUpdate(BaseModel):
         min_anystr_length = 1
         anystr_strip_whitespace = True
 
+class ItemBulkUpdate(ItemUpdate):
+    id: int = Field(..., description="The ID of the item to update")
+    type: Optional[constr(min_length=1)] = Field(default=None, description="The type of the item (Product or Event)")
+
+
+class ItemBulkError(BaseModel):
+    index: int = Field(..., description="Position of the row in the request body")
+    detail: Any = Field(..., description="Why the row was rejected")
+
+
+class ItemBulkResult(BaseModel):
+    succeeded: int = Field(0, description="Rows written to the catalog")
+    failed: int = Field(0, description="Rows rejected, detailed in `errors`")
+    errors: List[ItemBulkError] = []
+
+    def merge(self, other: "ItemBulkResult") -> "ItemBulkResult":
+        return ItemBulkResult(
+            succeeded=self.succeeded + other.succeeded,
+            failed=self.failed + other.failed,
+            errors=self.errors + other.errors,
+        )
+
 class ItemDeleteRequest(BaseModel):
     item_ids: Union[int, List[int]] = Field(
         ..., description="A single item ID or a list of item IDs to delete"
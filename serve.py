@@ -0,0 +1,66 @@
+"""Run the API in production: N worker processes behind one socket, each with its share of DB_MAX_CONNECTIONS.
+
+Workers default to WEB_CONCURRENCY, or the CPU count. Each worker warms its connection pool
+and the catalog cache before it accepts traffic. Send SIGHUP for a rolling restart, and
+SIGTTIN / SIGTTOU to add or drain a worker (up to --max-workers).
+"""
+import argparse
+import logging
+import os
+
+from app.launcher import Launcher, peak_workers
+from infrastructure.database import DB_ASYNC, DB_MAX_CONNECTIONS, DB_POOL_SIZE, DB_SYNC_POOL_SIZE, worker_pool_budget
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="app.async_main:app" if DB_ASYNC else "app.main:app")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--max-workers", type=int, help="Most workers SIGTTIN may scale to; pools are sized for one more")
+    parser.add_argument("--max-connections", type=int, default=DB_MAX_CONNECTIONS, help="Database connections shared by all workers")
+    parser.add_argument("--graceful-timeout", type=float, default=30, help="Seconds a draining worker may finish requests")
+    parser.add_argument("--no-warm-up", action="store_true", help="Accept traffic without warming caches first")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    max_workers = max(args.max_workers or args.workers, args.workers)
+    # With DB_ASYNC, each worker also holds the sync engine's fixed pool next to the async one.
+    reserved = DB_SYNC_POOL_SIZE if DB_ASYNC else 0
+    # A SIGHUP starts each replacement before draining the worker it replaces, so one more process is budgeted.
+    try:
+        pool_size, max_overflow = worker_pool_budget(peak_workers(max_workers), args.max_connections, DB_POOL_SIZE, reserved)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    # Workers are spawned with this environment, so these settings reach their engines.
+    os.environ.update(
+        DB_POOL_SIZE=str(pool_size),
+        DB_MAX_OVERFLOW=str(max_overflow),
+        THREADPOOL_SIZE=str(pool_size + max_overflow),
+        WARM_UP="false" if args.no_warm_up else "true",
+    )
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    logging.getLogger("launcher").info(
+        "%d workers (max %d), each with pool_size=%d max_overflow=%d plus %d sync connections",
+        args.workers, max_workers, pool_size, max_overflow, reserved,
+    )
+    Launcher(
+        args.app,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        max_workers=max_workers,
+        graceful_timeout=args.graceful_timeout,
+        log_level=args.log_level,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Release the stock of cart lines reserved longer than RESERVATION_TTL seconds ago.
+
+Runs as a standalone worker instead of inside the app (see app.background.lifespan):
+once with --once, otherwise every RESERVATION_SWEEP_INTERVAL seconds.
+"""
+import argparse
+import asyncio
+import logging
+
+from infrastructure.database import SessionLocal
+from infrastructure.reservation_sweeper import RESERVATION_SWEEP_INTERVAL, RESERVATION_TTL, ReservationSweeper, run_periodically
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ttl", type=float, default=RESERVATION_TTL, help="Reservation lifetime in seconds")
+    parser.add_argument("--interval", type=float, default=RESERVATION_SWEEP_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="Sweep once and exit")
+    args = parser.parse_args()
+    if args.ttl <= 0:
+        parser.error("set --ttl or RESERVATION_TTL to a positive number of seconds")
+
+    logging.basicConfig(level=logging.INFO)
+    sweeper = ReservationSweeper(SessionLocal, ttl=args.ttl)
+    if args.once:
+        report = sweeper.sweep()
+        print(f"Released {report.units} units from {report.lines} cart lines in {report.batches} batches")
+    else:
+        asyncio.run(run_periodically(sweeper, args.interval))
+
+
+if __name__ == "__main__":
+    main()
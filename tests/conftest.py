@@ -0,0 +1,71 @@
+from collections import OrderedDict
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.dependencies import idempotency_store
+from app.main import app
+from domain.models import Base, Cart, CartItem, Item
+from infrastructure.database import get_db
+
+# Connections the session_factory pool holds, enough for the concurrent client tests.
+POOL_SIZE = 16
+
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory database, for tests that run in one thread at a time."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(autocommit=False, autoflush=False, bind=engine)() as session:
+        yield session
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Session factory on a file database, so each thread gets its own connection."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/test.db", connect_args={"check_same_thread": False, "timeout": 30}, pool_size=POOL_SIZE
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+    """A TestClient of app.main whose requests and idempotency store use session_factory."""
+    def override_get_db():
+        with session_factory() as db:
+            yield db
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+    monkeypatch.setattr(idempotency_store, "session_factory", session_factory)
+    monkeypatch.setattr(idempotency_store, "_cache", OrderedDict())
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def cart_and_item(session_factory):
+    with session_factory() as db:
+        item = Item(name="Concert", price=60, description="Live", thumbnail="c.jpg", stock=10, type="Event")
+        cart = Cart()
+        db.add_all([item, cart])
+        db.commit()
+        return cart.id, item.id
+
+
+@pytest.fixture
+def stock_and_quantity(session_factory):
+    """Read an item's stock and the quantity of its line in a cart (0 without one)."""
+    def read(cart_id, item_id):
+        with session_factory() as db:
+            line = db.get(CartItem, (cart_id, item_id))
+            return db.get(Item, item_id).stock, line.quantity if line else 0
+
+    return read
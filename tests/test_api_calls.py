@@ -1,10 +1,15 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from app import fast_json
+from app.catalog import warm_up
+from app.dependencies import catalog_cache
 from app.main import app
 from domain.models import Base
-from infrastructure.database import get_db
+from infrastructure import instrumentation
+from infrastructure.database import create_db_engine, get_db, pool_metrics
 
 # Organized and grouped imports for readability
 
@@ -121,6 +126,7 @@ def test_create_item_and_update(test_client):
     assert data_updated["thumbnail"] == "http://example.com/test_updated.jpg"
     assert data_updated["stock"] == 50
     assert data_updated["type"] == "Product"
+    assert test_client.get(f"/item/{item_id}").json() == data_updated
 
 def test_get_single_item(test_client):
     """
@@ -185,4 +191,327 @@ def test_cart_add_and_remove_item(test_client):
     assert response.status_code == 200
     response_after_removal = test_client.get(f"/cart/{cart_id}")
     response_after_removal_json = response_after_removal.json()
-    assert response_after_removal_json["items"][0]["quantity"] == 4
\ No newline at end of file
+    assert response_after_removal_json["items"][0]["quantity"] == 4
+
+def test_read_missing_cart(test_client):
+    """
+    Reading a cart that does not exist should return a 404 from the joined invoice query.
+    """
+    response = test_client.get("/cart/999999")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Cart not found"
+
+
+def test_list_carts_keyset_pagination(test_client):
+    """
+    Paging through /cart/all with after_id and limit should visit every cart exactly once, in ID order.
+    """
+    all_ids = [cart["id"] for cart in test_client.get("/cart/all").json()]
+    first_page = test_client.get("/cart/all", params={"limit": 2}).json()
+    assert [cart["id"] for cart in first_page] == all_ids[:2]
+    rest = test_client.get("/cart/all", params={"after_id": first_page[-1]["id"]}).json()
+    assert [cart["id"] for cart in rest] == all_ids[2:]
+
+
+def test_list_carts_ndjson_stream(test_client):
+    """
+    Streaming /cart/all should return one JSON invoice per line, matching the regular listing.
+    """
+    response = test_client.get("/cart/all", params={"stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    streamed = [json.loads(line) for line in response.text.splitlines()]
+    assert streamed == test_client.get("/cart/all").json()
+
+
+def test_cart_reservation_updates_stock(test_client):
+    """
+    Adding to a cart should take stock, reject requests beyond it, and removing the line should give it back.
+    """
+    item = test_client.post(
+        "/item/",
+        json={
+            "name": "Limited Item",
+            "price": 7.5,
+            "description": "Only three left",
+            "thumbnail": "http://example.com/limited.jpg",
+            "stock": 3,
+            "type": "Product",
+        },
+    ).json()
+    cart_id = test_client.post("/cart/").json()["id"]
+    response = test_client.post(f"/cart/{cart_id}/add", json={"item_id": item["id"], "quantity": 2})
+    assert response.status_code == 200
+    assert response.json()["item"]["stock"] == 1
+    response = test_client.post(f"/cart/{cart_id}/add", json={"item_id": item["id"], "quantity": 2})
+    assert response.status_code == 400
+    assert test_client.get(f"/item/{item['id']}").json()["stock"] == 1
+    for quantity in (0, -8):
+        response = test_client.post(f"/cart/{cart_id}/add", json={"item_id": item["id"], "quantity": quantity})
+        assert response.status_code == 422
+    assert test_client.get(f"/item/{item['id']}").json()["stock"] == 1
+    custom_test_client = CustomTestClient(app)
+    response = custom_test_client.delete_with_payload(url=f"/cart/{cart_id}/remove", json={"item_id": item["id"]})
+    assert response.status_code == 200
+    assert test_client.get(f"/item/{item['id']}").json()["stock"] == 3
+
+
+def test_list_items_etag(test_client):
+    """
+    /item/all should carry an ETag, answer a matching If-None-Match with 304, and change its ETag after an item update.
+    """
+    response = test_client.get("/item/all")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.json() == [test_client.get(f"/item/{item['id']}").json() for item in response.json()]
+
+    not_modified = test_client.get("/item/all", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+
+    test_client.put("/item/1", json={"name": "Renamed Item", "price": 11.5, "description": "A renamed item",
+                                     "thumbnail": "http://example.com/renamed.jpg", "stock": 90, "type": "Product"})
+    modified = test_client.get("/item/all", headers={"If-None-Match": etag})
+    assert modified.status_code == 200
+    assert modified.headers["etag"] != etag
+    assert modified.json()[0]["name"] == "Renamed Item"
+
+
+def test_bulk_create_and_update_items(test_client):
+    """
+    Bulk endpoints should write valid rows from JSON arrays and NDJSON streams and report the rejected ones by index.
+    """
+    rows = [
+        {"name": "Bulk Product", "price": 3.5, "description": "Imported", "thumbnail": "bulk.jpg", "stock": 10, "type": "Product"},
+        {"name": "Bulk Event", "price": 20, "description": "Imported", "thumbnail": "bulk.jpg", "stock": 5, "type": "Event"},
+        {"name": "Bad Type", "price": 1, "description": "Imported", "thumbnail": "bulk.jpg", "stock": 1, "type": "Other"},
+        {"name": "No Price", "description": "Imported", "thumbnail": "bulk.jpg", "stock": 1, "type": "Product"},
+    ]
+    response = test_client.post("/item/bulk", json=rows)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["succeeded"], result["failed"]) == (2, 2)
+    assert [error["index"] for error in result["errors"]] == [2, 3]
+
+    ndjson = "\n".join(json.dumps(row) for row in rows[:2]) + "\nnot json\n"
+    response = test_client.post("/item/bulk", content=ndjson, headers={"Content-Type": "application/x-ndjson"})
+    assert (response.json()["succeeded"], response.json()["failed"]) == (2, 1)
+
+    created = [item for item in test_client.get("/item/all").json() if item["name"].startswith("Bulk")]
+    assert len(created) == 4
+    updates = [{"id": created[0]["id"], "price": 4.25}, {"id": 999999, "stock": 1}]
+    response = test_client.put("/item/bulk", json=updates)
+    assert response.json()["succeeded"] == 1
+    assert response.json()["errors"] == [{"index": 1, "detail": "Item not found"}]
+    updated = test_client.get(f"/item/{created[0]['id']}").json()
+    assert (updated["price"], updated["name"]) == (4.25, "Bulk Product")
+
+
+def test_cart_batch_operations(test_client):
+    """
+    A batch of cart operations should apply all together, and a batch with one failing operation should change nothing.
+    """
+    def create_item(name, stock):
+        return test_client.post("/item/", json={"name": name, "price": 2.5, "description": "Batch item",
+                                                "thumbnail": "batch.jpg", "stock": stock, "type": "Product"}).json()["id"]
+
+    first, second = create_item("Batch One", 10), create_item("Batch Two", 3)
+    cart_id = test_client.post("/cart/").json()["id"]
+    operations = [
+        {"op": "add", "item_id": first, "quantity": 4},
+        {"op": "add", "item_id": second, "quantity": 3},
+        {"op": "remove", "item_id": first, "quantity": 1},
+        {"op": "set", "item_id": second, "quantity": 2},
+    ]
+    response = test_client.post(f"/cart/{cart_id}/ops", json={"operations": operations})
+    assert response.status_code == 200
+    cart = response.json()
+    assert {line["item_id"]: line["quantity"] for line in cart["items"]} == {first: 3, second: 2}
+    assert cart["total"] == 12.5
+    assert test_client.get(f"/item/{first}").json()["stock"] == 7
+    assert test_client.get(f"/item/{second}").json()["stock"] == 1
+
+    operations = [{"op": "remove", "item_id": first}, {"op": "add", "item_id": second, "quantity": 5}]
+    response = test_client.post(f"/cart/{cart_id}/ops", json={"operations": operations})
+    assert response.status_code == 400
+    assert test_client.get(f"/cart/{cart_id}").json() == cart
+    assert test_client.get(f"/item/{first}").json()["stock"] == 7
+
+
+def test_query_count_budget_and_metrics(test_client, monkeypatch):
+    """
+    Cart reads should stay within a fixed SQL statement budget regardless of cart size, and show up in /metrics.
+    """
+    monkeypatch.setattr(instrumentation.config, "query_count_header", True)
+    monkeypatch.setattr(instrumentation.config, "server_timing", True)
+    cart_id = test_client.post("/cart/").json()["id"]
+    for index in range(5):
+        item_id = test_client.post("/item/", json={"name": f"Budget {index}", "price": 1.0, "description": "Budget item",
+                                                   "thumbnail": "budget.jpg", "stock": 5, "type": "Product"}).json()["id"]
+        test_client.post(f"/cart/{cart_id}/add", json={"item_id": item_id, "quantity": 1})
+
+    response = test_client.get(f"/cart/{cart_id}")
+    assert response.status_code == 200
+    assert int(response.headers["X-Query-Count"]) <= 2
+    assert "db;dur=" in response.headers["Server-Timing"]
+
+    metrics = test_client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/cart/{cart_id}"}' in metrics
+    assert 'http_request_sql_queries_total{method="POST",route="/cart/{cart_id}/add"}' in metrics
+    assert "db_pool_checkouts" in metrics
+
+
+def test_cart_totals_are_exact(test_client):
+    """
+    Totals are computed in exact decimal arithmetic: 3 x 39.99 is 119.97, not 119.97000000000001.
+    """
+    item_id = test_client.post("/item/", json={"name": "Exact Price", "price": 39.99, "description": "Money item",
+                                               "thumbnail": "money.jpg", "stock": 10, "type": "Product"}).json()["id"]
+    cart_id = test_client.post("/cart/").json()["id"]
+    added = test_client.post(f"/cart/{cart_id}/add", json={"item_id": item_id, "quantity": 3})
+    assert '"subtotal":119.97' in added.text
+    response = test_client.get(f"/cart/{cart_id}")
+    assert '"total":119.97' in response.text
+    assert test_client.post("/item/", json={"name": "Sub-cent", "price": 1.005, "description": "Money item",
+                                            "thumbnail": "money.jpg", "stock": 1, "type": "Product"}).status_code == 422
+
+
+def test_cart_stats_match_cart_listing(test_client):
+    """
+    GET /cart/stats should agree with the invoices returned by GET /cart/all.
+    """
+    carts = test_client.get("/cart/all").json()
+    response = test_client.get("/cart/stats", params={"top": 3})
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["cart_count"] == len(carts)
+    assert stats["line_count"] == sum(len(cart["items"]) for cart in carts)
+    assert stats["units_reserved"] == sum(line["quantity"] for cart in carts for line in cart["items"])
+    assert round(stats["total_value"], 2) == round(sum(cart["total"] for cart in carts), 2)
+    assert round(sum(stats["value_by_type"].values()), 2) == round(stats["total_value"], 2)
+    expected_top = sorted(carts, key=lambda cart: (-cart["total"], cart["id"]))[:3]
+    assert stats["top_carts"] == [{"cart_id": cart["id"], "total": cart["total"]} for cart in expected_top]
+
+
+def test_sharded_item_stock(test_client):
+    """
+    A sharded item keeps reporting its total stock, and reservations and removals go through its shards.
+    """
+    item = test_client.post(
+        "/item/",
+        json={
+            "name": "Hot Event",
+            "price": 45.0,
+            "description": "Goes on sale at noon",
+            "thumbnail": "http://example.com/hot.jpg",
+            "stock": 10,
+            "type": "Event",
+        },
+    ).json()
+    response = test_client.put(f"/item/{item['id']}/stock_shards", json={"shards": 4})
+    assert response.status_code == 200
+    assert response.json()["stock"] == 10
+    cart_id = test_client.post("/cart/").json()["id"]
+    response = test_client.post(f"/cart/{cart_id}/add", json={"item_id": item["id"], "quantity": 4})
+    assert response.json()["item"]["stock"] == 6
+    assert test_client.get(f"/item/{item['id']}").json()["stock"] == 6
+    custom_test_client = CustomTestClient(app)
+    custom_test_client.delete_with_payload(url=f"/cart/{cart_id}/remove", json={"item_id": item["id"]})
+    assert test_client.get(f"/item/{item['id']}").json()["stock"] == 10
+    assert test_client.put(f"/item/{item['id']}/stock_shards", json={"shards": 65}).status_code == 422
+    assert test_client.put("/item/999999/stock_shards", json={"shards": 2}).status_code == 404
+
+    response = test_client.put(f"/item/{item['id']}/stock_journal", json={"enabled": True})
+    assert (response.status_code, response.json()["stock"]) == (200, 10)
+    test_client.post(f"/cart/{cart_id}/add", json={"item_id": item["id"], "quantity": 3})
+    assert test_client.get(f"/item/{item['id']}").json()["stock"] == 7
+    movements = test_client.get(f"/item/{item['id']}/stock_movements").json()
+    assert [(m["delta"], m["cart_id"], m["reason"]) for m in movements] == [(10, None, "open"), (-3, cart_id, "reserve")]
+    assert test_client.get(f"/item/{item['id']}/stock_movements", params={"after_id": movements[0]["id"]}).json() == movements[1:]
+    assert test_client.put("/item/999999/stock_journal", json={"enabled": True}).status_code == 404
+
+
+def test_item_search_and_autocomplete(test_client):
+    for name, price in [("Zephyr Kite", 25.0), ("Zephyr Kite Pro", 90.0)]:
+        test_client.post(
+            "/item/",
+            json={"name": name, "price": price, "description": "Flies in light wind",
+                  "thumbnail": "http://example.com/kite.jpg", "stock": 4, "type": "Product"},
+        )
+    response = test_client.get("/item/search", params={"q": "zephyr ki", "max_price": 50})
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
+    assert response.json()["items"][0]["name"] == "Zephyr Kite"
+    assert response.json()["items"][0]["stock"] == 4
+    suggestions = test_client.get("/item/autocomplete", params={"q": "zeph"}).json()
+    assert [suggestion["name"] for suggestion in suggestions] == ["Zephyr Kite", "Zephyr Kite Pro"]
+    assert test_client.get("/item/search", params={"q": ""}).status_code == 422
+
+
+def test_list_items_keyset_pages_and_projection(test_client):
+    """
+    Paging /item/all by price with after_id visits every item once, in order, with only the requested fields.
+    """
+    catalog = test_client.get("/item/all").json()
+    by_price = sorted(catalog, key=lambda item: (item["price"], item["id"]), reverse=True)
+    seen, after_id = [], None
+    while True:
+        params = {"limit": 3, "fields": "name,price", "sort": "-price"}
+        if after_id is not None:
+            params["after_id"] = after_id
+        page = test_client.get("/item/all", params=params).json()
+        if not page:
+            break
+        assert all(set(item) == {"id", "name", "price"} for item in page)
+        seen += page
+        after_id = page[-1]["id"]
+    assert [item["id"] for item in seen] == [item["id"] for item in by_price]
+    assert seen[0]["price"] == by_price[0]["price"]
+    by_id = test_client.get("/item/all", params={"after_id": catalog[0]["id"], "fields": "stock"}).json()
+    assert by_id == [{"id": item["id"], "stock": item["stock"]} for item in catalog[1:]]
+    assert test_client.get("/item/all", params={"fields": "name,secret"}).status_code == 400
+    assert test_client.get("/item/all", params={"sort": "description"}).status_code == 400
+
+
+def test_fast_json_matches_response_models(test_client, monkeypatch):
+    """
+    FAST_JSON responses are byte-for-byte the same as the response_model path, for every hot read.
+    """
+    cart_ids = [cart["id"] for cart in test_client.get("/cart/all").json() if cart["items"]]
+    assert cart_ids
+    urls = [
+        "/item/all",
+        "/item/all?limit=5&fields=price,name&sort=-price",
+        "/cart/all",
+        "/cart/all?limit=2",
+        *(f"/cart/{cart_id}" for cart_id in cart_ids),
+        "/cart/999999",
+    ]
+
+    def bodies():
+        responses = []
+        for url in urls:
+            catalog_cache.bump()
+            response = test_client.get(url)
+            responses.append((response.status_code, response.content))
+        return responses
+
+    monkeypatch.setattr(fast_json.config, "enabled", False)
+    expected = bodies()
+    monkeypatch.setattr(fast_json.config, "enabled", True)
+    assert bodies() == expected
+
+
+def test_warm_up_fills_pool_and_catalog_cache(test_client):
+    """
+    The startup warm-up opens the pool's connections and caches the same catalog body GET /item/all serves.
+    """
+    engine = create_db_engine("sqlite:///./test.db", pool_size=3)
+    catalog_cache.bump()
+    warm_up(engine, sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    assert pool_metrics(engine)["checked_in"] == 3
+    cached = catalog_cache.get()
+    assert cached is not None
+    response = test_client.get("/item/all")
+    assert (response.content, response.headers["etag"]) == (cached.body, cached.etag)
+    engine.dispose()
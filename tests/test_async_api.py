@@ -0,0 +1,83 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app.async_main import app
+from domain.models import Base
+from infrastructure.database import get_async_db
+
+
+@pytest.fixture(scope="module")
+def test_client(tmp_path_factory):
+    """
+    Setup TestClient for the async app with an aiosqlite test database for the duration of the tests.
+    """
+    path = tmp_path_factory.mktemp("async") / "test_async.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    TestAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with TestAsyncSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    with TestClient(app) as client:
+        yield client
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_async_cart_flow(test_client):
+    """
+    Create an item and a cart, add and remove stock, and read the invoice through the async endpoints.
+    """
+    item = test_client.post(
+        "/item/",
+        json={
+            "name": "Async Item",
+            "price": 39.99,
+            "description": "Served from the event loop",
+            "thumbnail": "http://example.com/async.jpg",
+            "stock": 4,
+            "type": "Product",
+        },
+    ).json()
+    cart = test_client.post("/cart/").json()
+    assert cart["items"] == []
+
+    response = test_client.post(f"/cart/{cart['id']}/add", json={"item_id": item["id"], "quantity": 3})
+    assert response.status_code == 200
+    assert response.json()["item"]["stock"] == 1
+    assert test_client.post(f"/cart/{cart['id']}/add", json={"item_id": item["id"], "quantity": 2}).status_code == 400
+
+    response = test_client.get(f"/cart/{cart['id']}")
+    cart_details = response.json()
+    assert cart_details["items"][0]["quantity"] == 3
+    assert cart_details["total"] == 3 * 39.99
+
+    remove = {"item_id": item["id"], "quantity": 1}
+    assert test_client.request("DELETE", f"/cart/{cart['id']}/remove", json=remove, headers={"If-Match": 'W/"0"'}).status_code == 412
+    response = test_client.request("DELETE", f"/cart/{cart['id']}/remove", json=remove, headers={"If-Match": response.headers["etag"]})
+    assert response.status_code == 200
+    assert test_client.get(f"/item/{item['id']}").json()["stock"] == 2
+    assert [c["id"] for c in test_client.get("/cart/all", params={"limit": 1}).json()] == [cart["id"]]
+
+
+def test_async_app_serves_the_documented_subset_of_routes():
+    """
+    Every async route exists in app.main, and the ones it lacks are those app.async_main documents.
+    """
+    from app.main import app as sync_app
+
+    def routes(application):
+        return {(method, route.path) for route in application.routes for method in getattr(route, "methods", ())}
+
+    assert routes(app) <= routes(sync_app)
+    assert {path for _, path in routes(sync_app) - routes(app)} == {
+        "/cache/stats", "/item/search", "/item/autocomplete", "/item/bulk", "/item/{item_id}/stock_shards",
+        "/item/{item_id}/stock_journal", "/item/{item_id}/stock_movements", "/cart/stats", "/cart/{cart_id}/ops",
+    }
@@ -0,0 +1,117 @@
+from decimal import Decimal
+
+from sqlalchemy import update
+
+from domain.models import Cart, Item, utcnow
+from domain.service import CartService, ItemService
+from infrastructure.repository import CartRepository, ItemChangeRepository, ItemRepository
+from schemas.cart import CartOperation
+from schemas.item import ItemUpdate
+
+
+def stored(db, cart_id):
+    db.expire_all()
+    cart = db.get(Cart, cart_id)
+    return cart.total, cart.line_count, cart.version
+
+
+def test_cart_totals_follow_every_mutation(db):
+    """
+    The stored total and line count track adds, removals, batches and price changes, and match a full recompute.
+    """
+    items = [Item(name=f"Item {n}", price=price, description="d", thumbnail="t", stock=100, type="Product")
+             for n, price in enumerate([Decimal("39.99"), Decimal("5.25")])]
+    cart = Cart()
+    db.add_all([*items, cart])
+    db.commit()
+    cart_repo, item_repo = CartRepository(db), ItemRepository(db)
+    cart_service, item_service = CartService(cart_repo, item_repo), ItemService(item_repo)
+    first, second = items[0].id, items[1].id
+
+    cart_service.add_item_to_cart(cart.id, first, 3)
+    cart_service.add_item_to_cart(cart.id, second, 2)
+    cart_service.add_item_to_cart(cart.id, first, 1)
+    assert stored(db, cart.id) == (Decimal("170.46"), 2, 3)
+
+    cart_service.remove_item_from_cart(cart.id, first, 2)
+    assert stored(db, cart.id)[:2] == (Decimal("90.48"), 2)
+    cart_service.remove_item_from_cart(cart.id, second)
+    assert stored(db, cart.id)[:2] == (Decimal("79.98"), 1)
+
+    cart_service.apply_cart_operations(cart.id, [CartOperation(op="set", item_id=second, quantity=4)])
+    assert stored(db, cart.id)[:2] == (Decimal("100.98"), 2)
+
+    item_service.update_item(first, ItemUpdate(name="Item 0", price=Decimal("10.00"), description="d",
+                                               thumbnail="t", stock=98, type="Product"))
+    # The stored total waits for the repricer, but reads already total the cart at the new price.
+    assert stored(db, cart.id) == (Decimal("100.98"), 2, 6)
+    assert cart_service.get_cart_details(cart.id).total == Decimal("41.00")
+    batch = ItemChangeRepository(db).reprice_next_batch(10, utcnow())
+    assert (batch.item_id, batch.carts, batch.done) == (first, 1, True)
+    assert stored(db, cart.id) == (Decimal("41.00"), 2, 7)
+    assert db.get(Item, first).reprice_pending == 0
+    assert cart_repo.check_cart_totals() == []
+
+
+def test_check_cart_totals_reports_and_fixes_drift(db):
+    item = Item(name="Drift", price=Decimal("2.50"), description="d", thumbnail="t", stock=10, type="Product")
+    cart = Cart()
+    db.add_all([item, cart])
+    db.commit()
+    cart_repo = CartRepository(db)
+    CartService(cart_repo, ItemRepository(db)).add_item_to_cart(cart.id, item.id, 2)
+    db.execute(update(Cart).where(Cart.id == cart.id).values(total=Decimal("1.00")))
+    db.commit()
+
+    [mismatch] = cart_repo.check_cart_totals()
+    assert (mismatch.cart_id, mismatch.stored_total, mismatch.total) == (cart.id, Decimal("1.00"), Decimal("5.00"))
+    assert cart_repo.refresh_cart_totals([mismatch.cart_id]) == 1
+    assert cart_repo.check_cart_totals() == []
+
+
+def test_upserts_count_only_the_lines_they_insert(db):
+    items = [Item(name=f"Item {n}", price=Decimal("3.00"), description="d", thumbnail="t", stock=10, type="Product")
+             for n in range(2)]
+    cart = Cart()
+    db.add_all([*items, cart])
+    db.commit()
+    cart_repo = CartRepository(db)
+
+    assert cart_repo.upsert_cart_item(cart.id, items[0].id, 2).quantity == 2
+    assert stored(db, cart.id)[:2] == (Decimal("6.00"), 1)
+    # The line already exists, so adding to it must not count a second line.
+    assert cart_repo.upsert_cart_item(cart.id, items[0].id, 2).quantity == 4
+    assert stored(db, cart.id)[:2] == (Decimal("12.00"), 1)
+    cart_repo.upsert_cart_item(cart.id, items[1].id, 1)
+    assert stored(db, cart.id)[:2] == (Decimal("15.00"), 2)
+    assert cart_repo.remove_cart_units(cart.id, items[0].id) == 4
+    cart_repo.upsert_cart_item(cart.id, items[0].id, 1)
+    assert stored(db, cart.id)[:2] == (Decimal("6.00"), 2)
+
+
+def test_removing_a_line_awaiting_reprice_keeps_the_total_right(db):
+    """
+    A line removed before the repricer reaches its cart leaves the cart stale rather than
+    subtracting the new price from a total summed at the old one.
+    """
+    items = [Item(name=f"Item {n}", price=price, description="d", thumbnail="t", stock=10, type="Product")
+             for n, price in enumerate([Decimal("10.00"), Decimal("3.00")])]
+    cart = Cart()
+    db.add_all([*items, cart])
+    db.commit()
+    cart_repo, item_repo = CartRepository(db), ItemRepository(db)
+    cart_service = CartService(cart_repo, item_repo)
+    first, second = items[0].id, items[1].id
+    cart_service.add_item_to_cart(cart.id, first, 2)
+    cart_service.add_item_to_cart(cart.id, second, 1)
+
+    ItemService(item_repo).update_item(first, ItemUpdate(name="Item 0", price=Decimal("25.00"), description="d",
+                                                         thumbnail="t", stock=8, type="Product"))
+    cart_service.remove_item_from_cart(cart.id, first)
+    assert stored(db, cart.id)[:2] == (None, 1)
+
+    while ItemChangeRepository(db).reprice_next_batch(10, utcnow()) is not None:
+        pass
+    assert cart_service.get_cart_details(cart.id).total == Decimal("3.00")
+    assert stored(db, cart.id)[:2] == (Decimal("3.00"), 1)
+    assert cart_repo.check_cart_totals() == []
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm.exc import StaleDataError
+
+from infrastructure.repository import CartRepository, ItemRepository
+
+CLIENTS = 8
+
+
+def test_mutations_with_a_stale_if_match_fail_with_412(client, cart_and_item, stock_and_quantity):
+    cart_id, item_id = cart_and_item
+    first = client.get(f"/cart/{cart_id}")
+    assert first.headers["etag"] == 'W/"0"'
+
+    add = {"item_id": item_id, "quantity": 2}
+    assert client.post(f"/cart/{cart_id}/add", json=add, headers={"If-Match": first.headers["etag"]}).status_code == 200
+    assert client.get(f"/cart/{cart_id}").headers["etag"] == 'W/"1"'
+
+    for if_match in (first.headers["etag"], '"0"', "not-an-etag"):
+        assert client.post(f"/cart/{cart_id}/add", json=add, headers={"If-Match": if_match}).status_code == 412
+    remove = client.request("DELETE", f"/cart/{cart_id}/remove", json={"item_id": item_id}, headers={"If-Match": 'W/"0"'})
+    assert remove.status_code == 412
+    assert stock_and_quantity(cart_id, item_id) == (8, 2)
+
+    ops = {"operations": [{"op": "set", "item_id": item_id, "quantity": 3}]}
+    assert client.post(f"/cart/{cart_id}/ops", json=ops, headers={"If-Match": '"1"'}).status_code == 200
+    assert client.post(f"/cart/{cart_id}/add", json=add, headers={"If-Match": "*"}).status_code == 200
+    assert client.post(f"/cart/{cart_id}/add", json=add).status_code == 200
+    assert stock_and_quantity(cart_id, item_id) == (3, 7)
+    assert client.get(f"/cart/{cart_id}").headers["etag"] == 'W/"4"'
+
+
+def test_concurrent_updates_from_one_version_apply_once(client, cart_and_item, stock_and_quantity):
+    """
+    Clients that all read the same ETag race to add: one wins, the others get 412 and reserve nothing.
+    """
+    cart_id, item_id = cart_and_item
+    etag = client.get(f"/cart/{cart_id}").headers["etag"]
+    barrier = threading.Barrier(CLIENTS)
+    statuses = []
+
+    def add():
+        barrier.wait()
+        response = client.post(f"/cart/{cart_id}/add", json={"item_id": item_id, "quantity": 1}, headers={"If-Match": etag})
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=add) for _ in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [200] + [412] * (CLIENTS - 1)
+    assert stock_and_quantity(cart_id, item_id) == (9, 1)
+
+
+def test_version_conflict_rolls_back_the_whole_transaction(session_factory, cart_and_item, stock_and_quantity):
+    cart_id, item_id = cart_and_item
+    with session_factory() as db:
+        cart_repo, item_repo = CartRepository(db), ItemRepository(db)
+        cart_repo.upsert_cart_item(cart_id, item_id, 1, expected_version=0)
+        assert item_repo.reserve_stock(item_id, 2) is not None
+        with pytest.raises(StaleDataError):
+            cart_repo.upsert_cart_item(cart_id, item_id, 2, expected_version=0)
+        assert cart_repo.get_version(cart_id) == 1
+    assert stock_and_quantity(cart_id, item_id) == (10, 1)
+
+
+def test_cart_body_and_version_come_from_one_select(session_factory, cart_and_item):
+    cart_id, item_id = cart_and_item
+    with session_factory() as db:
+        cart_repo = CartRepository(db)
+        cart_repo.upsert_cart_item(cart_id, item_id, 2)
+        statements = []
+        event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+        cart_display, version = cart_repo.get_versioned_cart_display(cart_id)
+        cart_row, row_version = cart_repo.get_versioned_cart_row(cart_id)
+        assert (cart_display.items[0].quantity, version) == (2, 1)
+        assert (cart_row["items"][0]["quantity"], row_version) == (2, 1)
+        assert len(statements) == 2
@@ -0,0 +1,84 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app.dependencies import idempotency_store
+from infrastructure.idempotency import IdempotencyStore
+
+CLIENTS = 16
+
+
+def test_retried_add_replays_the_stored_response(client, cart_and_item, stock_and_quantity):
+    """
+    A retry with the same Idempotency-Key gets the first response back, from the LRU or the database,
+    without adding to the cart again.
+    """
+    cart_id, item_id = cart_and_item
+    url, body, headers = f"/cart/{cart_id}/add", {"item_id": item_id, "quantity": 2}, {"Idempotency-Key": "add-1"}
+    first = client.post(url, json=body, headers=headers)
+    assert first.status_code == 200 and "idempotent-replayed" not in first.headers
+
+    retry = client.post(url, json=body, headers=headers)
+    idempotency_store._cache.clear()
+    retry_from_db = client.post(url, json=body, headers=headers)
+    for response in (retry, retry_from_db):
+        assert (response.status_code, response.content) == (200, first.content)
+        assert response.headers["idempotent-replayed"] == "true"
+    assert stock_and_quantity(cart_id, item_id) == (8, 2)
+
+    assert client.post(url, json={"item_id": item_id, "quantity": 3}, headers=headers).status_code == 422
+    assert client.post(url, json=body, headers={"Idempotency-Key": "k" * 256}).status_code == 400
+    assert client.post(url, json=body).status_code == 200
+    assert stock_and_quantity(cart_id, item_id) == (6, 4)
+
+
+def test_concurrent_requests_with_one_key_run_once(client, cart_and_item, stock_and_quantity):
+    """
+    Many clients sending the same Idempotency-Key at once: exactly one add runs, and every client gets its response.
+    """
+    cart_id, item_id = cart_and_item
+    barrier = threading.Barrier(CLIENTS)
+    responses = []
+
+    def add():
+        barrier.wait()
+        responses.append(
+            client.post(f"/cart/{cart_id}/add", json={"item_id": item_id, "quantity": 2}, headers={"Idempotency-Key": "burst"})
+        )
+
+    threads = [threading.Thread(target=add) for _ in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {(response.status_code, response.content) for response in responses} == {(200, responses[0].content)}
+    assert sum("idempotent-replayed" not in response.headers for response in responses) == 1
+    assert stock_and_quantity(cart_id, item_id) == (8, 2)
+
+
+def test_expired_keys_are_deleted_in_bounded_batches(session_factory):
+    now = [datetime(2026, 1, 1, tzinfo=timezone.utc)]
+    store = IdempotencyStore(session_factory, ttl=60, cache_size=2, cleanup_every=1000, cleanup_batch=2, clock=lambda: now[0])
+    for n in range(5):
+        assert store.begin(f"key-{n}", "f") is None
+        store.complete(f"key-{n}", "f", 200, "application/json", b"{}")
+    assert len(store._cache) == 2
+    assert store.begin("key-0", "f").status_code == 200
+
+    now[0] += timedelta(seconds=61)
+    assert [store.delete_expired() for _ in range(4)] == [2, 2, 1, 0]
+    assert store.begin("key-0", "f") is None
+
+
+def test_replays_from_the_database_are_cached_until_the_record_expires(session_factory):
+    now = [datetime(2026, 1, 1, tzinfo=timezone.utc)]
+    store = IdempotencyStore(session_factory, ttl=60, clock=lambda: now[0])
+    assert store.begin("key", "f") is None
+    store.complete("key", "f", 200, "application/json", b"{}")
+    store._cache.clear()
+
+    now[0] += timedelta(seconds=50)
+    assert store.begin("key", "f").status_code == 200
+    assert store._cache["key"][0] == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    now[0] += timedelta(seconds=11)
+    assert store._cached("key") is None
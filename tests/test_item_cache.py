@@ -0,0 +1,68 @@
+import pytest
+
+from domain.models import Item
+from infrastructure.cache import FakeKeyValueClient, KeyValueStoreCache, TTLLRUCache
+from infrastructure.cached_repository import CachedItemRepository
+from infrastructure.repository import ItemRepository
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def new_item(**overrides):
+    data = {"name": "Coffee", "price": 15.5, "description": "Beans", "thumbnail": "coffee.jpg",
+            "stock": 5, "type": "Product"}
+    return Item(**{**data, **overrides})
+
+
+def test_ttl_lru_cache_expiry_and_eviction():
+    """
+    Entries expire after the TTL and the least recently used entry is evicted first.
+    """
+    clock = FakeClock()
+    cache = TTLLRUCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+@pytest.mark.parametrize("make_cache", [
+    lambda: TTLLRUCache(),
+    lambda: KeyValueStoreCache(FakeKeyValueClient()),
+], ids=["memory", "shared"])
+def test_cached_repository_reads_through_and_invalidates(db, make_cache):
+    """
+    Cached reads count hits, always show current stock, and writes invalidate cached catalog fields.
+    """
+    cache = make_cache()
+    repo = CachedItemRepository(ItemRepository(db), cache)
+    item_id = repo.create(new_item()).id
+
+    assert repo.get(item_id).price == 15.5
+    assert [item.name for item in repo.list()] == ["Coffee"]
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    repo.reserve_stock(item_id, 2)
+    db.commit()
+    assert repo.get(item_id).stock == 3
+    assert repo.list()[0].stock == 3
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    repo.update(item_id, {"price": 12.0})
+    assert repo.get(item_id).price == 12.0
+    assert repo.list()[0].price == 12.0
+
+    repo.delete(item_id)
+    assert repo.get(item_id) is None
+    assert repo.list() == []
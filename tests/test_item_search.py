@@ -0,0 +1,83 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from domain.service import ItemService
+from infrastructure.repository import ItemRepository
+from infrastructure.search import InMemoryItemSearch, InvertedIndex, PostgresItemSearch, tsquery_text
+from schemas.item import ItemCreate, ItemUpdate
+
+CATALOG = [
+    ("Red Running Shoes", "Light trail shoes", "19.99", "Product"),
+    ("Blue Sneakers", "Canvas shoes in red and blue", "49.00", "Product"),
+    ("Rock Concert", "Red stage, loud music", "80.00", "Event"),
+    ("Redwood Table", "Solid wood", "250.00", "Product"),
+]
+
+
+@pytest.fixture
+def item_service(db):
+    item_repo = ItemRepository(db)
+    service = ItemService(item_repo, item_search=InMemoryItemSearch(InvertedIndex(), item_repo))
+    for name, description, price, item_type in CATALOG:
+        service.create_item(ItemCreate(name=name, description=description, price=Decimal(price),
+                                       thumbnail="t.jpg", stock=5, type=item_type))
+    return service
+
+
+def names(page):
+    return [item.name for item in page.items]
+
+
+def test_search_ranks_filters_and_pages(item_service):
+    """
+    Name matches rank above description matches, the last word matches as a prefix, and filters and pages apply.
+    """
+    assert names(item_service.search_items("red shoes")) == ["Red Running Shoes", "Blue Sneakers"]
+    assert names(item_service.search_items("red")) == [
+        "Red Running Shoes", "Redwood Table", "Blue Sneakers", "Rock Concert",
+    ]
+    assert names(item_service.search_items("loud mu")) == ["Rock Concert"]
+    assert names(item_service.search_items("red", item_type="Event")) == ["Rock Concert"]
+    assert names(item_service.search_items("red", min_price=Decimal("20"), max_price=Decimal("60"))) == ["Blue Sneakers"]
+    page = item_service.search_items("red", limit=3, offset=2)
+    assert (page.total, names(page)) == (4, ["Blue Sneakers", "Rock Concert"])
+    assert item_service.search_items("!!").total == 0
+
+
+def test_search_index_follows_item_writes(item_service):
+    """
+    Creating, updating and deleting items through ItemService keeps the index current, and autocomplete
+    only matches names.
+    """
+    assert [s.name for s in item_service.autocomplete("red")] == ["Red Running Shoes", "Redwood Table"]
+    concert = item_service.search_items("rock").items[0]
+    item_service.update_item(concert.id, ItemUpdate(name="Jazz Night", price=Decimal("35.00"), description="Live trio",
+                                                    thumbnail="t.jpg", stock=5, type="Event"))
+    assert item_service.search_items("rock").total == 0
+    assert names(item_service.search_items("jazz")) == ["Jazz Night"]
+    item_service.delete_item(concert.id)
+    assert item_service.search_items("jazz").total == 0
+    item_service.bulk_create_items([{"name": "Jazz Records", "price": 12, "description": "Vinyl",
+                                     "thumbnail": "t.jpg", "stock": 1, "type": "Product"}])
+    assert names(item_service.search_items("jaz")) == ["Jazz Records"]
+
+
+def test_postgres_search_uses_tsquery():
+    assert tsquery_text(["red", "sho"]) == "red & sho:*"
+    assert tsquery_text(["red", "sho"], weights="A") == "red:A & sho:*A"
+
+    class Recorder:
+        def execute(self, statement):
+            self.sql = str(statement.compile(dialect=postgresql.dialect()))
+            return self
+
+        def all(self):
+            return []
+
+    recorder = Recorder()
+    PostgresItemSearch(recorder).search("Red sho", item_type="Event")
+    assert "@@ to_tsquery(%(to_tsquery_1)s, %(to_tsquery_2)s)" in recorder.sql
+    assert "setweight(to_tsvector('simple', coalesce(name, '')), 'A')" in recorder.sql
+    assert "ts_rank(" in recorder.sql and "item.type = " in recorder.sql
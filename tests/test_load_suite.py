@@ -0,0 +1,17 @@
+from benchmarks.load_suite import compare_results
+
+
+def test_compare_results_flags_regressions_beyond_threshold():
+    baseline = {"scenarios": {
+        "cart_get": {"p50_ms": 10.0, "p99_ms": 40.0, "throughput_rps": 500.0, "queries_per_request": 1.0},
+        "item_list": {"p50_ms": 5.0, "p99_ms": 20.0, "throughput_rps": 900.0, "queries_per_request": None},
+    }}
+    current = {"scenarios": {
+        "cart_get": {"p50_ms": 10.5, "p99_ms": 60.0, "throughput_rps": 350.0, "queries_per_request": 1.0},
+        "item_list": {"p50_ms": 4.0, "p99_ms": 21.0, "throughput_rps": 950.0, "queries_per_request": 0.1},
+    }}
+    regressions = compare_results(baseline, current, threshold=0.2)
+    assert [regression.split(" ")[:2] for regression in regressions] == [
+        ["cart_get:", "p99_ms"],
+        ["cart_get:", "throughput_rps"],
+    ]
@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import Column, Float, ForeignKey, Integer, MetaData, String, Table, create_engine, inspect
+from sqlalchemy.orm import Session
+
+from domain.models import Base, Cart, CartItem, Item
+from infrastructure.migrations import upgrade
+from infrastructure.repository import CartRepository
+
+# The tables create_all built from domain/models.py before migrations existed.
+baseline = MetaData()
+Table(
+    "item", baseline,
+    Column("id", Integer, primary_key=True),
+    Column("name", String, nullable=False, index=True),
+    Column("price", Float, nullable=False),
+    Column("description", String, nullable=False),
+    Column("thumbnail", String, nullable=False),
+    Column("stock", Integer, nullable=False),
+    Column("type", String, nullable=False),
+)
+Table("cart", baseline, Column("id", Integer, primary_key=True))
+Table(
+    "cart_item", baseline,
+    Column("cart_id", Integer, ForeignKey("cart.id"), primary_key=True),
+    Column("item_id", Integer, ForeignKey("item.id"), primary_key=True),
+    Column("quantity", Integer, nullable=False),
+)
+
+
+def schema_diff(url):
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+        revision = MigrationContext.configure(connection).get_current_revision()
+    engine.dispose()
+    return diff, revision
+
+
+def test_migrations_build_the_model_schema(tmp_path):
+    url = f"sqlite:///{tmp_path}/migrated.db"
+    upgrade(url)
+    assert schema_diff(url) == ([], "0010")
+
+
+def test_create_all_databases_are_stamped_and_upgraded(tmp_path):
+    """
+    A database init_db.py built with create_all before migrations gets the baseline stamp, then
+    every later revision, and keeps its data.
+    """
+    url = f"sqlite:///{tmp_path}/legacy.db"
+    engine = create_engine(url)
+    baseline.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(baseline.tables["item"].insert(), [
+            {"id": 1, "name": "Ticket", "price": 39.99, "description": "d", "thumbnail": "t", "stock": 7, "type": "Event"},
+            {"id": 2, "name": "Shirt", "price": 5.25, "description": "d", "thumbnail": "t", "stock": 3, "type": "Product"},
+        ])
+        connection.execute(baseline.tables["cart"].insert(), [{"id": 1}])
+        connection.execute(baseline.tables["cart_item"].insert(), [
+            {"cart_id": 1, "item_id": 1, "quantity": 3}, {"cart_id": 1, "item_id": 2, "quantity": 2},
+        ])
+
+    upgrade(url)
+    assert {"ix_item_type_price", "ix_item_price_id"} <= {index["name"] for index in inspect(engine).get_indexes("item")}
+    assert schema_diff(url) == ([], "0010")
+    with Session(engine) as db:
+        assert db.get(Item, 1).price == Decimal("39.99")
+        assert db.get(CartItem, (1, 1)).reserved_at is not None
+        cart = db.get(Cart, 1)
+        assert (cart.total, cart.line_count, cart.version) == (None, 2, 0)
+        assert CartRepository(db).get_cart_display(1).total == Decimal("130.47")
+        assert CartRepository(db).check_cart_totals() == []
+    engine.dispose()
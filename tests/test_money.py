@@ -0,0 +1,51 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from domain import money
+
+
+def random_invoice(rng, lines):
+    quantities = [rng.randint(1, 50) for _ in range(lines)]
+    prices = [Decimal(rng.randint(0, 1_000_000)).scaleb(-2) for _ in range(lines)]
+    return quantities, prices
+
+
+@pytest.mark.parametrize(
+    "quantities, prices, subtotals, total",
+    [
+        ([], [], [], "0.00"),
+        ([1], ["0.00"], ["0.00"], "0.00"),
+        ([3], ["39.99"], ["119.97"], "119.97"),
+        ([2, 5, 1], ["0.01", "19.99", "9999.99"], ["0.02", "99.95", "9999.99"], "10099.96"),
+        ([50, 50], ["9999.99", "0.07"], ["499999.50", "3.50"], "500003.00"),
+        ([7] * 1000, ["0.13"] * 1000, ["0.91"] * 1000, "910.00"),
+    ],
+)
+def test_invoice_matches_hand_computed_totals(quantities, prices, subtotals, total):
+    computed_subtotals, computed_total = money.invoice(quantities, [Decimal(price) for price in prices])
+    assert [str(subtotal) for subtotal in computed_subtotals] == subtotals
+    assert str(computed_total) == total
+
+
+@pytest.mark.parametrize("lines", [0, 1, 3, 50, 1000])
+def test_invoice_matches_integer_cents(lines):
+    rng = random.Random(lines)
+    for _ in range(20):
+        quantities, prices = random_invoice(rng, lines)
+        subtotals, total = money.invoice(quantities, prices)
+        cents = [quantity * int(price.scaleb(2)) for quantity, price in zip(quantities, prices)]
+        assert [str(subtotal) for subtotal in subtotals] == [str(Decimal(c).scaleb(-2)) for c in cents]
+        assert str(total) == str(Decimal(sum(cents)).scaleb(-2))
+
+
+def test_float_prices_do_not_drift():
+    assert money.invoice([3], [39.99]) == ([Decimal("119.97")], Decimal("119.97"))
+    assert money.invoice([1, 1, 1], [0.1, 0.2, 0.3])[1] == Decimal("0.60")
+
+
+def test_group_totals_handles_empty_groups():
+    subtotals = [Decimal("1.00"), Decimal("2.50"), Decimal("0.05"), Decimal("0.07")]
+    totals = money.group_totals(subtotals, [2, 0, 1, 1, 0])
+    assert [str(total) for total in totals] == ["3.50", "0.00", "0.05", "0.07", "0.00"]
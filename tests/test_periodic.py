@@ -0,0 +1,36 @@
+import asyncio
+import logging
+import time
+
+from infrastructure.periodic import run_every
+
+
+def test_run_every_survives_failures_and_reruns_on_a_backlog(caplog):
+    """
+    A failing step is logged and retried after the interval; a step reporting a backlog runs again at once.
+    """
+    reports = iter([RuntimeError("database down"), 3, 3, 0])
+    started = []
+
+    def step():
+        started.append(time.monotonic())
+        report = next(reports)
+        if isinstance(report, Exception):
+            raise report
+        return report
+
+    async def main():
+        task = asyncio.create_task(run_every(0.2, step, logging.getLogger("test.periodic"), "Test job", again=bool))
+        while len(started) < 4:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    with caplog.at_level(logging.ERROR, logger="test.periodic"):
+        asyncio.run(main())
+    gaps = [later - earlier for earlier, later in zip(started, started[1:])]
+    assert gaps[0] >= 0.2 and gaps[1] < 0.2 and gaps[2] < 0.2
+    assert [record.getMessage() for record in caplog.records] == ["Test job failed"]
@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from check_query_plans import unexercised_methods
+from domain.models import Base, CartItem, Item
+from infrastructure.query_plans import QueryRecorder, find_seq_scans
+
+
+def test_seq_scans_are_flagged_above_the_size_threshold(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/plans.db")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Item), [
+            {"name": f"Item {n}", "price": n, "description": "", "thumbnail": "t.jpg", "stock": 1, "type": "Product"}
+            for n in range(50)
+        ])
+    recorder = QueryRecorder(engine)
+    with recorder.recording(), sessionmaker(bind=engine)() as session:
+        with recorder.labelled("by description"):
+            session.execute(select(Item.id).where(Item.description == "x")).all()
+        with recorder.labelled("by type and price"):
+            session.execute(select(Item.id).where(Item.type == "Event", Item.price < 10)).all()
+        with recorder.labelled("by item"):
+            session.execute(select(CartItem.cart_id).where(CartItem.item_id == 3)).all()
+    queries = list(recorder.queries.values())
+
+    assert [(scan.label, scan.table, scan.rows) for scan in find_seq_scans(engine, queries, min_rows=10)] == [
+        ("by description", "item", 50)
+    ]
+    assert find_seq_scans(engine, queries, min_rows=100) == []
+    assert find_seq_scans(engine, queries, min_rows=10, allowed={"by description"}) == []
+    engine.dispose()
+
+
+def test_every_repository_method_is_exercised():
+    assert unexercised_methods() == []
@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from domain.models import Cart, Item, ItemChangeEvent
+from domain.service import CartService, ItemService
+from infrastructure.repository import CartRepository, ItemRepository
+from infrastructure.repricing import CartRepricer
+from schemas.item import ItemUpdate
+
+
+def reprice(db, item_id, price):
+    ItemService(ItemRepository(db)).update_item(item_id, ItemUpdate(
+        name="Ticket", price=price, description="d", thumbnail="t", stock=100, type="Event"
+    ))
+
+
+def stored_carts(session_factory):
+    with session_factory() as db:
+        return [(cart.total, cart.version) for cart in db.scalars(select(Cart).order_by(Cart.id))]
+
+
+def test_price_change_reprices_carts_in_batches(session_factory):
+    """
+    A price change writes one outbox event; reads use the new price at once, and the repricer
+    rewrites the stored totals of the carts holding the item a batch at a time.
+    """
+    with session_factory() as db:
+        ticket = Item(name="Ticket", price=Decimal("10.00"), description="d", thumbnail="t", stock=100, type="Event")
+        other = Item(name="Other", price=Decimal("1.00"), description="d", thumbnail="t", stock=100, type="Product")
+        carts = [Cart() for _ in range(6)]
+        db.add_all([ticket, other, *carts])
+        db.commit()
+        ticket_id, cart_ids = ticket.id, [cart.id for cart in carts]
+        cart_service = CartService(CartRepository(db), ItemRepository(db))
+        for n, cart_id in enumerate(cart_ids[:5]):
+            cart_service.add_item_to_cart(cart_id, ticket_id, n + 1)
+        cart_service.add_item_to_cart(cart_ids[5], other.id, 1)
+        reprice(db, ticket_id, Decimal("12.50"))
+        reprice(db, ticket_id, Decimal("15.00"))
+
+        assert db.get(Item, ticket_id).reprice_pending == 2
+        assert cart_service.get_cart_details(cart_ids[1]).total == Decimal("30.00")
+        assert CartRepository(db).check_cart_totals() == []
+        # Stats rank the carts awaiting repricing by their current value, without repricing them.
+        top_carts = CartRepository(db).cart_stats(top=2).top_carts
+        assert [(cart.cart_id, cart.total) for cart in top_carts] == [
+            (cart_ids[4], Decimal("75.00")), (cart_ids[3], Decimal("60.00"))
+        ]
+        assert db.get(ItemChangeEvent, 1).cart_cursor == 0
+    assert stored_carts(session_factory)[:2] == [(Decimal("10.00"), 1), (Decimal("20.00"), 1)]
+
+    repricer = CartRepricer(session_factory, batch_size=2, max_batches=3)
+    report = repricer.run()
+    assert (report.batches, report.carts, report.events) == (3, 5, 1)
+    report = repricer.run()
+    assert (report.batches, report.carts, report.events) == (3, 5, 1)
+    assert repricer.run().batches == 0
+    assert repricer.stats()["carts_repriced"] == 10 and repricer.pending() == 0
+
+    expected = [(Decimal(15 * n), 3) for n in range(1, 6)] + [(Decimal("1.00"), 1)]
+    assert stored_carts(session_factory) == expected
+    with session_factory() as db:
+        assert db.get(Item, ticket_id).reprice_pending == 0
+        events = db.scalars(select(ItemChangeEvent).order_by(ItemChangeEvent.id)).all()
+        assert [(event.old_price, event.new_price, event.cart_cursor) for event in events] == [
+            (Decimal("10.00"), Decimal("12.50"), cart_ids[4]), (Decimal("12.50"), Decimal("15.00"), cart_ids[4])
+        ]
+        assert all(event.processed_at is not None for event in events)
+
+
+def test_unchanged_price_writes_no_event(session_factory):
+    with session_factory() as db:
+        item = Item(name="Ticket", price=Decimal("10.00"), description="d", thumbnail="t", stock=100, type="Event")
+        db.add(item)
+        db.commit()
+        reprice(db, item.id, Decimal("10.00"))
+        ItemRepository(db).bulk_update([{"id": item.id, "price": Decimal("10.00")}])
+        assert db.scalars(select(ItemChangeEvent)).all() == []
+        ItemRepository(db).bulk_update([{"id": item.id, "price": Decimal("11.00")}])
+        assert [event.new_price for event in db.scalars(select(ItemChangeEvent))] == [Decimal("11.00")]
@@ -0,0 +1,115 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from domain.models import Cart, CartItem, Item
+from domain.service import CartService
+from infrastructure.repository import CartRepository, ItemRepository
+from infrastructure.reservation_sweeper import ReservationSweeper
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+def test_sweeper_releases_only_expired_reservations(session_factory):
+    """
+    Lines older than the TTL give their stock back in bounded batches; lines renewed since stay reserved.
+    """
+    clock = FakeClock()
+    with session_factory() as db:
+        event = Item(name="Concert", price=Decimal("50.00"), description="d", thumbnail="t", stock=10, type="Event")
+        carts = [Cart() for _ in range(3)]
+        db.add_all([event, *carts])
+        db.commit()
+        event_id, cart_ids = event.id, [cart.id for cart in carts]
+        cart_service = CartService(CartRepository(db, clock=clock), ItemRepository(db))
+        cart_service.add_item_to_cart(cart_ids[0], event_id, 2)
+        cart_service.add_item_to_cart(cart_ids[1], event_id, 3)
+        clock.advance(600)
+        cart_service.add_item_to_cart(cart_ids[2], event_id, 1)
+
+    sweeper = ReservationSweeper(session_factory, ttl=900, batch_size=1, max_batches=1, clock=clock)
+    assert sweeper.sweep().lines == 0
+
+    clock.advance(400)
+    report = sweeper.sweep()
+    assert (report.batches, report.lines, report.units_by_item) == (1, 1, {event_id: 2})
+    report = sweeper.sweep()
+    assert (report.lines, report.units_by_item) == (1, {event_id: 3})
+    assert sweeper.sweep().lines == 0
+    assert sweeper.stats() == {"runs": 4, "lines_released": 2, "units_released": 5}
+
+    with session_factory() as db:
+        assert db.get(Item, event_id).stock == 9
+        assert db.scalars(select(CartItem.cart_id)).all() == [cart_ids[2]]
+        assert [(cart.total, cart.line_count, cart.version) for cart in db.scalars(select(Cart).order_by(Cart.id))] == [
+            (Decimal("0.00"), 0, 2), (Decimal("0.00"), 0, 2), (Decimal("50.00"), 1, 1)
+        ]
+
+
+def test_sweeps_racing_removals_release_each_line_once(session_factory):
+    """
+    Expired lines that are swept and removed at the same time give their stock back once:
+    each line goes either to a sweep or to its removal.
+    """
+    clock = FakeClock()
+    with session_factory() as db:
+        event = Item(name="Concert", price=Decimal("50.00"), description="d", thumbnail="t", stock=40, type="Event")
+        carts = [Cart() for _ in range(8)]
+        db.add_all([event, *carts])
+        db.commit()
+        event_id, cart_ids = event.id, [cart.id for cart in carts]
+        cart_service = CartService(CartRepository(db, clock=clock), ItemRepository(db))
+        for cart_id in cart_ids:
+            cart_service.add_item_to_cart(cart_id, event_id, 3)
+    clock.advance(1000)
+
+    sweeper = ReservationSweeper(session_factory, ttl=900, batch_size=2, max_batches=4, clock=clock)
+    removed, barrier = [], threading.Barrier(len(cart_ids) + 2)
+
+    def remove(cart_id):
+        barrier.wait()
+        while True:
+            with session_factory() as db:
+                try:
+                    CartService(CartRepository(db, clock=clock), ItemRepository(db)).remove_item_from_cart(cart_id, event_id)
+                    removed.append(cart_id)
+                except HTTPException:
+                    pass
+                except OperationalError:
+                    continue
+            return
+
+    def sweep():
+        barrier.wait()
+        while True:
+            try:
+                sweeper.sweep()
+            except OperationalError:
+                continue
+            return
+
+    threads = [threading.Thread(target=remove, args=(cart_id,)) for cart_id in cart_ids]
+    threads += [threading.Thread(target=sweep) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert 3 * len(removed) + sweeper.units_released == 24
+    with session_factory() as db:
+        assert db.get(Item, event_id).stock == 40
+        assert db.scalars(select(CartItem)).all() == []
+        assert CartRepository(db).check_cart_totals() == []
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
+from domain.models import Cart, Item, ItemStockShard, StockMovement
+from domain.service import CartService
+from infrastructure.repository import CartRepository, ItemRepository, StockJournalRepository
+from infrastructure.stock_journal import StockCompactor
+from schemas.cart import CartOperation
+
+
+def journal(db, item_id):
+    return [(m.delta, m.cart_id, m.reason) for m in StockJournalRepository(db).movements(item_id)]
+
+
+def test_journaled_stock_is_appended_and_compacted(session_factory):
+    """
+    Reservations of a journaled item append movements instead of updating its row; the compactor
+    folds them into the snapshot, and the journal accounts for every unit.
+    """
+    with session_factory() as db:
+        item = Item(name="Final", price=Decimal("90.00"), description="d", thumbnail="t", stock=10, type="Event")
+        cart = Cart()
+        db.add_all([item, cart])
+        db.commit()
+        item_id, cart_id = item.id, cart.id
+        assert ItemRepository(db).set_stock_journal(item_id, True).available_stock == 10
+
+        cart_service = CartService(CartRepository(db), ItemRepository(db))
+        assert cart_service.add_item_to_cart(cart_id, item_id, 4).item.stock == 6
+        cart_service.remove_item_from_cart(cart_id, item_id, 1)
+        cart_service.apply_cart_operations(cart_id, [CartOperation(op="set", item_id=item_id, quantity=5)])
+        ItemRepository(db).update(item_id, {"stock": 20})
+        with pytest.raises(HTTPException, match="Insufficient stock"):
+            cart_service.add_item_to_cart(cart_id, item_id, 21)
+
+        assert db.scalar(select(Item.stock).where(Item.id == item_id)) == 10
+        assert ItemRepository(db).stock_levels([item_id]) == {item_id: 20}
+        assert journal(db, item_id) == [
+            (10, None, "open"), (-4, cart_id, "reserve"), (1, cart_id, "release"), (-2, cart_id, "reserve"),
+            (15, None, "restock"),
+        ]
+
+    compactor = StockCompactor(session_factory)
+    assert (compactor.run().movements, compactor.run().movements) == (4, 0)
+    assert compactor.stats() == {"runs": 2, "items_compacted": 1, "movements_folded": 4}
+    with session_factory() as db:
+        item = db.get(Item, item_id)
+        assert (item.stock, item.available_stock) == (20, 20)
+        assert StockJournalRepository(db).check() == []
+
+
+def test_expired_reservations_are_journaled(session_factory):
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    with session_factory() as db:
+        item = Item(name="Final", price=Decimal("90.00"), description="d", thumbnail="t", stock=5, type="Event")
+        cart = Cart()
+        db.add_all([item, cart])
+        db.commit()
+        item_id, cart_id = item.id, cart.id
+        ItemRepository(db).set_stock_journal(item_id, True)
+        CartService(CartRepository(db, clock=lambda: now), ItemRepository(db)).add_item_to_cart(cart_id, item_id, 3)
+
+        released = CartRepository(db).release_expired_reservations(now + timedelta(seconds=1), 10)
+        assert [(line.item_id, line.quantity) for line in released] == [(item_id, 3)]
+        assert journal(db, item_id)[-1] == (3, cart_id, "expire")
+        assert (db.get(Item, item_id, populate_existing=True).stock, ItemRepository(db).stock_levels()) == (5, {item_id: 5})
+
+
+def test_stock_journal_check_and_rebuild(session_factory):
+    """
+    A snapshot that drifted from the journal is reported, and rebuilt from the journal exactly.
+    """
+    with session_factory() as db:
+        item = Item(name="Final", price=Decimal("90.00"), description="d", thumbnail="t", stock=8, type="Event")
+        db.add(item)
+        db.commit()
+        item_repo, stock_journal = ItemRepository(db), StockJournalRepository(db)
+        item_repo.set_stock_journal(item.id, True)
+        item_repo.reserve_stock(item.id, 3)
+        db.commit()
+        stock_journal.compact(item.id)
+        db.execute(update(Item).where(Item.id == item.id).values(stock=100))
+        db.commit()
+
+        assert [(m.item_id, m.stock, m.journal_stock) for m in stock_journal.check()] == [(item.id, 100, 5)]
+        assert stock_journal.rebuild([item.id]) == 1
+        assert stock_journal.check() == []
+        assert item_repo.stock_levels([item.id]) == {item.id: 5}
+
+
+def test_switching_between_shards_and_journal_keeps_stock(session_factory):
+    with session_factory() as db:
+        item = Item(name="Final", price=Decimal("90.00"), description="d", thumbnail="t", stock=9, type="Event")
+        db.add(item)
+        db.commit()
+        item_repo = ItemRepository(db)
+        item_repo.set_stock_shards(item.id, 3)
+        journaled = item_repo.set_stock_journal(item.id, True)
+        assert (journaled.stock_shards, journaled.available_stock, db.query(ItemStockShard).count()) == (0, 9, 0)
+        item_repo.reserve_stock(item.id, 4)
+        db.commit()
+
+        sharded = item_repo.set_stock_shards(item.id, 2)
+        assert (sharded.stock_journaled, sharded.available_stock) == (False, 5)
+        item_repo.reserve_stock(item.id, 1)
+        db.commit()
+        reopened = item_repo.set_stock_journal(item.id, True)
+        assert (reopened.available_stock, item_repo.set_stock_journal(item.id, False).stock) == (4, 4)
+        # The reservation made while sharded is outside the journal; reopening accounts for it.
+        assert [(m.delta, m.reason) for m in db.scalars(select(StockMovement).order_by(StockMovement.id))] == [
+            (9, "open"), (-4, "reserve"), (-1, "open"),
+        ]
@@ -0,0 +1,196 @@
+import os
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from domain.models import Base, Cart, CartItem, Item, ItemStockShard
+from domain.service import CartService
+from infrastructure.repository import CartRepository, ItemRepository
+from schemas.cart import CartOperation
+
+INITIAL_STOCK = 5
+CLIENTS = 32
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+    Session factory on a real file database, so each thread gets its own connection.
+    Set TEST_DATABASE_URL to run the stress test against PostgreSQL instead.
+    """
+    url = os.getenv("TEST_DATABASE_URL", f"sqlite:///{tmp_path}/reservation.db")
+    connect_args = {"check_same_thread": False, "timeout": 30} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args, pool_size=CLIENTS)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.mark.parametrize("shards, journaled", [(0, False), (4, False), (0, True)])
+def test_concurrent_reservations_never_oversell(session_factory, shards, journaled):
+    """
+    Many threads adding one unit of a low-stock item to the same cart should reserve exactly the available stock,
+    whether the stock sits on the item row, is spread over shard counters or is kept in a journal.
+    """
+    with session_factory() as db:
+        item = Item(name="Hot Event", price=60.0, description="Sold out fast", thumbnail="hot.jpg",
+                    stock=INITIAL_STOCK, type="Event")
+        cart = Cart()
+        db.add_all([item, cart])
+        db.commit()
+        item_id, cart_id = item.id, cart.id
+        if shards:
+            ItemRepository(db).set_stock_shards(item_id, shards)
+        if journaled:
+            ItemRepository(db).set_stock_journal(item_id, True)
+
+    outcomes = []
+    barrier = threading.Barrier(CLIENTS)
+
+    def reserve():
+        barrier.wait()
+        while True:
+            with session_factory() as db:
+                service = CartService(CartRepository(db), ItemRepository(db))
+                try:
+                    service.add_item_to_cart(cart_id, item_id, 1)
+                    outcomes.append("reserved")
+                except HTTPException as e:
+                    outcomes.append(e.detail)
+                except OperationalError:
+                    # SQLite reports lock contention instead of waiting; retry like a client would.
+                    continue
+            return
+
+    threads = [threading.Thread(target=reserve) for _ in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes.count("reserved") == INITIAL_STOCK
+    assert outcomes.count("Insufficient stock") == CLIENTS - INITIAL_STOCK
+    with session_factory() as db:
+        assert db.get(Item, item_id).available_stock == 0
+        assert db.get(CartItem, (cart_id, item_id)).quantity == INITIAL_STOCK
+
+
+def test_sharded_stock_falls_back_across_shards(session_factory):
+    """
+    A reservation larger than any single shard drains several of them, and the item shows the summed stock.
+    """
+    with session_factory() as db:
+        item = Item(name="Festival", price=80.0, description="Three days", thumbnail="fest.jpg", stock=7, type="Event")
+        db.add(item)
+        db.commit()
+        item_repo = ItemRepository(db)
+        assert item_repo.set_stock_shards(item.id, 3).available_stock == 7
+        assert [shard.stock for shard in db.query(ItemStockShard).order_by(ItemStockShard.shard)] == [3, 2, 2]
+
+        assert item_repo.reserve_stock(item.id, 5).available_stock == 2
+        db.commit()
+        assert item_repo.reserve_stock(item.id, 3) is None
+        assert item_repo.release_stock(item.id, 4).available_stock == 6
+        assert item_repo.stock_levels([item.id]) == {item.id: 6}
+        assert item_repo.apply_stock_deltas({item.id: 6})
+        assert not item_repo.apply_stock_deltas({item.id: 1})
+
+        item_repo.update(item.id, {"stock": 9})
+        assert [shard.stock for shard in db.query(ItemStockShard).order_by(ItemStockShard.shard)] == [3, 3, 3]
+        merged = item_repo.set_stock_shards(item.id, 0)
+        assert (merged.stock, merged.available_stock, db.query(ItemStockShard).count()) == (9, 9, 0)
+
+
+def test_stock_deltas_apply_to_every_item_or_none(session_factory):
+    with session_factory() as db:
+        items = [Item(name=f"Item {n}", price=5.0, description="d", thumbnail="t", stock=4, type="Product") for n in range(3)]
+        db.add_all(items)
+        db.commit()
+        ids = [item.id for item in items]
+        item_repo = ItemRepository(db)
+
+        assert item_repo.apply_stock_deltas({ids[2]: 4, ids[0]: -1, ids[1]: 3})
+        db.commit()
+        assert item_repo.stock_levels(ids) == {ids[0]: 5, ids[1]: 1, ids[2]: 0}
+        # One short item rolls back the whole batch.
+        assert not item_repo.apply_stock_deltas({ids[0]: 2, ids[1]: 2})
+        assert item_repo.stock_levels(ids) == {ids[0]: 5, ids[1]: 1, ids[2]: 0}
+
+
+def run_concurrently(session_factory, actions):
+    """Run each action(CartService) in its own thread and session, retrying on SQLite lock errors; returns the outcomes."""
+    outcomes = []
+    barrier = threading.Barrier(len(actions))
+
+    def run(action):
+        barrier.wait()
+        while True:
+            with session_factory() as db:
+                try:
+                    action(CartService(CartRepository(db), ItemRepository(db)))
+                    outcomes.append("ok")
+                except HTTPException as e:
+                    outcomes.append(e.detail)
+                except OperationalError:
+                    continue
+            return
+
+    threads = [threading.Thread(target=run, args=(action,)) for action in actions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def test_concurrent_operations_and_adds_keep_every_unit(session_factory):
+    """
+    Batches of operations racing plain adds on one line never overwrite an add: every unit taken
+    from stock is in the cart, whichever write lands first.
+    """
+    with session_factory() as db:
+        item = Item(name="Hot Event", price=60.0, description="Sold out fast", thumbnail="hot.jpg", stock=100, type="Event")
+        cart = Cart()
+        db.add_all([item, cart])
+        db.commit()
+        item_id, cart_id = item.id, cart.id
+
+    operation = [CartOperation(op="add", item_id=item_id, quantity=1)]
+    actions = [lambda service: service.apply_cart_operations(cart_id, operation)] * (CLIENTS // 2)
+    actions += [lambda service: service.add_item_to_cart(cart_id, item_id, 2)] * (CLIENTS // 2)
+    outcomes = run_concurrently(session_factory, actions)
+
+    with session_factory() as db:
+        stock = db.get(Item, item_id).available_stock
+        assert db.get(CartItem, (cart_id, item_id)).quantity == 100 - stock
+        assert CartRepository(db).check_cart_totals() == []
+    assert set(outcomes) <= {"ok", "Cart kept changing while the operations were applied; retry"}
+
+
+def test_concurrent_removals_release_each_unit_once(session_factory):
+    """
+    Removals racing on one line, some of a single unit and some of the whole line, give back
+    exactly the units the line held: none is released twice.
+    """
+    with session_factory() as db:
+        item = Item(name="Hot Event", price=60.0, description="Sold out fast", thumbnail="hot.jpg", stock=20, type="Event")
+        cart = Cart()
+        db.add_all([item, cart])
+        db.commit()
+        item_id, cart_id = item.id, cart.id
+        CartService(CartRepository(db), ItemRepository(db)).add_item_to_cart(cart_id, item_id, 10)
+
+    actions = [lambda service: service.remove_item_from_cart(cart_id, item_id, 1)] * (CLIENTS // 2)
+    actions += [lambda service: service.remove_item_from_cart(cart_id, item_id)] * (CLIENTS // 2)
+    outcomes = run_concurrently(session_factory, actions)
+
+    assert set(outcomes) <= {"ok", "Item not found in cart"}
+    with session_factory() as db:
+        assert db.get(Item, item_id).available_stock == 20
+        assert db.get(CartItem, (cart_id, item_id)) is None
+        assert CartRepository(db).check_cart_totals() == []